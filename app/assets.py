@@ -0,0 +1,59 @@
+# app/assets.py
+"""
+정적 파일 URL.
+
+build_assets.py 가 만든 STATIC_BUILD_DIR/manifest.json 이 있으면 템플릿의 asset_url("js/dashboard.js")
+는 내용 해시 경로(/static/js/dashboard.1a2b3c4d5e6f.js)를 돌려주고, nginx 가 이 파일을
+immutable 캐시 헤더와 함께 직접 제공합니다. 빌드 결과가 없으면(개발 환경) 원래 경로를 그대로 씁니다.
+"""
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATIC_URL = "/static"
+
+
+class AssetManifest:
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._paths: Optional[Dict[str, str]] = None
+
+    @property
+    def directory(self) -> str:
+        return self._directory or settings.STATIC_BUILD_DIR
+
+    @property
+    def built(self) -> bool:
+        return bool(self._load())
+
+    def _load(self) -> Dict[str, str]:
+        if self._paths is None:
+            path = os.path.join(self.directory, "manifest.json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._paths = dict(json.load(f))
+                logger.info("정적 파일 manifest 로드: %d개 (%s)", len(self._paths), path)
+            except FileNotFoundError:
+                self._paths = {}
+            except Exception as e:
+                logger.warning(f"정적 파일 manifest 읽기 실패 ({path}): {e}")
+                self._paths = {}
+        return self._paths
+
+    def url(self, path: str) -> str:
+        path = path.lstrip("/")
+        return f"{STATIC_URL}/{self._load().get(path, path)}"
+
+
+# 싱글톤
+asset_manifest = AssetManifest()
+
+
+def asset_url(path: str) -> str:
+    """템플릿 전역 함수: {{ asset_url('js/dashboard.js') }}"""
+    return asset_manifest.url(path)
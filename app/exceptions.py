@@ -31,9 +31,74 @@ class PlugNotInUseException(BaseAPIException):
             detail=f"Plug '{plug_name}' is not in use"
         )
 
+class RateLimitedException(BaseAPIException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many requests, retry after {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class DeviceDeadlineException(BaseAPIException):
+    def __init__(self, plug_name: str):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Request deadline expired while waiting for plug '{plug_name}'"
+        )
+
 class TapoConnectionException(BaseAPIException):
     def __init__(self, plug_name: str, error: str):
         super().__init__(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Failed to connect to plug '{plug_name}': {error}"
-        ) 
\ No newline at end of file
+        )
+
+class GroupNotFoundException(BaseAPIException):
+    def __init__(self, group_name: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Group '{group_name}' not found"
+        )
+
+class ScheduleNotFoundException(BaseAPIException):
+    def __init__(self, schedule_id: int):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule '{schedule_id}' not found"
+        )
+
+class InvalidScheduleException(BaseAPIException):
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid schedule: {reason}"
+        )
+
+class InvalidDateRangeException(BaseAPIException):
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid date range: {reason}"
+        )
+
+class InvalidCursorException(BaseAPIException):
+    def __init__(self, cursor: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {cursor[:40]}"
+        )
+
+class IdempotencyKeyMismatchException(BaseAPIException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+class IdempotencyKeyInProgressException(BaseAPIException):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,121 @@
+# app/idempotency.py
+"""
+Idempotency-Key 헤더 처리 (플러그 ON/OFF, 세션 초기화, 그룹 명령).
+
+대시보드나 스크립트가 503·타임아웃 후 같은 명령을 다시 보내도 한 번만 실행되도록,
+Idempotency-Key 헤더가 있는 요청은 첫 결과를 저장해 두고 재시도에는 그 결과를 그대로 돌려줍니다
+(Idempotent-Replayed: true). 키는 토큰의 사용자(sub)별로 구분되며, 같은 키를 다른 요청
+(메서드·경로·쿼리·본문이 다름)에 쓰면 422 입니다. 저장과 동시 실행 처리는 services/idempotency.py.
+
+헤더가 없거나, 대상 경로가 아니거나, 토큰이 유효하지 않은 요청은 그대로 통과시킵니다 (인증 오류는 라우터가 응답).
+"""
+import json
+import re
+import time
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.exceptions import BaseAPIException
+from app.request_context import _header
+from app.routers.auth import peek_token_payload
+from app.services.idempotency import StoredResponse, fingerprint, idempotency_store, scoped_key
+
+MAX_KEY_LENGTH = 255
+
+# (메서드, 경로) — 상태를 바꾸는 명령 엔드포인트만
+ROUTES = (
+    ("POST", re.compile(r"^/plugs/.+/(on|off)$")),
+    ("DELETE", re.compile(r"^/plugs/.+/sessions$")),
+    ("POST", re.compile(r"^/groups/[^/]+$")),
+)
+
+
+def applies(method: str, path: str) -> bool:
+    return any(method == m and pattern.match(path) for m, pattern in ROUTES)
+
+
+def _user(scope) -> Optional[str]:
+    payload = peek_token_payload(_header(scope, b"authorization"))
+    return payload["sub"] if payload else None
+
+
+async def _send_response(send, status_code: int, headers: List[Tuple[str, str]], body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.IDEMPOTENCY_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, b"idempotency-key")
+        if key is None or not applies(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_response(send, 400, [("content-type", "application/json")], json.dumps(
+                {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}).encode())
+            return
+        user = _user(scope)
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 본문까지 지문에 넣으므로 먼저 모두 읽고, 앱에는 재생해 준다
+        messages = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            messages.append(message)
+            if not message.get("more_body"):
+                break
+        body = b"".join(m.get("body", b"") for m in messages)
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        async def execute() -> StoredResponse:
+            start, chunks = {}, []
+
+            async def capture(message):
+                if message["type"] == "http.response.start":
+                    start.update(message)
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await self.app(scope, replay, capture)
+            return StoredResponse(
+                fingerprint="",
+                status_code=start["status"],
+                headers=[(k.decode("latin-1"), v.decode("latin-1")) for k, v in start.get("headers", ())],
+                body=b"".join(chunks),
+                expires=time.time(),
+            )
+
+        try:
+            response, replayed = await idempotency_store.run(
+                scoped_key(user, key),
+                fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body),
+                execute,
+            )
+        except BaseAPIException as e:
+            headers = [("content-type", "application/json"), *(e.headers or {}).items()]
+            await _send_response(send, e.status_code, headers, json.dumps({"detail": e.detail}).encode())
+            return
+
+        headers = response.headers
+        if replayed:
+            headers = [*headers, ("idempotent-replayed", "true")]
+        await _send_response(send, response.status_code, headers, response.body)
@@ -0,0 +1,190 @@
+# app/log.py
+"""
+비동기(논블로킹) 구조화 로깅.
+
+- 루트 로거에는 QueueHandler 하나만 붙이고, 실제 출력(콘솔/파일)은
+  QueueListener 스레드에서 처리하므로 이벤트 루프가 I/O 를 기다리지 않습니다.
+- event() 는 레벨이 꺼져 있으면 아무것도 만들지 않고, 켜져 있어도 메시지 문자열은
+  출력 스레드에서 처음 필요할 때 만들어집니다. 일반 로그도 f-string 대신
+  logger.info("... %s", value) 형태로 써야 레벨이 꺼졌을 때 포맷 비용이 없습니다.
+- DEBUG 레코드는 같은 호출 위치마다 LOG_DEBUG_SAMPLE_EVERY 개 중 하나만 남깁니다.
+- LOG_DIR 이 설정되어 있으면 JSON Lines 로그를 크기 기준으로 회전(rotation)하며 씁니다.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+# LogRecord 기본 속성 — 이 외의 속성은 extra 로 들어온 구조화 필드로 취급
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+SAMPLING_MAX_KEYS = 4096
+
+
+class _Event:
+    """str() 될 때 처음으로 'name k=v ...' 를 만드는 지연 메시지."""
+
+    __slots__ = ("name", "fields")
+
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.name = name
+        self.fields = fields
+
+    def __str__(self) -> str:
+        if not self.fields:
+            return self.name
+        pairs = " ".join(f"{key}={value}" for key, value in self.fields.items())
+        return f"{self.name} {pairs}"
+
+
+def event(logger: logging.Logger, name: str, level: int = logging.INFO, **fields: Any) -> None:
+    """
+    구조화 이벤트를 남깁니다. 예) event(logger, "plug.reserve", plug=name, user_id=user.id)
+    JSON 출력에서는 event/필드가 각각의 키로 기록됩니다.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    # 레코드의 파일/줄(샘플링 키)은 이 함수가 아니라 호출한 곳
+    logger.log(level, _Event(name, fields), extra={"event": name, "fields": fields}, stacklevel=2)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    DEBUG 레코드를 호출 위치(로거, 파일, 줄)마다 every 개 중 하나만 통과시킵니다.
+    f-string 메시지는 호출마다 문자열이 달라 템플릿으로는 묶이지 않으므로 위치로 구분하고,
+    카운터는 최근에 쓰인 max_keys 개만 남깁니다 (LRU). 필터는 로그를 남기는 스레드에서 돌므로 잠금으로 보호합니다.
+    """
+
+    def __init__(self, every: int, max_keys: int = SAMPLING_MAX_KEYS):
+        super().__init__()
+        self.every = max(1, every)
+        self.max_keys = max(1, max_keys)
+        self._counters: "OrderedDict[tuple, itertools.count]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = itertools.count()
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+            return next(counter) % self.every == 0
+
+
+class _QueueHandler(QueueHandler):
+    """
+    기본 QueueHandler.prepare() 는 이벤트 루프에서 전체 포맷(시간/레벨/예외 포함)을 수행합니다.
+    여기서는 event() 레코드의 필드만 스냅샷하고 문자열 생성은 출력 스레드로 미룹니다.
+    일반 %-style 레코드는 인자가 나중에 바뀌지 않도록 메시지만 확정합니다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        if isinstance(record.msg, _Event):
+            # 호출자가 넘긴 리스트 등을 나중에 바꿔도 기록이 흔들리지 않도록 스냅샷
+            fields = {key: _plain(value) for key, value in record.msg.fields.items()}
+            record.msg, record.fields = _Event(record.msg.name, fields), fields
+        else:
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _plain(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple, set)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "event", None):
+            data["event"] = record.event
+            data.update(getattr(record, "fields", None) or {})
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in ("event", "fields"):
+                data.setdefault(key, _plain(value))
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging() -> None:
+    """루트 로거를 QueueHandler → QueueListener(콘솔 + JSON 파일) 구성으로 바꿉니다. 여러 번 호출해도 안전."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handlers = []
+    if settings.LOG_CONSOLE:
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        handlers.append(console)
+
+    if settings.LOG_DIR:
+        try:
+            os.makedirs(settings.LOG_DIR, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                os.path.join(settings.LOG_DIR, "app.jsonl"),
+                maxBytes=settings.LOG_FILE_MAX_BYTES,
+                backupCount=settings.LOG_FILE_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"로그 파일을 열 수 없어 콘솔로만 기록합니다 ({settings.LOG_DIR}): {e}")
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_DEBUG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """남은 레코드를 모두 출력하고 리스너 스레드를 멈춥니다."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -1,5 +1,6 @@
 # app/main.py
-import logging, uvicorn
+import asyncio, logging, uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
@@ -7,21 +8,79 @@ from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.db import init_db
-from app.routers import health, auth, plugs
+from app.assets import asset_manifest, asset_url
+from app.log import setup_logging
+from app.db import init_db, engine
+from app.timing import TimingMiddleware, install_db_timing
+from app.idempotency import IdempotencyMiddleware
+from app.request_context import RequestContextMiddleware
+from app.traffic_capture import TrafficCaptureMiddleware, traffic_recorder
+from app.routers import health, auth, plugs, groups, schedules, discovery, debug, analytics, edge
 from app.routers.ui import ui
 from app.exceptions import BaseAPIException
+from app.services.scheduler import plug_scheduler
+from app.services.leases import lease_manager
+from app.services.revocation import token_denylist
+from app.services.reconciler import reconciler
+from app.services.events import event_bus
+from app.services.mqtt_bridge import mqtt_bridge
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+setup_logging()
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    restored = plug_state_cache.load()
+    logger.info("플러그 %d개, 저장된 상태 %d개로 시작", len(pyp100_service.plugs), restored)
+
+    await token_denylist.start()
+    await traffic_recorder.start()
+    await event_bus.start()
+    # MQTT 브리지 (MQTT_ENABLED) — 이벤트 버스는 프로세스 내부이므로 단일 워커 기준
+    await mqtt_bridge.start()
+    # 반영되지 않은 ON/OFF 명령(저널)은 시작 직후부터 재시도
+    await reconciler.start()
+
+    # 스케줄러는 워커 하나에서만 켜야 중복 실행이 없습니다 (SCHEDULER_ENABLED)
+    if settings.SCHEDULER_ENABLED:
+        await plug_scheduler.start()
+    if settings.SESSION_LEASE_SECONDS:
+        await lease_manager.start()
+
+    # 플러그 연결 예열은 기다리지 않고 백그라운드로 (/readyz 가 진행 상황을 보고)
+    warm_up = asyncio.create_task(pyp100_service.warm_up()) if settings.PREWARM_ENABLED else None
+    yield
+
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    await plug_scheduler.stop()
+    await lease_manager.stop()
+    await token_denylist.stop()
+    await reconciler.stop()
+    await mqtt_bridge.stop()
+    await event_bus.stop()
+    await traffic_recorder.stop()
+    plug_state_cache.save()
+    await pyp100_service.close()
 
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
 
 # FastAPI 앱 설정 - Swagger UI에서 인증을 위한 보안 스키마 추가
 app = FastAPI(
     title="Tapo Control API", 
     debug=settings.DEBUG,
+    lifespan=lifespan,
     swagger_ui_parameters={"persistAuthorization": True},
     openapi_tags=[
         {"name": "auth", "description": "인증 관련 API"},
-        {"name": "plugs", "description": "스마트 플러그 제어 API"}
+        {"name": "plugs", "description": "스마트 플러그 제어 API"},
+        {"name": "groups", "description": "플러그 그룹 제어 API"},
+        {"name": "schedules", "description": "플러그 ON/OFF 예약 스케줄 API"}
     ]
 )
 
@@ -32,18 +91,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "Link", "Idempotent-Replayed"],
 )
+# Idempotency-Key 가 있는 ON/OFF·초기화·그룹 명령은 첫 결과를 저장해 재시도에 재생 (가장 안쪽)
+app.add_middleware(IdempotencyMiddleware)
+# 요청별 구간 시간(Server-Timing) / 느린 요청 프로파일
+app.add_middleware(TimingMiddleware)
+install_db_timing(engine)
+# 요청 트레이스 기록 (TRAFFIC_CAPTURE_PATH) — benchmarks/replay.py 로 재생
+app.add_middleware(TrafficCaptureMiddleware)
+# 요청 deadline / 클라이언트 연결 끊김 시 취소 (가장 바깥)
+app.add_middleware(RequestContextMiddleware)
 
-init_db()
-
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# 정적 파일: 운영에서는 nginx 가 빌드 결과를 직접 제공하므로(SERVE_STATIC=false) 마운트하지 않는다
+if settings.SERVE_STATIC:
+    static_dir = asset_manifest.directory if asset_manifest.built else "app/static"
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
 
 @app.exception_handler(BaseAPIException)
 async def api_exception_handler(request: Request, exc: BaseAPIException):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
@@ -57,4 +129,10 @@ async def general_exception_handler(request: Request, exc: Exception):
 app.include_router(health.router)           # /healthz
 app.include_router(auth.router, prefix="/auth")
 app.include_router(plugs.router)            # /plugs/…
+app.include_router(groups.router)           # /groups/…
+app.include_router(schedules.router)        # /schedules/…
+app.include_router(discovery.router)        # /discovery/
+app.include_router(debug.router)            # /debug/profiles
+app.include_router(analytics.router)        # /analytics/…
+app.include_router(edge.router)             # /edge/ws (사이트 에이전트 WebSocket)
 app.include_router(ui)                      # /login, /
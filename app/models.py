@@ -1,6 +1,6 @@
 # app/models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, ForeignKey, Boolean, LargeBinary, Text
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -24,6 +24,7 @@ class PlugSession(Base):
     plug_name = Column(String(50), ForeignKey("plugs.name"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     started_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True, index=True)   # None = 임대 없음 (스케줄 등)
 
     plug = relationship("Plug", back_populates="sessions")
     user = relationship("User", back_populates="plug_sessions")
@@ -35,4 +36,97 @@ class Plug(Base):
     name = Column(String(50), primary_key=True)
     ip = Column(String(50), nullable=False)
 
-    sessions = relationship("PlugSession", back_populates="plug")
\ No newline at end of file
+    sessions = relationship("PlugSession", back_populates="plug")
+
+
+class PlugSchedule(Base):
+    __tablename__ = "plug_schedules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    plug_name = Column(String(50), ForeignKey("plugs.name"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    action = Column(String(3), nullable=False)          # "on" | "off"
+    time_of_day = Column(String(5), nullable=True)      # 반복 스케줄 "HH:MM" (SCHEDULE_TIMEZONE 기준)
+    weekdays = Column(Integer, default=0x7F)            # 월=bit0 … 일=bit6
+    run_at = Column(DateTime, nullable=True)            # 1회성 스케줄 (UTC)
+    next_run_at = Column(DateTime, nullable=True, index=True)
+    last_run_at = Column(DateTime, nullable=True)
+    enabled = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User")
+
+
+class RevokedToken(Base):
+    """로그아웃/refresh 회전으로 폐기된 JWT (jti). 토큰 만료 후에는 지워집니다."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class DesiredPlugState(Base):
+    """
+    세션 참조 카운트가 정한 플러그의 목표 상태 (명령 저널).
+    applied_at 이 비어 있으면 아직 장치에 반영되지 않은 명령이며, Reconciler 가 재시도합니다.
+    """
+    __tablename__ = "desired_plug_states"
+
+    plug_name = Column(String(50), primary_key=True)
+    desired = Column(Boolean, nullable=False)
+    version = Column(Integer, nullable=False, default=1)     # 목표가 바뀔 때마다 증가
+    requested_at = Column(DateTime, default=datetime.utcnow)
+    applied_at = Column(DateTime, nullable=True)             # None = 반영 대기
+    attempts = Column(Integer, default=0)
+    last_error = Column(String(200), nullable=True)
+
+
+class IdempotencyRecord(Base):
+    """
+    Idempotency-Key 로 처리한 명령의 첫 결과 (워커 간 공유).
+    status_code 가 None 이면 아직 실행 중이며, 그 표시는 expires_at 이 지나면 무효가 됩니다.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)              # sha256(사용자 + 키)
+    fingerprint = Column(String(64), nullable=False)        # sha256(메서드 + 경로 + 본문)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)                   # JSON [[이름, 값], …]
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class PlugSessionHistory(Base):
+    """
+    닫힌 세션 기록 (해제·임대 만료·강제 초기화 시 plug_sessions 에서 옮겨 옴).
+    사용량 집계 테이블의 원본이며, backfill_usage.py 가 이 테이블로 집계를 다시 만듭니다.
+    """
+    __tablename__ = "plug_session_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    plug_name = Column(String(50), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False, index=True)
+    reason = Column(String(10), nullable=True)      # "release" | "clear"
+
+
+class UsageUserDay(Base):
+    """사용자별·일별(UTC) 플러그 사용 시간 — 세션이 닫힐 때 같은 트랜잭션에서 누적."""
+    __tablename__ = "usage_user_daily"
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    seconds = Column(Float, nullable=False, default=0.0)
+    sessions = Column(Integer, nullable=False, default=0)   # 이 날 시작된 세션 수
+
+
+class UsagePlugHour(Base):
+    """플러그별·시간별(UTC) 사용 시간 (사용자 수만큼 겹쳐 셉니다 = plug-hours)."""
+    __tablename__ = "usage_plug_hourly"
+
+    plug_name = Column(String(50), primary_key=True)
+    hour = Column(DateTime, primary_key=True)
+    seconds = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,101 @@
+# app/request_context.py
+"""
+요청 deadline 과 클라이언트 연결 끊김 전파.
+
+- 요청마다 deadline(= 도착 시각 + REQUEST_TIMEOUT_SECONDS, X-Request-Timeout 헤더로 더 짧게 지정 가능)을
+  contextvar 에 넣어 두고, 장치 큐(device_queue)가 이 값으로 만료된 작업을 버립니다.
+- 본문을 먼저 모두 읽은 뒤 앱을 별도 태스크로 실행하고, 남은 receive() 로 http.disconnect 를
+  기다리다가 응답 전에 클라이언트가 떠나면 앱 태스크를 취소합니다.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[float]:
+    """현재 요청의 deadline (time.monotonic() 기준). 요청 밖(스케줄러 등)에서는 None."""
+    return _deadline.get()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = settings.REQUEST_TIMEOUT_SECONDS or None     # 0 = deadline 없음
+        requested = _header(scope, b"x-request-timeout")
+        if requested:
+            try:
+                requested_timeout = max(0.0, float(requested))
+                timeout = requested_timeout if timeout is None else min(timeout, requested_timeout)
+            except ValueError:
+                pass
+        token = _deadline.set(None if timeout is None else time.monotonic() + timeout)
+
+        # 본문을 먼저 모두 읽어 앱에는 재생(replay)해 준다
+        body = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                _deadline.reset(token)
+                return
+            body.append(message)
+            if not message.get("more_body"):
+                break
+
+        async def replay():
+            if body:
+                return body.pop(0)
+            # 앱이 본문 이후 receive() 를 부르면 연결 끊김을 기다리게 된다
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        disconnected = asyncio.Event()
+        responded = False
+
+        async def send_tracked(message):
+            nonlocal responded
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                responded = True
+            await send(message)
+
+        app_task = asyncio.create_task(self.app(scope, replay, send_tracked))
+
+        async def watch():
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                if not app_task.done() and not responded:
+                    logger.info("클라이언트 연결 끊김 — 요청 취소: %s %s", scope["method"], scope["path"])
+                    app_task.cancel()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                # 서버 종료 등 바깥에서의 취소
+                app_task.cancel()
+                raise
+        finally:
+            watcher.cancel()
+            _deadline.reset(token)
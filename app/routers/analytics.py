@@ -0,0 +1,73 @@
+# app/routers/analytics.py
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import get_session
+from app.dependencies import oauth2_scheme
+from app.exceptions import InvalidDateRangeException
+from app.models import User
+from app.routers.debug import require_admin
+from app.schemas import DailyUsage, PlugUsage, UserUsage
+from app.services import usage
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def date_range(
+    start: Optional[date] = Query(None, description="시작 날짜 (UTC, 포함). 기본: ANALYTICS_DEFAULT_DAYS 일 전"),
+    end: Optional[date] = Query(None, description="끝 날짜 (UTC, 포함). 기본: 오늘"),
+) -> Tuple[date, date]:
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=settings.ANALYTICS_DEFAULT_DAYS - 1)
+    if start > end:
+        raise InvalidDateRangeException("start is after end")
+    if (end - start).days + 1 > settings.ANALYTICS_MAX_DAYS:
+        raise InvalidDateRangeException(f"at most {settings.ANALYTICS_MAX_DAYS} days")
+    return start, end
+
+
+@router.get("/users", response_model=List[UserUsage],
+            summary="[Admin] 사용자별 플러그 사용 시간 (plug-hours)",
+            dependencies=[Security(oauth2_scheme)])
+async def usage_by_user(
+    period: Tuple[date, date] = Depends(date_range),
+    include_open: bool = Query(True, description="아직 열린 세션의 현재까지 사용량 포함"),
+    db: Session = Depends(get_session),
+    user: User = Depends(require_admin),
+):
+    return usage.by_user(db, *period, include_open=include_open)
+
+
+@router.get("/plugs", response_model=List[PlugUsage],
+            summary="[Admin] 플러그별 사용 시간 (plug-hours)",
+            dependencies=[Security(oauth2_scheme)])
+async def usage_by_plug(
+    period: Tuple[date, date] = Depends(date_range),
+    include_open: bool = Query(True, description="아직 열린 세션의 현재까지 사용량 포함"),
+    db: Session = Depends(get_session),
+    user: User = Depends(require_admin),
+):
+    return usage.by_plug(db, *period, include_open=include_open)
+
+
+@router.get("/daily", response_model=List[DailyUsage],
+            summary="[Admin] 날짜별 사용 시간 (전체 / 사용자 / 플러그)",
+            dependencies=[Security(oauth2_scheme)])
+async def usage_daily(
+    period: Tuple[date, date] = Depends(date_range),
+    user_id: Optional[int] = Query(None, description="이 사용자의 사용량만"),
+    plug: Optional[str] = Query(None, description="이 플러그의 사용량만"),
+    include_open: bool = Query(True, description="아직 열린 세션의 현재까지 사용량 포함"),
+    db: Session = Depends(get_session),
+    user: User = Depends(require_admin),
+):
+    if user_id is not None and plug is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Filter by user_id or plug, not both"
+        )
+    return usage.daily(db, *period, user_id=user_id, plug_name=plug, include_open=include_open)
@@ -1,6 +1,8 @@
 # app/routers/auth.py
 import logging
+import uuid
 from datetime import timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordRequestForm
@@ -8,13 +10,47 @@ from sqlalchemy.orm import Session
 
 from app.db import get_session
 from app.models import User
-from app.services.auth import authenticate_user, create_access_token
+from app.schemas import LogoutRequest, RefreshRequest
+from app.services.auth import (
+    authenticate_user,
+    create_access_token,
+    create_refresh_token,
+    token_expires_at,
+)
+from app.services.revocation import token_denylist
 from app.config import settings
+from app.timing import span
 
 router = APIRouter(tags=["auth"])
 logger = logging.getLogger(__name__)
 
 
+def _issue_tokens(user: User, family: Optional[str] = None) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    family = family or uuid.uuid4().hex
+    # role 은 DB 조회 전에 적용되는 역할별 요청 제한에 사용, fam 은 계열 폐기(refresh 재사용) 검사에 사용
+    token = create_access_token(
+        data={"sub": user.username, "role": user.role, "fam": family}, expires_delta=access_token_expires
+    )
+    # 토큰 반환 (OAuth2 표준 형식 + refresh_token)
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "refresh_token": create_refresh_token(user.username, family),
+    }
+
+
+def _decode(token: str) -> Optional[dict]:
+    from jose import JWTError, jwt
+
+    try:
+        with span("auth"):
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+
 @router.post("/login", summary="로그인 및 JWT 토큰 발급")
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -25,38 +61,73 @@ def login(
         raise HTTPException(
             status.HTTP_401_UNAUTHORIZED, "아이디 또는 비번이 틀렸습니다"
         )
+    return _issue_tokens(user)
 
-    # 토큰 생성
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    
-    # 토큰 반환 (OAuth2 표준 형식)
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    }
+
+@router.post("/refresh", summary="refresh 토큰으로 새 access 토큰 발급")
+def refresh(
+    body: RefreshRequest,
+    db: Session = Depends(get_session),
+):
+    payload = _decode(body.refresh_token)
+    if not payload or payload.get("type") != "refresh" or token_denylist.is_family_revoked(payload.get("fam")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked refresh token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    user = db.query(User).filter_by(username=payload.get("sub")).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    # 회전(rotation): 사용한 refresh 토큰을 폐기하고 새로 발급 — 폐기를 기록한 요청만 통과.
+    # 이미 쓴 토큰(동시 요청 포함)이 다시 오면 재사용으로 보고 계열 전체를 폐기한다
+    family = payload.get("fam")
+    if not token_denylist.revoke(db, payload["jti"], token_expires_at(payload)):
+        if family:
+            token_denylist.revoke_family(db, family)
+        logger.warning("refresh 토큰 재사용 감지: 사용자 '%s' 계열 폐기", payload.get("sub"))
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return _issue_tokens(user, family)
 
 
-@router.post("/logout", summary="로그아웃 (클라이언트에서 토큰 폐기)")
-def logout():
-    # 서버에서는 stateless하게 동작하므로 실제 토큰 폐기는 없음
-    # 클라이언트에서 토큰 삭제 필요
+@router.post("/logout", summary="로그아웃 (access/refresh 토큰 폐기)")
+def logout(
+    body: Optional[LogoutRequest] = None,
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(get_session),
+):
+    tokens = []
+    if authorization and authorization.startswith("Bearer "):
+        tokens.append(authorization.replace("Bearer ", ""))
+    if body and body.refresh_token:
+        tokens.append(body.refresh_token)
+
+    revoked = 0
+    for token in tokens:
+        payload = _decode(token)
+        # 이미 만료됐거나 jti 가 없는(이전 버전) 토큰은 폐기할 필요/방법이 없음
+        if payload and payload.get("jti"):
+            token_denylist.revoke(db, payload["jti"], token_expires_at(payload))
+            revoked += 1
+    logger.info("로그아웃: 토큰 %d개 폐기", revoked)
     return {"msg": "로그아웃 처리되었습니다"}
 
 
-def get_current_user(
+def get_token_payload(
     authorization: str | None = Header(default=None),
-    db: Session = Depends(get_session),
-) -> str:
+) -> dict:
     """
-    Authorization 헤더의 Bearer 토큰을 검증해서 username(sub) 리턴.
-    실패 시 401 예외를 던집니다.
+    Authorization 헤더의 Bearer 토큰을 검증해서 payload 리턴 (DB 조회 없음).
+    서명/만료/폐기 여부를 확인하며, 실패 시 401 예외를 던집니다.
     """
-    from jose import JWTError, jwt
-    
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
@@ -65,19 +136,40 @@ def get_current_user(
         )
     
     token = authorization.replace("Bearer ", "")
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
-            raise JWTError()
-    except JWTError:
+    payload = _decode(token)
+    if not payload or not payload.get("sub") or payload.get("type", "access") != "access":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Invalid token or expired token",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    
+    if token_denylist.is_revoked(payload.get("jti")) or token_denylist.is_family_revoked(payload.get("fam")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return payload
+
+
+def peek_token_payload(authorization: Optional[str]) -> Optional[dict]:
+    """get_token_payload 와 같은 검증이지만 실패하면 None (미들웨어용 — 인증 오류 응답은 라우터가 냄)."""
+    try:
+        return get_token_payload(authorization)
+    except HTTPException:
+        return None
+
+
+def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_session),
+) -> str:
+    """
+    검증된 토큰의 username(sub) 이 DB 에 존재하는지 확인해서 리턴.
+    실패 시 401 예외를 던집니다.
+    """
+    username: str = payload["sub"]
+
     # User 존재 여부 검증
     user = db.query(User).filter_by(username=username).first()
     if not user:
@@ -0,0 +1,86 @@
+# app/routers/debug.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status, Security
+
+from app.config import settings
+from app.models import User
+from app.routers.plugs import get_user_model
+from app.schemas import DeviceQueueStats, EdgeSiteStats, EventSubscriberStats, PlugDrift, ProfileDetail, ProfileSummary
+from app.services.device_queue import device_queues
+from app.services.edge_hub import edge_hub
+from app.services.events import event_bus
+from app.services.reconciler import reconciler
+from app.dependencies import oauth2_scheme
+from app.timing import slow_profiles
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def require_admin(user: User = Depends(get_user_model)) -> User:
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin only"
+        )
+    return user
+
+
+@router.get("/queues", response_model=List[DeviceQueueStats],
+            summary="[Admin] 플러그별 장치 명령 큐 깊이/대기 시간",
+            dependencies=[Security(oauth2_scheme)])
+async def queue_stats(user: User = Depends(require_admin)):
+    return device_queues.stats()
+
+
+@router.get("/drift", response_model=List[PlugDrift],
+            summary="[Admin] 플러그별 목표 상태와 어긋난 시간 (Reconciler)",
+            dependencies=[Security(oauth2_scheme)])
+async def drift_stats(user: User = Depends(require_admin)):
+    return reconciler.stats()
+
+
+@router.get("/events", response_model=List[EventSubscriberStats],
+            summary="[Admin] 이벤트 버스 구독자별 큐 깊이/버린 이벤트 수",
+            dependencies=[Security(oauth2_scheme)])
+async def event_stats(user: User = Depends(require_admin)):
+    return event_bus.stats()
+
+
+@router.get("/edge", response_model=List[EdgeSiteStats],
+            summary="[Admin] 사이트별 엣지 에이전트 연결 상태",
+            dependencies=[Security(oauth2_scheme)])
+async def edge_stats(user: User = Depends(require_admin)):
+    return edge_hub.stats()
+
+
+@router.get("/profiles", response_model=List[ProfileSummary],
+            summary="[Admin] 가장 느린 요청 목록 (PROFILING_ENABLED)",
+            dependencies=[Security(oauth2_scheme)])
+async def list_profiles(user: User = Depends(require_admin)):
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled (PROFILING_ENABLED=false)"
+        )
+    return slow_profiles.list()
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileDetail,
+            summary="[Admin] 느린 요청의 wall-clock 스택 샘플",
+            dependencies=[Security(oauth2_scheme)])
+async def get_profile(profile_id: int, user: User = Depends(require_admin)):
+    profile = slow_profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found"
+        )
+    return profile
+
+
+@router.delete("/profiles", status_code=204,
+               summary="[Admin] 수집된 프로파일 초기화",
+               dependencies=[Security(oauth2_scheme)])
+async def clear_profiles(user: User = Depends(require_admin)):
+    slow_profiles.clear()
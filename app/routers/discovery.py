@@ -0,0 +1,36 @@
+# app/routers/discovery.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status, Security
+
+from app.models import User
+from app.routers.plugs import get_user_model
+from app.schemas import DiscoveredPlug
+from app.dependencies import oauth2_scheme
+from app.services.discovery import plug_discovery
+from app.services.pyp100 import pyp100_service
+
+router = APIRouter(prefix="/discovery", tags=["plugs"])
+
+
+@router.get("/", response_model=List[DiscoveredPlug],
+            summary="[Admin] LAN 의 Tapo 장치 검색",
+            dependencies=[Security(oauth2_scheme)])
+async def scan_devices(user: User = Depends(get_user_model)):
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin only"
+        )
+    found = await plug_discovery.scan()
+    names_by_mac = {plug_discovery.mac_of(name): name for name in pyp100_service.plugs}
+    return [
+        DiscoveredPlug(
+            mac=mac,
+            ip=device.ip,
+            model=device.device_model,
+            device_type=device.device_type,
+            plug_name=names_by_mac.get(mac),
+        )
+        for mac, device in sorted(found.items(), key=lambda item: item[1].ip or "")
+    ]
@@ -0,0 +1,12 @@
+# app/routers/edge.py
+from fastapi import APIRouter, WebSocket
+
+from app.services.edge_hub import edge_hub
+
+router = APIRouter(prefix="/edge", tags=["edge"])
+
+
+@router.websocket("/ws")
+async def agent_link(websocket: WebSocket):
+    """사이트 엣지 에이전트의 업링크 (인증은 첫 hello 메시지의 사이트 토큰, EDGE_TOKENS)."""
+    await edge_hub.serve(websocket)
@@ -0,0 +1,100 @@
+# app/routers/groups.py
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, Security
+from sqlalchemy.orm import Session
+import logging
+
+from app.config import settings
+from app.db import get_session
+from app.models import User
+from app.exceptions import RateLimitedException
+from app.routers.auth import get_token_payload
+from app.routers.plugs import get_user_model
+from app.schemas import GroupCommand, GroupMember, GroupStatus
+from app.dependencies import oauth2_scheme
+from app.services.groups import plug_groups
+from app.services.reconciler import reconciler
+from app.services.ratelimit import rate_limiter, plug_checks, retry_after_seconds
+from app.services.sessions import acquire_many, release_many, count_active_many
+from app.services.state_cache import plug_state_cache
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/groups", tags=["groups"])
+
+
+async def group_rate_limit(name: str, payload: dict = Depends(get_token_payload)) -> None:
+    """그룹 명령은 멤버 플러그마다 사용자×플러그 / 장치 버킷을 함께 소비합니다."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    wait = rate_limiter.admit(plug_checks(payload["sub"], payload.get("role"), plug_groups.members(name)))
+    if wait:
+        logger.warning("요청 제한: 사용자 '%s' 그룹 %s (%.1f초 후 재시도)", payload["sub"], name, wait)
+        raise RateLimitedException(retry_after_seconds(wait))
+
+
+def group_status(db: Session, name: str) -> GroupStatus:
+    """
+    장치 조회 없이 상태 캐시 + 세션 수 쿼리 한 번으로 그룹 상태를 집계합니다.
+    멤버별 반영 대기·마지막 오류는 Reconciler 가 가진 값입니다.
+    """
+    members = plug_groups.members(name)
+    counts = count_active_many(db, members) if members else {}
+
+    rows: List[GroupMember] = []
+    on = off = unknown = in_use = 0
+    for plug in members:
+        status_on = plug_state_cache.status(plug)
+        if status_on is None:
+            unknown += 1
+        elif status_on:
+            on += 1
+        else:
+            off += 1
+        if counts[plug]:
+            in_use += 1
+        rows.append(GroupMember(
+            name=plug,
+            status=status_on,
+            active_users=counts[plug],
+            pending=reconciler.is_pending(plug),
+            error=reconciler.last_error(plug),
+        ))
+
+    return GroupStatus(
+        name=name, total=len(members), on=on, off=off, unknown=unknown,
+        in_use=in_use, members=rows,
+    )
+
+
+@router.get("/", response_model=Dict[str, List[str]], summary="플러그 그룹 목록",
+            dependencies=[Security(oauth2_scheme)])
+async def list_groups(user: User = Depends(get_user_model)):
+    return plug_groups.groups
+
+
+@router.get("/{name}", response_model=GroupStatus, summary="그룹 상태 조회",
+            dependencies=[Security(oauth2_scheme)])
+async def get_group(
+    name: str,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    return group_status(db, name)
+
+
+@router.post("/{name}", response_model=GroupStatus, summary="그룹 전체 사용 예약/해제",
+             dependencies=[Security(oauth2_scheme), Depends(group_rate_limit)])
+async def command_group(
+    name: str,
+    body: GroupCommand,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    members = plug_groups.members(name)
+    logger.info(f"그룹 {name} {body.action} 요청: 사용자 '{user.username}' (플러그 {len(members)}개)")
+    if body.action == "on":
+        await acquire_many(db, members, user.id, lease_seconds=settings.SESSION_LEASE_SECONDS or None)
+    else:
+        await release_many(db, members, user.id)
+    return group_status(db, name)
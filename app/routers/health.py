@@ -1,8 +1,34 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from app.config import settings
+from app.db import SessionLocal
+from app.services.pyp100 import pyp100_service
 
 router = APIRouter()
 
 @router.get("/healthz", summary="헬스체크")
 async def health_check():
     return {"status": "ok", "env": settings.APP_ENV}
+
+@router.get("/readyz", summary="준비 상태 (DB + 플러그 연결 예열)")
+async def readiness_check():
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+        db_ok = True
+    except Exception:
+        db_ok = False
+
+    warm = pyp100_service.warm_fraction
+    required = settings.READY_WARM_FRACTION if settings.PREWARM_ENABLED else 0.0
+    ready = db_ok and warm >= required
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "db": db_ok,
+            "warm": round(warm, 2),
+            "required": required,
+        },
+    )
@@ -1,21 +1,36 @@
 # app/routers/plugs.py
 
-from typing       import List
-from fastapi      import APIRouter, Depends, HTTPException, status, Security
+import asyncio
+import time
+from typing       import List, Literal, Optional
+from fastapi      import APIRouter, Depends, HTTPException, Query, Request, status, Security
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 import logging
 
+from app.log import event
 from app.db       import get_session
 from app.models   import PlugSession, User
-from app.routers.auth import get_current_user
+from app.routers.auth import get_current_user, get_token_payload
 from app.services.pyp100 import pyp100_service
-from app.schemas  import PlugInfo, PlugStatus
+from app.services import plug_listing
+from app.services.plug_listing import decode_cursor
+from app.services.groups import plug_groups
+from app.services.sessions import acquire, release, clear, count_active, list_users, list_users_many
+from app.services.state_cache import plug_state_cache
+from app.services.change_feed import plug_changes
+from app.services.leases import lease_manager
+from app.services.ratelimit import rate_limiter, plug_checks, retry_after_seconds
+from app.config   import settings
+from app.schemas  import PlugInfo, PlugChanges, PlugStatus, HeartbeatResult
 from app.dependencies import oauth2_scheme
 from app.exceptions import (
     PlugNotFoundException,
     PlugAlreadyInUseException,
     PlugNotInUseException,
-    TapoConnectionException
+    TapoConnectionException,
+    RateLimitedException,
+    DeviceDeadlineException,
 )
 
 logger = logging.getLogger(__name__)
@@ -39,104 +54,186 @@ def get_user_model(
     return user
 
 
+async def plug_rate_limit(name: str, payload: dict = Depends(get_token_payload)) -> None:
+    """
+    플러그 요청 제한 (사용자 / 사용자×플러그 / 장치 토큰 버킷).
+    토큰만 보고 판단하므로 DB 조회나 장치 핸드셰이크 전에 거절됩니다.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    wait = rate_limiter.admit(plug_checks(payload["sub"], payload.get("role"), [name]))
+    if wait:
+        logger.warning("요청 제한: 사용자 '%s' 플러그 %s (%.1f초 후 재시도)", payload["sub"], name, wait)
+        raise RateLimitedException(retry_after_seconds(wait))
+
+
 def get_plug_or_404(name: str):
     if name not in pyp100_service.plugs:
         raise PlugNotFoundException(name)
 
 
-def count_active(db: Session, name: str) -> int:
-    return db.query(PlugSession).filter_by(plug_name=name).count()
+@router.get("/", response_model=List[PlugInfo], summary="플러그 목록 조회 (커서 페이지, 필터)",
+            dependencies=[Security(oauth2_scheme)])
+async def list_plugs(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor 헤더 값"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PLUG_LIST_MAX_PAGE_SIZE,
+                                 description="페이지 크기 (기본 PLUG_LIST_PAGE_SIZE)"),
+    prefix: Optional[str] = Query(None, description="이름 접두어 (예: 책상/)"),
+    state: Optional[Literal["on", "off", "unreachable"]] = Query(
+        None, description="마지막으로 관측한 상태 (unreachable = 통신 실패 또는 미확인)"),
+    mine: bool = Query(False, description="내가 사용 중인 플러그만"),
+    group: Optional[str] = Query(None, description="PLUG_GROUPS 그룹의 멤버만"),
+    fresh: bool = Query(False, description="이 페이지의 플러그를 장치에 바로 조회 (기본: 상태 캐시)"),
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    """
+    이름순 페이지. 다음 페이지가 있으면 X-Next-Cursor / Link(rel="next") 헤더가 붙습니다.
+    상태는 상태 캐시에서 읽고, CHANGE_FEED_REFRESH_SECONDS 보다 오래된 플러그는 백그라운드로 다시 조회합니다.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    members = set(plug_groups.members(group)) if group else None
+    held = None
+    if mine:
+        held = {name for (name,) in db.query(PlugSession.plug_name).filter_by(user_id=user.id)}
+
+    def wanted(name: str) -> bool:
+        if members is not None and name not in members:
+            return False
+        if held is not None and name not in held:
+            return False
+        return state is None or plug_state_cache.matches(name, state)
+
+    try:
+        plugs = pyp100_service.plugs
+        filtered = members is not None or held is not None or state is not None
+        names, next_cursor = plug_listing.page(after, limit or settings.PLUG_LIST_PAGE_SIZE, prefix,
+                                               wanted if filtered else None)
+        event(logger, "plugs.list", user=user.username, user_id=user.id, plugs=len(names),
+              cursor=bool(cursor), more=next_cursor is not None)
+
+        # 1) 상태 — 기본은 상태 캐시 (오래된 것만 백그라운드 재조회), fresh 면 이 페이지만 장치에 동시 조회
+        if fresh:
+            async def plug_state(name: str):
+                cached = plug_state_cache.get(name)
+                if cached is not None and not pyp100_service.is_warm(name):
+                    # 아직 연결이 없는 플러그(재시작 직후 등)는 마지막 상태를 바로 보여주고 갱신은 백그라운드로
+                    pyp100_service.refresh_later(name)
+                    return cached.status
+                try:
+                    return await pyp100_service.get_status(name)
+                except Exception as e:
+                    logger.error("Failed to get status for plug %s: %s", name, e)
+                    return None
+
+            statuses = await asyncio.gather(*(plug_state(name) for name in names))
+        else:
+            stale_before = time.time() - settings.CHANGE_FEED_REFRESH_SECONDS
+            statuses = []
+            for name in names:
+                updated_at = plug_state_cache.updated_at(name)
+                if updated_at is None or updated_at < stale_before:
+                    pyp100_service.refresh_later(name)
+                statuses.append(plug_state_cache.status(name))
 
+        # 2) 참여자 목록 — 이 페이지의 플러그만, 한 번의 쿼리로
+        try:
+            users_by_plug = list_users_many(db, names) if names else {}
+        except Exception as e:
+            logger.error("Failed to get users for plugs: %s", e)
+            users_by_plug = {}
 
-def create_session(db: Session, name: str, user_id: int) -> bool:
-    # 해당 사용자가 이미 해당 플러그를 사용 중인지 확인
-    exists = db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
-    
-    # 이미 사용 중이면 새로 추가하지 않고 성공으로 반환
-    if exists:
-        logger.info(f"사용자(ID: {user_id})가 이미 플러그 '{name}'을 사용 중입니다.")
-        return True
-    
-    # 신규 세션 추가
-    logger.info(f"사용자(ID: {user_id})가 새로 플러그 '{name}'을 사용합니다.")
-    sess = PlugSession(plug_name=name, user_id=user_id)
-    db.add(sess)
-    db.commit()
-    return True
+        # 페이지 크기만큼의 행을 그대로 직렬화 (PlugInfo 와 같은 모양, 행마다 모델 검증은 하지 않음)
+        rows = []
+        for name, status_on in zip(names, statuses):
+            users = users_by_plug.get(name, [])
+            rows.append({"name": name, "ip": plugs[name], "status": status_on,
+                         "active_users": len(users), "users": users})
 
+        if not plugs:
+            logger.warning("No plugs found in the service")
+    except Exception as e:
+        logger.error(f"Failed to list plugs: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="플러그 목록을 불러오는데 실패했습니다"
+        )
 
-def delete_session(db: Session, name: str, user_id: int) -> bool:
-    sess = db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
-    if not sess:
-        raise PlugNotInUseException(name)
-    
-    db.delete(sess)
-    db.commit()
-    return True
+    headers = {}
+    if next_cursor is not None:
+        url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{url.path}?{url.query}>; rel="next"'
+    return JSONResponse(rows, headers=headers)
 
 
-@router.get("/", response_model=List[PlugInfo], summary="플러그 목록 조회", 
+@router.get("/changes", response_model=PlugChanges, summary="플러그 목록 변경분 조회",
             dependencies=[Security(oauth2_scheme)])
-async def list_plugs(
+async def list_plug_changes(
+    since: Optional[int] = Query(None, description="이전 응답의 version (없으면 전체 목록)"),
     db: Session = Depends(get_session),
     user: User = Depends(get_user_model),
 ):
-    result: List[PlugInfo] = []
+    """
+    since 이후 상태나 사용자 목록이 바뀐 플러그만 돌려줍니다.
+    장치와 통신하지 않고 상태 캐시를 읽으며, 오래된 관측값은 백그라운드로 다시 조회해
+    바뀌면 다음 요청의 변경분에 나타납니다.
+    """
+    plugs = pyp100_service.plugs
+
+    # 장치 재조회 예약 — 클라이언트 수와 관계없이 플러그당 CHANGE_FEED_REFRESH_SECONDS 에 한 번
+    stale_before = time.time() - settings.CHANGE_FEED_REFRESH_SECONDS
+    for name in plugs:
+        cached = plug_state_cache.get(name)
+        if cached is None or cached.updated_at < stale_before:
+            pyp100_service.refresh_later(name)
+
+    # 버전과 변경 목록을 먼저 잡고 나서 읽는다 — 그 사이의 변경은 다음 요청에 다시 포함된다
+    version = plug_changes.version
+    changed = plug_changes.since(since) if since is not None else None
+    full = changed is None
+    names = list(plugs) if full else [name for name in changed if name in plugs]
+
     try:
-        logger.info(f"플러그 목록 조회: 사용자 '{user.username}' (ID: {user.id})")
-        
-        for name, ip in pyp100_service.plugs.items():
-            # 1) 상태 조회
-            try:
-                status_on = await pyp100_service.get_status(name)
-            except Exception as e:
-                logger.error(f"Failed to get status for plug {name}: {str(e)}")
-                status_on = None
-
-            # 2) 참여자 목록
-            try:
-                rows = (
-                    db.query(PlugSession, User.username)
-                    .join(User, PlugSession.user_id == User.id)
-                    .filter(PlugSession.plug_name == name)
-                    .all()
-                )
-                # 모든 사용자 이름을 문자열로 변환하여 저장
-                users = [str(uname).strip() for _, uname in rows]
-                logger.info(f"플러그 {name} 사용자 목록: {users}")
-                
-                # 현재 사용자가 플러그를 사용 중인지 확인 - 문자열 타입으로 비교
-                current_username = str(user.username).strip()
-                is_using = current_username in users
-                logger.info(f"사용자 '{current_username}'가 '{name}' 플러그 사용 중: {is_using}")
-                logger.debug(f"사용자 비교 상세: 현재={current_username}, 목록={users}, 타입={type(current_username)}")
-                
-            except Exception as e:
-                logger.error(f"Failed to get users for plug {name}: {str(e)}")
-                users = []
-
-            result.append(PlugInfo(
-                name=name,
-                ip=ip,
-                status=status_on,
-                active_users=len(users),
-                users=users,
-            ))
-        
-        if not result:
-            logger.warning("No plugs found in the service")
-        return result
+        users_by_plug = list_users_many(db, names) if names else {}
     except Exception as e:
-        logger.error(f"Failed to list plugs: {str(e)}")
+        logger.error("Failed to get users for plugs: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="플러그 목록을 불러오는데 실패했습니다"
         )
 
+    event(logger, "plugs.changes", logging.DEBUG, user=user.username, since=since,
+          version=version, full=full, plugs=len(names))
+    return PlugChanges(
+        version=version,
+        full=full,
+        plugs=[
+            PlugInfo(
+                name=name,
+                ip=plugs[name],
+                status=plug_state_cache.status(name),
+                active_users=len(users_by_plug.get(name, [])),
+                users=users_by_plug.get(name, []),
+            )
+            for name in names
+        ],
+    )
 
-@router.post("/{name}/on", response_model=PlugStatus, status_code=201, 
-             summary="플러그 사용 예약 및 ON", 
+
+@router.post("/heartbeat", response_model=HeartbeatResult, status_code=200,
+             summary="세션 임대 연장 (대시보드 heartbeat)",
              dependencies=[Security(oauth2_scheme)])
+async def heartbeat(user: User = Depends(get_user_model)):
+    # 메모리에서만 연장하고 DB 반영은 LeaseManager 가 모아서 flush
+    renewed = lease_manager.heartbeat(user.id, settings.SESSION_LEASE_SECONDS)
+    return HeartbeatResult(renewed=renewed, lease_seconds=settings.SESSION_LEASE_SECONDS)
+
+
+@router.post("/{name:path}/on", response_model=PlugStatus, status_code=201, 
+             summary="플러그 사용 예약 및 ON", 
+             dependencies=[Security(oauth2_scheme), Depends(plug_rate_limit)])
 async def reserve_on(
     name: str,
     db: Session = Depends(get_session),
@@ -144,40 +241,18 @@ async def reserve_on(
 ):
     get_plug_or_404(name)
     try:
-        logger.info(f"플러그 {name} 사용 예약 요청: 사용자 '{user.username}' (ID: {user.id})")
-        created = create_session(db, name, user.id)
-        
-        # 현재 active 세션 수 계산
-        active = count_active(db, name)
-        
-        # 방금 추가된 사용자를 포함한 모든 사용자 목록 가져오기
-        rows = (
-            db.query(PlugSession, User.username)
-            .join(User, PlugSession.user_id == User.id)
-            .filter(PlugSession.plug_name == name)
-            .all()
-        )
-        users_list = [str(uname).strip() for _, uname in rows]
-        logger.info(f"플러그 {name}의 현재 사용자 목록: {users_list}")
-        
-        # 첫 번째 사용자인 경우 플러그 켜기
-        if created and active == 1:
-            logger.info(f"플러그 {name}를 ON으로 전환 (첫 번째 사용자)")
-            await pyp100_service.turn_on(name)
-        else:
-            logger.info(f"플러그 {name}는 이미 사용 중 (총 {active}명)")
-            
-        return PlugStatus(name=name, status=True, active_users=active, users=users_list)
+        event(logger, "plug.reserve", plug=name, user=user.username, user_id=user.id)
+        return await acquire(db, name, user.id, lease_seconds=settings.SESSION_LEASE_SECONDS or None)
     except Exception as e:
-        if isinstance(e, (PlugAlreadyInUseException, PlugNotFoundException)):
+        if isinstance(e, (PlugAlreadyInUseException, PlugNotFoundException, DeviceDeadlineException)):
             raise
-        logger.error(f"플러그 {name} 사용 예약 실패: {str(e)}")
+        logger.error("플러그 %s 사용 예약 실패: %s", name, e)
         raise TapoConnectionException(name, str(e))
 
 
-@router.post("/{name}/off", response_model=PlugStatus, status_code=200, 
+@router.post("/{name:path}/off", response_model=PlugStatus, status_code=200, 
             summary="플러그 예약 해제 및 OFF", 
-            dependencies=[Security(oauth2_scheme)])
+            dependencies=[Security(oauth2_scheme), Depends(plug_rate_limit)])
 async def release_off(
     name: str,
     db: Session = Depends(get_session),
@@ -185,39 +260,18 @@ async def release_off(
 ):
     get_plug_or_404(name)
     try:
-        logger.info(f"플러그 {name} 사용 해제 요청: 사용자 '{user.username}' (ID: {user.id})")
-        delete_session(db, name, user.id)
-        active = count_active(db, name)
-        status_on = True
-        
-        # 남은 사용자 목록 가져오기
-        rows = (
-            db.query(PlugSession, User.username)
-            .join(User, PlugSession.user_id == User.id)
-            .filter(PlugSession.plug_name == name)
-            .all()
-        )
-        users_list = [str(uname).strip() for _, uname in rows]
-        logger.info(f"플러그 {name}의 남은 사용자 목록: {users_list}")
-        
-        if active == 0:
-            logger.info(f"플러그 {name}를 OFF로 전환 (마지막 사용자 해제)")
-            await pyp100_service.turn_off(name)
-            status_on = False
-        else:
-            logger.info(f"플러그 {name}는 여전히 사용 중 (남은 사용자 {active}명)")
-            
-        return PlugStatus(name=name, status=status_on, active_users=active, users=users_list)
+        event(logger, "plug.release", plug=name, user=user.username, user_id=user.id)
+        return await release(db, name, user.id)
     except Exception as e:
-        if isinstance(e, (PlugNotInUseException, PlugNotFoundException)):
+        if isinstance(e, (PlugNotInUseException, PlugNotFoundException, DeviceDeadlineException)):
             raise
-        logger.error(f"플러그 {name} 사용 해제 실패: {str(e)}")
+        logger.error("플러그 %s 사용 해제 실패: %s", name, e)
         raise TapoConnectionException(name, str(e))
 
 
-@router.get("/{name}/status", response_model=PlugStatus, status_code=200, 
+@router.get("/{name:path}/status", response_model=PlugStatus, status_code=200, 
            summary="플러그 상태 조회", 
-           dependencies=[Security(oauth2_scheme)])
+           dependencies=[Security(oauth2_scheme), Depends(plug_rate_limit)])
 async def plug_status(
     name: str,
     db: Session = Depends(get_session),
@@ -229,20 +283,16 @@ async def plug_status(
         active = count_active(db, name)
         
         # 사용자 목록 가져오기
-        rows = (
-            db.query(PlugSession, User.username)
-            .join(User, PlugSession.user_id == User.id)
-            .filter(PlugSession.plug_name == name)
-            .all()
-        )
-        users_list = [str(uname).strip() for _, uname in rows]
+        users_list = list_users(db, name)
         
         return PlugStatus(name=name, status=status_on, active_users=active, users=users_list)
+    except DeviceDeadlineException:
+        raise
     except Exception as e:
         raise TapoConnectionException(name, str(e))
 
 
-@router.delete("/{name}/sessions", status_code=204, 
+@router.delete("/{name:path}/sessions", status_code=204, 
               summary="[Admin] 모든 세션 초기화", 
               dependencies=[Security(oauth2_scheme)])
 async def force_clear(
@@ -256,8 +306,6 @@ async def force_clear(
             detail="Admin only"
         )
     try:
-        db.query(PlugSession).filter_by(plug_name=name).delete()
-        db.commit()
-        await pyp100_service.turn_off(name)
+        await clear(db, name)
     except Exception as e:
         raise TapoConnectionException(name, str(e))
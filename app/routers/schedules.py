@@ -0,0 +1,113 @@
+# app/routers/schedules.py
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status, Security
+from sqlalchemy.orm import Session
+import logging
+
+from app.db import get_session
+from app.models import PlugSchedule, User
+from app.routers.plugs import get_user_model, get_plug_or_404
+from app.schemas import ScheduleCreate, ScheduleInfo
+from app.dependencies import oauth2_scheme
+from app.exceptions import InvalidScheduleException, ScheduleNotFoundException
+from app.services.scheduler import (
+    plug_scheduler,
+    next_run,
+    parse_time_of_day,
+    weekdays_to_mask,
+    mask_to_weekdays,
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/schedules", tags=["schedules"])
+
+
+def to_schedule_info(sched: PlugSchedule) -> ScheduleInfo:
+    return ScheduleInfo(
+        id=sched.id,
+        plug_name=sched.plug_name,
+        username=sched.user.username if sched.user else "",
+        action=sched.action,
+        time_of_day=sched.time_of_day,
+        weekdays=mask_to_weekdays(sched.weekdays or 0),
+        run_at=sched.run_at,
+        next_run_at=sched.next_run_at,
+        last_run_at=sched.last_run_at,
+        enabled=bool(sched.enabled),
+    )
+
+
+@router.get("/", response_model=List[ScheduleInfo], summary="스케줄 목록 조회",
+            dependencies=[Security(oauth2_scheme)])
+async def list_schedules(
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    query = db.query(PlugSchedule)
+    # 관리자는 전체, 일반 사용자는 본인 스케줄만
+    if user.role != "admin":
+        query = query.filter_by(user_id=user.id)
+    return [to_schedule_info(s) for s in query.order_by(PlugSchedule.id).all()]
+
+
+@router.post("/", response_model=ScheduleInfo, status_code=201,
+             summary="플러그 ON/OFF 스케줄 등록",
+             dependencies=[Security(oauth2_scheme)])
+async def create_schedule(
+    body: ScheduleCreate,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    get_plug_or_404(body.plug_name)
+
+    if bool(body.time_of_day) == bool(body.run_at):
+        raise InvalidScheduleException("time_of_day(반복) 또는 run_at(1회) 중 하나만 지정하세요")
+
+    run_at = body.run_at
+    if run_at is not None and run_at.tzinfo is not None:
+        run_at = run_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if body.time_of_day:
+        parse_time_of_day(body.time_of_day)
+
+    sched = PlugSchedule(
+        plug_name=body.plug_name,
+        user_id=user.id,
+        action=body.action,
+        time_of_day=body.time_of_day,
+        weekdays=weekdays_to_mask(body.weekdays),
+        run_at=run_at,
+        enabled=True,
+    )
+    sched.next_run_at = next_run(sched, datetime.utcnow())
+    if sched.next_run_at is None:
+        raise InvalidScheduleException("실행될 시각이 없습니다 (이미 지난 시각이거나 요일이 비어 있음)")
+
+    db.add(sched)
+    db.commit()
+    db.refresh(sched)
+    plug_scheduler.schedule(sched.id, sched.next_run_at)
+    logger.info(f"스케줄 #{sched.id} 등록: '{sched.plug_name}' {sched.action} "
+                f"(사용자 '{user.username}', 다음 실행 {sched.next_run_at})")
+    return to_schedule_info(sched)
+
+
+@router.delete("/{schedule_id}", status_code=204, summary="스케줄 삭제",
+               dependencies=[Security(oauth2_scheme)])
+async def delete_schedule(
+    schedule_id: int,
+    db: Session = Depends(get_session),
+    user: User = Depends(get_user_model),
+):
+    sched = db.get(PlugSchedule, schedule_id)
+    if sched is None:
+        raise ScheduleNotFoundException(schedule_id)
+    if sched.user_id != user.id and user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not the owner of this schedule"
+        )
+    db.delete(sched)
+    db.commit()
+    plug_scheduler.unschedule(schedule_id)
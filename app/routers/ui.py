@@ -6,10 +6,12 @@ from typing import Optional
 from jose import JWTError, jwt
 import logging
 
+from app.assets import asset_url
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
 ui = APIRouter()
 
 
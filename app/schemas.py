@@ -1,5 +1,6 @@
 # app/schemas.py
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 
 class PlugInfo(BaseModel):
@@ -14,3 +15,144 @@ class PlugStatus(BaseModel):
     status: bool
     active_users: int
     users: Optional[List[str]] = None  # 사용자 목록도 포함하여 UI에서 버튼 활성화 판단에 사용
+    lease_expires_at: Optional[datetime] = None  # 요청 사용자의 세션 임대 만료 시각 (UTC)
+    pending: bool = False  # 목표 상태가 아직 장치에 반영되지 않음 (Reconciler 가 처리 중)
+
+class PlugChanges(BaseModel):
+    version: int                # 다음 요청의 since 로 사용
+    full: bool                  # True = 전체 목록 (커서가 없거나 너무 오래됨) → 목록을 통째로 교체
+    plugs: List[PlugInfo]       # full 이 아니면 since 이후 바뀐 플러그만
+
+class HeartbeatResult(BaseModel):
+    renewed: int
+    lease_seconds: int
+
+
+class ScheduleCreate(BaseModel):
+    plug_name: str
+    action: Literal["on", "off"]
+    time_of_day: Optional[str] = None      # "HH:MM" — 반복 스케줄
+    weekdays: List[int] = [0, 1, 2, 3, 4, 5, 6]   # 0=월 … 6=일
+    run_at: Optional[datetime] = None      # 1회성 스케줄 (UTC)
+
+class ScheduleInfo(BaseModel):
+    id: int
+    plug_name: str
+    username: str
+    action: str
+    time_of_day: Optional[str]
+    weekdays: List[int]
+    run_at: Optional[datetime]
+    next_run_at: Optional[datetime]
+    last_run_at: Optional[datetime]
+    enabled: bool
+
+
+class DiscoveredPlug(BaseModel):
+    mac: str
+    ip: str
+    model: Optional[str] = None
+    device_type: Optional[str] = None
+    plug_name: Optional[str] = None     # PLUGS 에 등록된 이름 (없으면 미등록 장치)
+
+
+class StackSample(BaseModel):
+    stack: str                      # 'file:func:line;...' 바깥 → 안쪽
+    count: int
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    status: int
+    started_at: datetime
+    duration_ms: float
+    spans: Dict[str, float]
+    samples: int
+
+class ProfileDetail(ProfileSummary):
+    stacks: List[StackSample]
+
+
+class DeviceQueueStats(BaseModel):
+    plug: str
+    busy: bool
+    depth: int                      # 대기 중인 호출 수
+    served: int
+    expired: int                    # deadline 초과로 장치에 보내지 않고 버린 호출
+    cancelled: int                  # 대기 중 취소된 호출 (클라이언트 연결 끊김 등)
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class PlugDrift(BaseModel):
+    plug: str
+    desired: bool
+    observed: Optional[bool] = None         # 상태 캐시 (None = 모름/통신 실패)
+    pending: bool                           # 목표가 아직 장치에 반영되지 않음
+    out_of_sync_seconds: float              # 지금 어긋나 있는 시간
+    drift_count: int
+    drift_total_seconds: float
+    drift_max_seconds: float
+    attempts: int
+    next_attempt_seconds: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class GroupCommand(BaseModel):
+    action: Literal["on", "off"]
+
+class GroupMember(BaseModel):
+    name: str
+    status: Optional[bool]          # 상태 캐시 기준, None = 미확인/통신 실패
+    active_users: int
+    pending: bool = False           # 목표가 아직 장치에 반영되지 않음 (Reconciler 재시도 중)
+    error: Optional[str] = None     # 마지막 반영 실패 사유
+
+class GroupStatus(BaseModel):
+    name: str
+    total: int
+    on: int
+    off: int
+    unknown: int
+    in_use: int                     # 세션이 하나 이상 있는 플러그 수
+    members: List[GroupMember]
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+class UserUsage(BaseModel):
+    user_id: int
+    username: str
+    hours: float                # 기간 안의 plug-hours (플러그 여러 개를 함께 쓰면 합산)
+    sessions: int               # 기간 안에 시작된 세션 수
+
+class PlugUsage(BaseModel):
+    plug_name: str
+    hours: float                # 사용자 수만큼 겹쳐 센 plug-hours
+
+class DailyUsage(BaseModel):
+    day: date                   # UTC 날짜
+    hours: float
+
+class EdgeSiteStats(BaseModel):
+    site: str
+    connected: bool
+    plugs: int                                  # 중앙 설정에서 이 사이트에 속한 플러그 수
+    connected_seconds: Optional[float] = None
+    last_seen_seconds: Optional[float] = None   # 마지막 메시지 이후
+    pending_calls: int                          # 응답을 기다리는 명령
+    calls: int
+
+
+class EventSubscriberStats(BaseModel):
+    name: str
+    policy: Literal["drop", "block"]
+    depth: int                  # 구독자 큐에 쌓인 이벤트 수
+    maxsize: int
+    delivered: int
+    dropped: int                # 큐가 차서 버린 이벤트 수
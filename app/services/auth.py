@@ -1,6 +1,7 @@
 # app/services/auth.py
 
 import datetime
+import uuid
 from typing import Optional
 
 from passlib.context import CryptContext
@@ -47,15 +48,31 @@ def authenticate_user(
 # -------------------------------------------------------------------
 def create_access_token(
     data: dict,
-    expires_delta: Optional[datetime.timedelta] = None
+    expires_delta: Optional[datetime.timedelta] = None,
+    token_type: str = "access",
 ) -> str:
     to_encode = data.copy()
     expire = datetime.datetime.utcnow() + (
         expires_delta or datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    # jti: 로그아웃 시 이 토큰만 폐기할 수 있도록 토큰마다 고유 ID
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": token_type})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+
+def create_refresh_token(username: str, family: Optional[str] = None) -> str:
+    """family: 회전 전 토큰의 계열(fam). 없으면(로그인) 새 계열을 시작합니다."""
+    return create_access_token(
+        data={"sub": username, "fam": family or uuid.uuid4().hex},
+        expires_delta=datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        token_type="refresh",
+    )
+
+
+def token_expires_at(payload: dict) -> datetime.datetime:
+    """payload 의 exp(epoch) → naive UTC datetime"""
+    return datetime.datetime.utcfromtimestamp(payload["exp"])
+
 # -------------------------------------------------------------------
 # 5) Dependency to get current user from token
 # -------------------------------------------------------------------
@@ -0,0 +1,60 @@
+# app/services/change_feed.py
+"""
+플러그 목록 변경 피드.
+
+플러그의 상태(상태 캐시의 관측값)나 사용자 목록(세션)이 바뀔 때마다 버전을 하나 올리고
+(버전, 플러그명) 을 크기 CHANGE_FEED_SIZE 의 메모리 로그에 남깁니다.
+GET /plugs/changes?since=<버전> 은 그 이후 바뀐 플러그만 돌려주므로, 대시보드의 주기적
+갱신 트래픽이 플러그 수가 아니라 변경 수에 비례합니다.
+
+커서가 로그 범위보다 오래됐거나 다른 프로세스(재시작 전)의 것이면 since() 가 None 을 돌려주고,
+호출자는 전체 목록을 다시 보냅니다. 버전 시작값을 시작 시각(µs)으로 잡아 재시작 전 커서는
+사실상 항상 범위 밖이 됩니다.
+"""
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+
+class PlugChangeFeed:
+    def __init__(self, size: Optional[int] = None):
+        self._base = time.time_ns() // 1000
+        self._version = self._base
+        self._log: Deque[Tuple[int, str]] = deque(maxlen=size or settings.CHANGE_FEED_SIZE)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def touch(self, name: str) -> int:
+        self._version += 1
+        self._log.append((self._version, name))
+        return self._version
+
+    def touch_many(self, names: Iterable[str]) -> int:
+        for name in names:
+            self.touch(name)
+        return self._version
+
+    def _floor(self) -> int:
+        """since() 가 답할 수 있는 가장 오래된 커서."""
+        if len(self._log) == self._log.maxlen:
+            return self._log[0][0] - 1
+        return self._base
+
+    def since(self, version: int) -> Optional[List[str]]:
+        """version 이후 바뀐 플러그명 (오래된 것부터, 중복 제거). 답할 수 없으면 None."""
+        if version > self._version or version < self._floor():
+            return None
+        if version == self._version:
+            return []
+        # 버전은 1씩 늘어나므로 뒤에서부터 (현재 - version) 개만 보면 된다
+        recent = [name for _, name in islice(reversed(self._log), self._version - version)]
+        return list(dict.fromkeys(reversed(recent)))
+
+
+# 싱글톤
+plug_changes = PlugChangeFeed()
@@ -0,0 +1,72 @@
+# app/services/deadlines.py
+"""
+deadline 기반 작업(스케줄러, 세션 임대, 토큰 폐기 목록)이 함께 쓰는 자료구조와 시간 helper.
+"""
+import heapq
+import itertools
+from datetime import datetime, timezone
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class DeadlineQueue:
+    """
+    (deadline, key) 최소 힙.
+    같은 key 를 다시 push 하면 이전 항목은 지연 삭제(lazy deletion)되므로
+    재등록과 취소가 모두 O(log n) 입니다.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def get(self, key: Hashable) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def push(self, key: Hashable, deadline: float) -> None:
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        # 재등록이 반복돼 무효 항목이 쌓이면 힙을 다시 만든다
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+
+    def discard(self, key: Hashable) -> None:
+        self._deadlines.pop(key, None)
+
+    def peek(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[float, Hashable]]:
+        """now 이전에 도래한 항목을 deadline 순으로 꺼냅니다."""
+        due: List[Tuple[float, Hashable]] = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            deadline, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            due.append((deadline, key))
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _compact(self) -> None:
+        self._heap = [
+            (deadline, next(self._counter), key)
+            for key, deadline in self._deadlines.items()
+        ]
+        heapq.heapify(self._heap)
+
+
+def to_timestamp(dt: datetime) -> float:
+    """DB 에 naive UTC 로 저장된 시각 → epoch seconds"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,131 @@
+# app/services/device_batch.py
+"""
+장치 메서드 묶음 요청 (multipleRequest).
+
+plugp100 5.1.4 의 turn_on() → update() 는 set_device_info, get_device_info 와 구성 요소별 조회
+(get_energy_usage, get_current_power, get_countdown_rules)를 각각 암호화된 HTTP 왕복으로 보냅니다.
+Tapo 펌웨어는 여러 메서드를 multipleRequest 한 번에 받아 순서대로 실행하므로, 명령과 뒤따르는
+상태 조회를 한 요청으로 묶어 사용자 동작 하나를 왕복 한 번으로 줄입니다.
+
+지원 여부는 플러그별로 처음 시도할 때 판별해 handshake_cache 에 기억합니다. 장치가 묶음 요청
+자체를 이해하지 못하면(UNSUPPORTED_CODES 오류 응답) 미지원으로 기록하고, 호출자는 기존의 개별 호출로 처리합니다.
+전송 오류(시간 초과, 연결 끊김)는 지원 여부와 무관하므로 그대로 올려 보냅니다.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.handshake_cache import handshake_cache
+
+logger = logging.getLogger(__name__)
+
+CAPABILITY = "multiple_request"
+# 펌웨어가 한 번에 받는 메서드 수 (python-kasa 등과 같은 보수적인 값)
+MAX_BATCH = 5
+# 묶음 요청 자체를 이해하지 못할 때의 오류 코드 (-40210 = method not supported)
+UNSUPPORTED_CODES = {-1, -1002, -1003, -1008, -40210}
+
+
+class BatchUnsupported(Exception):
+    """장치가 multipleRequest 를 처리하지 못함 — 개별 호출로 처리."""
+
+
+def supported(name: str, device) -> bool:
+    """묶음 요청을 시도할지 (미지원으로 판별된 플러그와 strip 의 자식 소켓은 제외)."""
+    if not settings.DEVICE_BATCH_ENABLED or getattr(device, "_child_id", None):
+        return False
+    return handshake_cache.capability(name, CAPABILITY) is not False
+
+
+def _refresh_requests(device) -> list:
+    """update() 가 보내는 조회들을 TapoRequest 로 (get_device_info 가 항상 첫 번째)."""
+    from plugp100.api.requests.tapo_request import TapoRequest
+    from plugp100.new.components.countdown import Countdown
+    from plugp100.new.components.energy_component import EnergyComponent
+
+    requests = [TapoRequest.get_device_info()]
+    if device.has_component(EnergyComponent):
+        requests += [TapoRequest.get_energy_usage(), TapoRequest.get_current_power()]
+    if device.has_component(Countdown):
+        requests.append(TapoRequest(method="get_countdown_rules", params={"start_index": 0}))
+    return requests
+
+
+async def _execute(name: str, device, requests: list) -> Dict[str, Any]:
+    """multipleRequest 를 보내고 {메서드명: 결과} 를 돌려줍니다."""
+    from plugp100.api.requests.tapo_request import MultipleRequestParams, TapoRequest
+    from plugp100.responses.tapo_exception import TapoException
+
+    requests = requests[:MAX_BATCH]
+    envelope = TapoRequest.multiple_request(MultipleRequestParams(requests))
+    result = await device.client.execute_raw_request(envelope)
+    if not result.is_success():
+        error = result.error()
+        if isinstance(error, TapoException) and error.error_code in UNSUPPORTED_CODES:
+            handshake_cache.set_capability(name, CAPABILITY, False)
+            logger.info("[DeviceBatch] '%s' multipleRequest 미지원 (%s) — 개별 요청으로 전환", name, error)
+            raise BatchUnsupported(str(error)) from error
+        raise error
+
+    responses = (result.get() or {}).get("responses")
+    if not isinstance(responses, list) or len(responses) != len(requests):
+        handshake_cache.set_capability(name, CAPABILITY, False)
+        raise BatchUnsupported(f"응답 형식이 다름: {str(result.get())[:200]}")
+
+    handshake_cache.set_capability(name, CAPABILITY, True)
+    results: Dict[str, Any] = {}
+    for response in responses:
+        method = response.get("method")
+        code = response.get("error_code", 0)
+        if code != 0:
+            results[method] = TapoException.from_error_code(code, response.get("msg"))
+        else:
+            results[method] = response.get("result", {})
+    return results
+
+
+async def _apply(device, results: Dict[str, Any]) -> None:
+    """묶음 응답으로 device.update() 와 같은 상태를 채웁니다 (구성 요소별 추가 왕복 없이)."""
+    from plugp100.new.components.countdown import Countdown, RuleTimer, TapoRuleList
+    from plugp100.new.components.energy_component import EnergyComponent
+    from plugp100.new.tapodevice import LastUpdate
+    from plugp100.responses.device_state import DeviceInfo
+    from plugp100.responses.energy_info import EnergyInfo
+    from plugp100.responses.power_info import PowerInfo
+
+    state = results.get("get_device_info")
+    if not isinstance(state, dict):
+        raise state if isinstance(state, Exception) else ValueError("get_device_info 응답 없음")
+
+    device._last_update = LastUpdate(
+        components=device.components, device_info=DeviceInfo(**state), raw_state=state
+    )
+    await device._update_from_state(state)
+    for component in device.get_device_components:
+        if isinstance(component, EnergyComponent):
+            energy, power = results.get("get_energy_usage"), results.get("get_current_power")
+            component._energy_usage = EnergyInfo(energy) if isinstance(energy, dict) else None
+            component._power_info = PowerInfo(power) if isinstance(power, dict) else None
+        elif isinstance(component, Countdown):
+            rules = results.get("get_countdown_rules")
+            if isinstance(rules, dict):
+                component._rules = TapoRuleList.from_json(rules, RuleTimer)
+        else:
+            await component.update(state)
+
+
+async def set_and_refresh(name: str, device, device_on: Optional[bool] = None) -> None:
+    """
+    (device_on 이 있으면) set_device_info 와 update() 에 해당하는 조회를 한 번에 보냅니다.
+    실패한 명령은 TapoException 으로 올리고, 미지원이면 BatchUnsupported.
+    """
+    from plugp100.api.requests.tapo_request import TapoRequest
+
+    requests: List = _refresh_requests(device)
+    if device_on is not None:
+        requests.insert(0, TapoRequest.set_device_info({"device_on": device_on}))
+    results = await _execute(name, device, requests)
+    command = results.get("set_device_info")
+    if isinstance(command, Exception):
+        raise command
+    await _apply(device, results)
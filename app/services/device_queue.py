@@ -0,0 +1,139 @@
+# app/services/device_queue.py
+"""
+플러그(장치)별 명령 큐.
+
+- 한 장치에는 한 번에 하나의 호출만 보냅니다 (기존 플러그별 lock 과 같은 역할).
+- 기다리는 호출은 (우선순위, 도착 순서) 로 정렬되어 ON/OFF 명령이 상태 조회보다 먼저 나갑니다.
+- 각 호출은 deadline(요청에서 물려받음)을 가지며, 차례가 오기 전에 deadline 이 지나면
+  장치에 보내지 않고 DeviceDeadlineException 으로 버립니다.
+- 기다리는 중에 취소되면(클라이언트 연결 끊김 등) 큐에서 빠지고 다음 호출에 차례를 넘깁니다.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional
+
+from app.exceptions import DeviceDeadlineException
+
+PRIORITY_COMMAND = 0
+PRIORITY_STATUS = 1
+
+
+class _Waiter:
+    __slots__ = ("future", "deadline", "enqueued")
+
+    def __init__(self, future: asyncio.Future, deadline: Optional[float]):
+        self.future = future
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+
+
+class DeviceQueue:
+    def __init__(self, name: str):
+        self.name = name
+        self._busy = False
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        # 지표
+        self.served = 0
+        self.expired = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for _, _, waiter in self._heap if not waiter.future.done())
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    async def acquire(self, priority: int, deadline: Optional[float] = None) -> None:
+        """deadline 은 time.monotonic() 기준 절대 시각 (None = 무제한)."""
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            self.expired += 1
+            raise DeviceDeadlineException(self.name)
+        if not self._busy and not self._heap:
+            self._busy = True
+            self._record_wait(0.0)
+            return
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), deadline)
+        heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+        timeout = None if deadline is None else deadline - now
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._granted(waiter):
+                return
+            self.expired += 1
+            raise DeviceDeadlineException(self.name)
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                # 차례를 받은 직후 취소됨 — 다음 호출에 넘긴다
+                self.release()
+            else:
+                self.cancelled += 1
+            raise
+
+    def _granted(self, waiter: _Waiter) -> bool:
+        """이미 차례를 받았으면 True, 아니면 대기를 취소하고 False."""
+        future = waiter.future
+        if future.done() and not future.cancelled() and future.exception() is None:
+            return True
+        future.cancel()
+        return False
+
+    def release(self) -> None:
+        now = time.monotonic()
+        while self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue            # 취소/시간 초과로 이미 떠난 대기자
+            if waiter.deadline is not None and now >= waiter.deadline:
+                # 장치에 보내기 전에 버린다
+                self.expired += 1
+                waiter.future.set_exception(DeviceDeadlineException(self.name))
+                continue
+            self._record_wait(now - waiter.enqueued)
+            waiter.future.set_result(None)
+            return
+        self._busy = False
+
+    def _record_wait(self, wait: float) -> None:
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> dict:
+        return {
+            "plug": self.name,
+            "busy": self._busy,
+            "depth": self.depth,
+            "served": self.served,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "avg_wait_ms": round(self.total_wait / self.served * 1000, 1) if self.served else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class DeviceQueues:
+    def __init__(self):
+        self._queues: Dict[str, DeviceQueue] = {}
+
+    def get(self, name: str) -> DeviceQueue:
+        queue = self._queues.get(name)
+        if queue is None:
+            queue = self._queues[name] = DeviceQueue(name)
+        return queue
+
+    def stats(self) -> List[dict]:
+        return [queue.stats() for _, queue in sorted(self._queues.items())]
+
+
+# 싱글톤
+device_queues = DeviceQueues()
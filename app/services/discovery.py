@@ -0,0 +1,248 @@
+# app/services/discovery.py
+"""
+Tapo 플러그 LAN 발견(discovery) 및 MAC → IP 캐시.
+
+- UDP 20002 로 Tapo 발견 패킷을 브로드캐스트하고, 제한 시간 안에 들어오는 응답을
+  asyncio DatagramProtocol 로 동시에 수집합니다 (스레드/블로킹 select 없음).
+- 플러그 이름 → MAC, MAC → IP 매핑을 JSON 파일(DISCOVERY_CACHE_PATH)에 보관해
+  재시작 후에도 DHCP 로 바뀐 주소를 그대로 사용합니다.
+- 동시에 여러 플러그가 연결에 실패해도 스캔은 한 번만 수행됩니다.
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from app.config import settings
+from app.services.change_feed import plug_changes
+
+if TYPE_CHECKING:   # plugp100 은 실제로 발견을 수행할 때 import (시작 시간 단축)
+    from plugp100.discovery.discovered_device import DiscoveredDevice
+    from plugp100.discovery.rsa_session import RSASession
+
+logger = logging.getLogger(__name__)
+
+_MAC = re.compile(r"^[0-9A-Fa-f]{2}([:-]?[0-9A-Fa-f]{2}){5}$")
+
+
+def is_mac(value: str) -> bool:
+    return bool(_MAC.match(value or ""))
+
+
+def normalize_mac(value: str) -> str:
+    """'aa:bb:cc:dd:ee:ff' / 'AABBCCDDEEFF' → 'AA-BB-CC-DD-EE-FF' (Tapo 응답 형식)"""
+    digits = re.sub(r"[^0-9A-Fa-f]", "", value or "").upper()
+    return "-".join(digits[i:i + 2] for i in range(0, len(digits), 2))
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, rsa: "RSASession", on_device):
+        self._rsa = rsa
+        self._on_device = on_device
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        from plugp100.discovery.discovered_device import DiscoveredDevice
+        from plugp100.discovery.rsa_session import _extract_payload_from_package_json
+
+        try:
+            payload = _extract_payload_from_package_json(data)
+            if payload.get("error_code"):
+                return
+            result = payload["result"]
+            result.setdefault("ip", addr[0])
+            # 일부 장치는 encrypt_info 아래에 암호화된 정보를 함께 보낸다
+            if encrypt_info := result.get("encrypt_info"):
+                from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+
+                key = self._rsa.decrypt(base64.b64decode(encrypt_info["key"]))
+                cipher = TpLinkCipherCryptography(key[0:16], key[16:32])
+                result["encrypt_info_clear"] = json.loads(cipher.decrypt(encrypt_info["data"]))
+            device = DiscoveredDevice.from_dict(result)
+        except Exception as e:
+            logger.debug(f"[Discovery] {addr} 응답 해석 실패: {e}")
+            return
+        if device.mac:
+            self._on_device(device)
+
+
+_rsa_session: Optional["RSASession"] = None
+
+
+async def _get_rsa_session() -> "RSASession":
+    # RSA 2048 키 생성은 수십 ms 가 걸리므로 한 번만, 이벤트 루프 밖에서 만든다
+    from plugp100.discovery.rsa_session import RSASession
+
+    global _rsa_session
+    if _rsa_session is None:
+        _rsa_session = await asyncio.get_running_loop().run_in_executor(None, RSASession)
+    return _rsa_session
+
+
+async def discover(
+    timeout: Optional[float] = None,
+    broadcast: Optional[str] = None,
+    port: Optional[int] = None,
+    wanted: Optional[Set[str]] = None,
+) -> Dict[str, "DiscoveredDevice"]:
+    """
+    발견 패킷을 보내고 timeout 동안 응답을 모읍니다. 결과는 {MAC: DiscoveredDevice}.
+    wanted(MAC 집합)를 모두 찾으면 제한 시간 전에 끝냅니다.
+    """
+    from plugp100.discovery.rsa_session import PKT_ONBOARD_REQUEST, _build_packet_for_payload_json
+
+    timeout = settings.DISCOVERY_TIMEOUT_SECONDS if timeout is None else timeout
+    broadcast = broadcast or settings.DISCOVERY_BROADCAST
+    port = port or settings.DISCOVERY_PORT
+
+    loop = asyncio.get_running_loop()
+    rsa = await _get_rsa_session()
+    packet = _build_packet_for_payload_json(
+        {"params": {"rsa_key": rsa.public_key}}, PKT_ONBOARD_REQUEST
+    )
+    found: Dict[str, "DiscoveredDevice"] = {}
+    complete = asyncio.Event()
+
+    def on_device(device: "DiscoveredDevice") -> None:
+        found[normalize_mac(device.mac)] = device
+        if wanted and wanted.issubset(found):
+            complete.set()
+
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _DiscoveryProtocol(rsa, on_device),
+        local_addr=("0.0.0.0", 0),
+        allow_broadcast=True,
+    )
+    try:
+        # UDP 유실에 대비해 제한 시간 안에서 세 번 보낸다
+        for attempt in range(3):
+            transport.sendto(packet, (broadcast, port))
+            try:
+                await asyncio.wait_for(complete.wait(), timeout / 3)
+                break
+            except asyncio.TimeoutError:
+                continue
+    finally:
+        transport.close()
+
+    logger.info(f"[Discovery] {broadcast}:{port} 에서 장치 {len(found)}개 발견")
+    return found
+
+
+class PlugDiscovery:
+    """플러그 이름 → MAC → IP 캐시와 중복 없는 재발견(re-resolve)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._loaded = False
+        self._plug_macs: Dict[str, str] = {}
+        self._devices: Dict[str, dict] = {}
+        self._scan_task: Optional[asyncio.Task] = None
+        self._last_scan = 0.0
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.DISCOVERY_CACHE_PATH
+
+    # ─── 캐시 ──────────────────────────────────────────────
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._plug_macs = dict(data.get("plugs", {}))
+            self._devices = dict(data.get("devices", {}))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[Discovery] 캐시 파일 읽기 실패 ({self.path}): {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"plugs": self._plug_macs, "devices": self._devices}, f,
+                          ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"[Discovery] 캐시 파일 저장 실패 ({self.path}): {e}")
+
+    def mac_of(self, name: str) -> Optional[str]:
+        self._ensure_loaded()
+        return self._plug_macs.get(name)
+
+    def ip_of(self, name: str) -> Optional[str]:
+        mac = self.mac_of(name)
+        device = self._devices.get(mac) if mac else None
+        return device.get("ip") if device else None
+
+    def pin(self, name: str, mac: str) -> None:
+        """설정(PLUGS)에서 MAC 으로 지정한 플러그를 등록합니다."""
+        self._ensure_loaded()
+        mac = normalize_mac(mac)
+        if self._plug_macs.get(name) != mac:
+            self._plug_macs[name] = mac
+            self._save()
+
+    def remember(self, name: str, mac: Optional[str], ip: str) -> None:
+        """연결에 성공한 플러그의 MAC/IP 를 기록합니다. 바뀐 것이 있을 때만 파일에 씁니다."""
+        if not mac:
+            return
+        self._ensure_loaded()
+        mac = normalize_mac(mac)
+        changed = self._plug_macs.get(name) != mac
+        self._plug_macs[name] = mac
+        device = self._devices.setdefault(mac, {})
+        if device.get("ip") != ip:
+            device["ip"] = ip
+            changed = True
+        if changed:
+            device["seen"] = time.time()
+            self._save()
+            plug_changes.touch(name)    # 목록의 ip 가 바뀜
+
+    # ─── 발견 ──────────────────────────────────────────────
+    async def scan(self, wanted: Optional[Set[str]] = None) -> Dict[str, "DiscoveredDevice"]:
+        """진행 중인 스캔이 있으면 그 결과를 함께 기다립니다."""
+        self._ensure_loaded()
+        if self._scan_task is None or self._scan_task.done():
+            self._scan_task = asyncio.create_task(discover(wanted=wanted))
+            self._last_scan = time.time()
+        found = await asyncio.shield(self._scan_task)
+        now = time.time()
+        changed = False
+        for mac, device in found.items():
+            entry = self._devices.setdefault(mac, {})
+            if entry.get("ip") != device.ip:
+                changed = True
+            entry.update(ip=device.ip, model=device.device_model,
+                         device_id=device.device_id, seen=now)
+        if changed:
+            self._save()
+        return found
+
+    async def resolve(self, name: str) -> Optional[str]:
+        """
+        연결 실패 시 호출: 브로드캐스트로 플러그의 현재 IP 를 다시 찾습니다.
+        MAC 을 모르는 플러그이거나 직전에 스캔했다면(DISCOVERY_MIN_INTERVAL_SECONDS) 캐시만 봅니다.
+        """
+        mac = self.mac_of(name)
+        if not mac:
+            return None
+        scanning = self._scan_task is not None and not self._scan_task.done()
+        if scanning or time.time() - self._last_scan >= settings.DISCOVERY_MIN_INTERVAL_SECONDS:
+            try:
+                await self.scan(wanted={mac})
+            except Exception as e:
+                logger.error(f"[Discovery] '{name}' 재발견 스캔 실패: {e}")
+        return self.ip_of(name)
+
+
+# 싱글톤
+plug_discovery = PlugDiscovery()
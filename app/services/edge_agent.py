@@ -0,0 +1,300 @@
+# app/services/edge_agent.py
+"""
+엣지 에이전트 (사이트 LAN 쪽, 실행은 edge_agent.py).
+
+사이트의 플러그 연결(Pyp100Service)을 이 프로세스가 맡고, 중앙 서버와는 WebSocket 하나(EDGE_CENTRAL_URL)로
+이어집니다. 메시지 형식은 services/edge_hub.py 참고.
+
+- 상태 캐시가 바뀔 때마다(이벤트 버스 plug.state) 중앙에 state 메시지를 보냅니다. 끊겨 있는 동안의 변화는
+  플러그별 최신 값만 남았다가 재연결 hello 에 모든 플러그의 상태와 함께 실려 갑니다.
+- EDGE_POLL_SECONDS 마다 모든 플러그의 상태를 직접 조회해 캐시를 갱신하고 STATE_CACHE_PATH 에 저장합니다
+  (중앙은 원격 플러그를 폴링하지 않음).
+- 중앙에서 받은 마지막 ON/OFF 를 플러그별 목표로 EDGE_DESIRED_PATH 에 기록합니다. 연결된 동안의 drift 는
+  중앙의 Reconciler 가 맡고(RECONCILE_CORRECT_EXTERNAL), 업링크가 끊긴 동안에는 에이전트가 폴링 때 그 목표로 되돌립니다
+  (정전 후 플러그가 기본 상태로 켜지는 경우 등). 끊긴 동안 들어온 새 명령은 중앙 저널에 남아 재연결 후 반영됩니다.
+
+전송 계층은 교체할 수 있습니다 (link_factory). 기본은 aiohttp(plugp100 의 의존성)의 WebSocket 클라이언트입니다.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.edge_hub import CLOSE_UNAUTHORIZED, site_of
+from app.services.events import event_bus
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+logger = logging.getLogger(__name__)
+
+POLL_CONCURRENCY = 16
+HEARTBEAT_SECONDS = 30.0
+
+
+class AiohttpLink:
+    """aiohttp 기반 업링크 (async with 로 연결)."""
+
+    def __init__(self, url: str):
+        self._url = url
+        self._session = None
+        self._ws = None
+
+    async def __aenter__(self) -> "AiohttpLink":
+        import aiohttp
+
+        self._session = aiohttp.ClientSession()
+        try:
+            self._ws = await self._session.ws_connect(self._url, heartbeat=HEARTBEAT_SECONDS)
+        except BaseException:
+            await self._session.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        await self._session.close()
+
+    @property
+    def close_code(self) -> Optional[int]:
+        return self._ws.close_code if self._ws is not None else None
+
+    async def send(self, message: dict) -> None:
+        await self._ws.send_str(json.dumps(message, ensure_ascii=False))
+
+    async def messages(self) -> AsyncIterator[dict]:
+        import aiohttp
+
+        async for message in self._ws:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                yield json.loads(message.data)
+            elif message.type == aiohttp.WSMsgType.ERROR:
+                raise ConnectionError(f"WebSocket 오류: {self._ws.exception()}")
+
+
+def default_link() -> AiohttpLink:
+    return AiohttpLink(settings.EDGE_CENTRAL_URL)
+
+
+class EdgeAgent:
+    def __init__(self, link_factory: Optional[Callable[[], object]] = None):
+        self._factory = link_factory or default_link
+        self._desired: Dict[str, bool] = {}
+        self._dirty: Set[str] = set()
+        self._changed: Optional[asyncio.Event] = None
+        self._subscription = None
+        self._calls: Set[asyncio.Task] = set()
+        self.connected = False
+        self.commands = 0
+        self.corrections = 0
+
+    @property
+    def plugs(self) -> List[str]:
+        """이 에이전트가 직접 연결하는 플러그 (PLUGS 중 edge: 가 아닌 것)."""
+        return [name for name, address in pyp100_service.plugs.items() if site_of(address) is None]
+
+    # ─── 목표 상태 (업링크 끊김 대비) ───────────────────────
+
+    def load_desired(self, path: Optional[str] = None) -> int:
+        path = path or settings.EDGE_DESIRED_PATH
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"[Edge] 목표 상태 읽기 실패 ({path}): {e}")
+            return 0
+        self._desired = {name: bool(on) for name, on in data.items()}
+        return len(self._desired)
+
+    def _save_desired(self, path: Optional[str] = None) -> None:
+        path = path or settings.EDGE_DESIRED_PATH
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._desired, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"[Edge] 목표 상태 저장 실패 ({path}): {e}")
+
+    # ─── 실행 ──────────────────────────────────────────────
+
+    async def run(self) -> None:
+        """상태 추적·폴링·업링크 재연결 루프 (취소될 때까지)."""
+        self._changed = asyncio.Event()
+        # 상태 추적은 메모리 작업뿐이라 빨리 비워지므로, 이벤트를 잃지 않도록 block 으로 구독
+        self._subscription = event_bus.subscribe("edge-agent", policy="block", types=["plug.state"])
+        tasks = [
+            asyncio.create_task(self._track(), name="edge-agent-track"),
+            asyncio.create_task(self._poll_loop(), name="edge-agent-poll"),
+            asyncio.create_task(self._connect_loop(), name="edge-agent-link"),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in [*tasks, *self._calls]:
+                task.cancel()
+            await asyncio.gather(*tasks, *self._calls, return_exceptions=True)
+            self._subscription.close()
+            self._subscription = None
+
+    async def _track(self) -> None:
+        async for event in self._subscription:
+            self._dirty.add(event.plug)
+            self._changed.set()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await self.poll()
+            await asyncio.sleep(settings.EDGE_POLL_SECONDS)
+
+    async def poll(self) -> None:
+        """모든 플러그의 상태를 조회하고, 업링크가 끊겨 있으면 마지막 목표와 어긋난 플러그를 되돌립니다."""
+        limit = asyncio.Semaphore(POLL_CONCURRENCY)
+
+        async def check(name: str) -> None:
+            async with limit:
+                try:
+                    status = await pyp100_service.get_status(name)
+                except Exception:
+                    return      # get_status 에서 이미 로그를 남김
+                desired = self._desired.get(name)
+                if self.connected or desired is None or status == desired:
+                    return
+                try:
+                    await (pyp100_service.turn_on(name) if desired else pyp100_service.turn_off(name))
+                    self.corrections += 1
+                    logger.info(f"[Edge] 업링크 끊김 중 '{name}' 를 마지막 목표({'ON' if desired else 'OFF'})로 되돌림")
+                except Exception:
+                    pass
+
+        await asyncio.gather(*(check(name) for name in self.plugs))
+        plug_state_cache.save()
+
+    async def _connect_loop(self) -> None:
+        failures = 0
+        while True:
+            link = None
+            try:
+                async with self._factory() as link:
+                    await self._session(link)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures = 1 if self.connected else failures + 1
+                if getattr(link, "close_code", None) == CLOSE_UNAUTHORIZED:
+                    logger.error(f"[Edge] 중앙 서버가 사이트 '{settings.EDGE_SITE}' 토큰을 거절했습니다 (EDGE_TOKEN)")
+                # 끊긴 동안 재연결 실패는 처음 한 번만 경고
+                logger.log(logging.WARNING if failures == 1 else logging.DEBUG,
+                           f"[Edge] 업링크 끊김: {e or e.__class__.__name__}"
+                           f" — {settings.EDGE_RECONNECT_SECONDS:g}초마다 재연결")
+            finally:
+                self.connected = False
+            await asyncio.sleep(settings.EDGE_RECONNECT_SECONDS)
+
+    async def _session(self, link) -> None:
+        names = self.plugs
+        states = {}
+        for name in names:
+            state = plug_state_cache.get(name)
+            if state is not None:
+                states[name] = [state.status, state.updated_at]
+        await link.send({
+            "type": "hello", "site": settings.EDGE_SITE, "token": settings.EDGE_TOKEN,
+            "plugs": names, "states": states,
+        })
+        self._dirty.clear()                     # hello 에 모두 실렸음
+
+        tasks = [
+            asyncio.create_task(self._publish_loop(link)),
+            asyncio.create_task(self._listen(link)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # 어느 쪽이든 끝났다면 연결이 끊긴 것 — 재연결로 이어지도록 올려 보낸다
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        raise ConnectionError("메시지 스트림이 끝났습니다")
+
+    async def _listen(self, link) -> None:
+        async for message in link.messages():
+            kind = message.get("type")
+            if kind == "welcome":
+                self.connected = True
+                missing = sorted(set(message.get("plugs") or []) - set(self.plugs))
+                logger.info(f"[Edge] 중앙 서버 연결됨: 사이트 '{settings.EDGE_SITE}'")
+                if missing:
+                    logger.warning(f"[Edge] 중앙에는 있지만 이 에이전트의 PLUGS 에 없는 플러그: {', '.join(missing)}")
+            elif kind == "call":
+                # 명령마다 태스크 — 느린 플러그가 다른 플러그의 명령을 막지 않도록
+                task = asyncio.create_task(self._call(link, message))
+                self._calls.add(task)
+                task.add_done_callback(self._calls.discard)
+
+    async def _publish_loop(self, link) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            while self._dirty:
+                name = self._dirty.pop()
+                state = plug_state_cache.get(name)
+                if state is None:
+                    continue
+                try:
+                    await link.send({"type": "state", "plug": name, "status": state.status, "ts": state.updated_at})
+                except Exception:
+                    self._dirty.add(name)       # 재연결 hello 에 실려 감
+                    raise
+
+    # ─── 명령 ───────────────────────────────────────────────
+
+    async def _call(self, link, message: dict) -> None:
+        name, op = message.get("plug"), message.get("op")
+        reply = {"type": "result", "id": message.get("id")}
+        try:
+            if name not in self.plugs:
+                raise LookupError(f"에이전트에 등록되지 않은 플러그: {name}")
+            if op == "on":
+                status = await pyp100_service.turn_on(name)
+            elif op == "off":
+                status = await pyp100_service.turn_off(name)
+            elif op == "status":
+                status = await pyp100_service.get_status(name)
+            else:
+                raise ValueError(f"알 수 없는 명령: {op}")
+            if op in ("on", "off"):
+                self._desired[name] = op == "on"
+                self._save_desired()
+            self.commands += 1
+            reply.update(ok=True, status=status)
+        except Exception as e:
+            reply.update(ok=False, error=str(e.detail if isinstance(e, HTTPException) else e))
+        try:
+            await link.send(reply)
+        except Exception:
+            pass    # 연결이 끊김 — 중앙의 호출은 실패로 끝나고 Reconciler 가 재시도
+
+    def stats(self) -> dict:
+        return {
+            "site": settings.EDGE_SITE,
+            "connected": self.connected,
+            "plugs": len(self.plugs),
+            "commands": self.commands,
+            "corrections": self.corrections,
+            "pending_calls": len(self._calls),
+        }
+
+
+# 싱글톤
+edge_agent = EdgeAgent()
@@ -0,0 +1,213 @@
+# app/services/edge_hub.py
+"""
+엣지 에이전트 허브 (중앙 서버 쪽).
+
+Tapo 플러그는 자기 LAN 에서만 닿으므로, 다른 건물(사이트)의 플러그는 그 LAN 의 에이전트(edge_agent.py)가
+연결을 맡고 중앙과는 WebSocket 하나(/edge/ws)로 이어집니다. 사용자·세션·대시보드·Reconciler 는 중앙에 그대로 있고,
+PLUGS 값이 "edge:<사이트>" 인 플러그의 ON/OFF·상태 조회만 Pyp100Service 가 이 허브로 넘깁니다.
+
+메시지 (JSON 텍스트 프레임)
+  에이전트 → 중앙  {"type": "hello", "site", "token", "plugs": [...], "states": {이름: [상태, 관측 시각]}}
+                   {"type": "state", "plug", "status", "ts"}          상태가 바뀔 때마다
+                   {"type": "result", "id", "ok", "status" | "error"}  명령 결과
+  중앙 → 에이전트  {"type": "welcome", "plugs": [...]}                 이 사이트로 설정된 플러그
+                   {"type": "call", "id", "op": "on" | "off" | "status", "plug"}
+
+에이전트가 보낸 상태는 관측 시각 그대로 상태 캐시에 반영되므로(목록·변경 피드·MQTT 브리지가 그대로 동작)
+중앙은 원격 플러그를 폴링하지 않습니다. 에이전트가 끊겨 있는 동안의 명령은 502 로 실패하며,
+Reconciler 저널에 남은 목표는 백오프로 재시도되다가, 재연결 직후 백오프를 풀어 루프가 바로 반영합니다.
+"""
+import asyncio
+import hmac
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.request_context import current_deadline
+from app.services.state_cache import plug_state_cache
+from app.timing import span
+
+logger = logging.getLogger(__name__)
+
+EDGE_PREFIX = "edge:"
+HELLO_TIMEOUT_SECONDS = 10.0
+CLOSE_UNAUTHORIZED = 4401       # 애플리케이션 정의 WebSocket 종료 코드 (4000–4999)
+CLOSE_REPLACED = 4409
+
+
+class EdgeUnavailableError(ConnectionError):
+    """사이트 에이전트가 연결되어 있지 않거나 제때 응답하지 않음."""
+
+
+class EdgeCallError(RuntimeError):
+    """에이전트가 장치 명령에 실패함 (에이전트 쪽 오류 메시지)."""
+
+
+def site_of(address: Optional[str]) -> Optional[str]:
+    """PLUGS 값이 "edge:<사이트>" 이면 사이트 이름."""
+    if address and address.startswith(EDGE_PREFIX):
+        return address[len(EDGE_PREFIX):]
+    return None
+
+
+class EdgeLink:
+    def __init__(self, site: str, websocket, plugs: List[str]):
+        self.site = site
+        self.websocket = websocket
+        self.plugs = plugs                          # 중앙 설정에서 이 사이트에 속한 플러그
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.connected_at = time.time()
+        self.last_seen = self.connected_at
+        self.calls = 0
+
+    async def send(self, message: dict) -> None:
+        await self.websocket.send_json(message)
+
+    def fail_pending(self, error: Exception) -> None:
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+
+class EdgeHub:
+    def __init__(self):
+        self._links: Dict[str, EdgeLink] = {}
+        self._ids = itertools.count(1)
+
+    def connected(self, site: str) -> bool:
+        return site in self._links
+
+    @staticmethod
+    def _plugs_of(site: str) -> List[str]:
+        from app.services.pyp100 import pyp100_service
+
+        return [name for name, address in pyp100_service.plugs.items() if site_of(address) == site]
+
+    # ─── 명령 ───────────────────────────────────────────────
+
+    async def call(self, site: str, op: str, name: str) -> Optional[bool]:
+        """에이전트에 장치 명령을 보내고 결과 상태를 기다립니다 (요청 deadline 과 EDGE_CALL_TIMEOUT_SECONDS 중 짧은 쪽)."""
+        link = self._links.get(site)
+        if link is None:
+            raise EdgeUnavailableError(f"사이트 '{site}' 의 에이전트가 연결되어 있지 않습니다")
+        timeout = settings.EDGE_CALL_TIMEOUT_SECONDS
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+
+        call_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        link.pending[call_id] = future
+        link.calls += 1
+        try:
+            with span("edge.call"):
+                await link.send({"type": "call", "id": call_id, "op": op, "plug": name})
+                return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise EdgeUnavailableError(f"사이트 '{site}' 의 에이전트가 {timeout:g}초 안에 응답하지 않았습니다")
+        finally:
+            link.pending.pop(call_id, None)
+
+    # ─── 연결 ───────────────────────────────────────────────
+
+    async def serve(self, websocket) -> None:
+        """/edge/ws 연결 하나를 처리합니다 (hello 인증 → 등록 → 메시지 수신 루프)."""
+        await websocket.accept()
+        try:
+            hello = await asyncio.wait_for(websocket.receive_json(), HELLO_TIMEOUT_SECONDS)
+        except Exception:
+            await websocket.close(code=CLOSE_UNAUTHORIZED)
+            return
+        site = str(hello.get("site") or "")
+        expected = settings.EDGE_TOKENS.get(site)
+        if (hello.get("type") != "hello" or not expected
+                or not hmac.compare_digest(expected.encode(), str(hello.get("token") or "").encode())):
+            logger.warning(f"[Edge] 인증 실패: 사이트 '{site[:50]}'")
+            await websocket.close(code=CLOSE_UNAUTHORIZED)
+            return
+
+        link = EdgeLink(site, websocket, self._plugs_of(site))
+        old = self._links.get(site)
+        self._links[site] = link
+        if old is not None:
+            # 같은 사이트의 새 연결이 이긴다 (에이전트 재시작 후 이전 연결이 아직 안 끊긴 경우)
+            old.fail_pending(EdgeUnavailableError(f"사이트 '{site}' 에이전트가 다시 연결했습니다"))
+            asyncio.create_task(_close_quietly(old.websocket, CLOSE_REPLACED))
+
+        missing = sorted(set(link.plugs) - set(hello.get("plugs") or []))
+        logger.info(f"[Edge] '{site}' 연결: 플러그 {len(link.plugs)}개"
+                    + (f" (에이전트에 없음: {', '.join(missing)})" if missing else ""))
+        await link.send({"type": "welcome", "plugs": link.plugs})
+        for name, (status, ts) in (hello.get("states") or {}).items():
+            self._observe(link, name, status, ts)
+        self._resume(link)
+
+        try:
+            await self._receive(link)
+        except Exception as e:
+            logger.info(f"[Edge] '{site}' 연결 종료: {e.__class__.__name__}")
+        finally:
+            if self._links.get(site) is link:
+                del self._links[site]
+                logger.warning(f"[Edge] '{site}' 에이전트 연결 끊김")
+            link.fail_pending(EdgeUnavailableError(f"사이트 '{site}' 에이전트 연결이 끊겼습니다"))
+
+    async def _receive(self, link: EdgeLink) -> None:
+        while True:
+            message = await link.websocket.receive_json()
+            link.last_seen = time.time()
+            kind = message.get("type")
+            if kind == "state":
+                self._observe(link, message.get("plug"), message.get("status"), message.get("ts"))
+            elif kind == "result":
+                future = link.pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if message.get("ok"):
+                    future.set_result(message.get("status"))
+                else:
+                    future.set_exception(EdgeCallError(message.get("error") or "unknown error"))
+
+    def _observe(self, link: EdgeLink, name: Optional[str], status: Optional[bool], ts: Optional[float]) -> None:
+        if name not in link.plugs:
+            return      # 중앙 설정에서 이 사이트의 플러그가 아님
+        plug_state_cache.update(name, status if isinstance(status, bool) else None,
+                                observed_at=min(float(ts), time.time()) if ts else None)
+
+    @staticmethod
+    def _resume(link: EdgeLink) -> None:
+        """끊겨 있는 동안 반영하지 못한 목표(Reconciler 저널)를 백오프를 기다리지 않고 Reconciler 루프가 바로 재시도하게 합니다."""
+        from app.services.reconciler import reconciler
+
+        reconciler.retry_now(link.plugs)
+
+    def stats(self) -> List[dict]:
+        sites = sorted(set(settings.EDGE_TOKENS) | set(self._links))
+        now = time.time()
+        result = []
+        for site in sites:
+            link = self._links.get(site)
+            result.append({
+                "site": site,
+                "connected": link is not None,
+                "plugs": len(link.plugs) if link else len(self._plugs_of(site)),
+                "connected_seconds": round(now - link.connected_at, 1) if link else None,
+                "last_seen_seconds": round(now - link.last_seen, 1) if link else None,
+                "pending_calls": len(link.pending) if link else 0,
+                "calls": link.calls if link else 0,
+            })
+        return result
+
+
+async def _close_quietly(websocket, code: int) -> None:
+    try:
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
+
+# 싱글톤
+edge_hub = EdgeHub()
@@ -0,0 +1,162 @@
+# app/services/events.py
+"""
+프로세스 내부 이벤트 버스 (publish/subscribe).
+
+세션 변경(session.acquire / session.release / session.clear)과 관측한 장치 상태 변화(plug.state)를
+구독자에게 밀어 주므로, 연동(MQTT 브리지 등)이 GET /plugs/ 를 주기적으로 부를 필요가 없습니다.
+
+publish() 는 동기 함수이며 요청 경로를 막지 않습니다. 이벤트는 크기 EVENT_QUEUE_SIZE 의
+버스 큐에 쌓이고, 디스패처 태스크가 순서대로 구독자별 큐(크기 제한)에 나눠 줍니다.
+
+구독자별 정책
+  drop  : 큐가 차면 가장 오래된 이벤트를 버림 (대시보드처럼 최신 상태만 중요한 구독자)
+  block : 큐에 자리가 날 때까지 디스패처가 기다림 (최대 EVENT_BLOCK_TIMEOUT_SECONDS, 넘으면 버림)
+          — 느린 block 구독자는 다른 구독자의 전달도 늦춥니다.
+버린 이벤트 수는 구독자별로 세며 GET /debug/events 로 볼 수 있습니다.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop", "block")
+
+
+class Event(NamedTuple):
+    type: str                   # "session.acquire" | "session.release" | "session.clear" | "plug.state"
+    plug: str
+    data: Dict[str, Any]
+    ts: float                   # time.time()
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", name: str, maxsize: int, policy: str,
+                 types: Optional[Iterable[str]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"알 수 없는 정책: {policy}")
+        self.name = name
+        self.policy = policy
+        self.types = frozenset(types) if types else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self._bus = bus
+
+    def matches(self, event: Event) -> bool:
+        return self.types is None or event.type in self.types
+
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    async def _deliver(self, event: Event) -> None:
+        if self.policy == "block":
+            try:
+                await asyncio.wait_for(self.queue.put(event), settings.EVENT_BLOCK_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return
+        else:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(event)
+        self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "depth": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class EventBus:
+    def __init__(self, size: Optional[int] = None):
+        self._pending: Deque[Event] = deque(maxlen=size or settings.EVENT_QUEUE_SIZE)
+        self._subscribers: List[Subscription] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.overflowed = 0         # 디스패처가 따라가지 못해 버스 큐에서 밀려난 이벤트
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, name: str, maxsize: Optional[int] = None, policy: str = "drop",
+                  types: Optional[Iterable[str]] = None) -> Subscription:
+        sub = Subscription(self, name, maxsize or settings.EVENT_SUBSCRIBER_QUEUE_SIZE, policy, types)
+        self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+
+    def publish(self, type: str, plug: str, **data: Any) -> None:
+        """이벤트를 버스 큐에 넣습니다 (동기, 막지 않음). 구독자가 없으면 아무것도 하지 않습니다."""
+        if not self._subscribers:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.overflowed += 1
+        self._pending.append(Event(type, plug, data, time.time()))
+        self.published += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run(), name="event-bus")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                event = self._pending.popleft()
+                for sub in list(self._subscribers):
+                    if not sub.matches(event):
+                        continue
+                    try:
+                        await sub._deliver(event)
+                    except Exception as e:
+                        logger.warning(f"[EventBus] '{sub.name}' 전달 실패: {e}")
+
+    def stats(self) -> List[dict]:
+        return [sub.stats() for sub in self._subscribers]
+
+
+# 싱글톤
+event_bus = EventBus()
@@ -0,0 +1,66 @@
+# app/services/groups.py
+"""
+플러그 그룹 (벤치/방 단위).
+
+PLUG_GROUPS 의 멤버는 플러그 이름이거나 다른 그룹 이름일 수 있으며(중첩),
+처음 사용할 때 한 번 평탄화(flatten)해 둡니다. 순환 참조는 무시하고 경고를 남깁니다.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.exceptions import GroupNotFoundException
+from app.services.pyp100 import pyp100_service
+
+logger = logging.getLogger(__name__)
+
+
+class PlugGroups:
+    def __init__(self):
+        self._members: Optional[Dict[str, List[str]]] = None
+
+    def _resolve_all(self) -> Dict[str, List[str]]:
+        raw = settings.PLUG_GROUPS
+        plugs = pyp100_service.plugs
+        for group in raw:
+            if group in plugs:
+                logger.error(f"그룹 이름 '{group}'이 플러그 이름과 겹칩니다 — 그룹으로 해석합니다")
+
+        resolved: Dict[str, List[str]] = {}
+
+        def visit(group: str, path: List[str]) -> List[str]:
+            if group in resolved:
+                return resolved[group]
+            members: List[str] = []
+            for member in raw[group]:
+                if member in raw:
+                    if member in path:
+                        logger.warning(f"그룹 순환 참조 무시: {' → '.join(path + [member])}")
+                        continue
+                    members.extend(visit(member, path + [member]))
+                elif member in plugs:
+                    members.append(member)
+                else:
+                    logger.warning(f"그룹 '{group}'의 알 수 없는 멤버 무시: '{member}'")
+            # 순서를 유지한 채 중복 제거
+            resolved[group] = list(dict.fromkeys(members))
+            return resolved[group]
+
+        for group in raw:
+            visit(group, [group])
+        return resolved
+
+    @property
+    def groups(self) -> Dict[str, List[str]]:
+        if self._members is None:
+            self._members = self._resolve_all()
+        return self._members
+
+    def members(self, name: str) -> List[str]:
+        if name not in self.groups:
+            raise GroupNotFoundException(name)
+        return self.groups[name]
+
+
+# 싱글톤
+plug_groups = PlugGroups()
@@ -0,0 +1,125 @@
+# app/services/handshake_cache.py
+"""
+플러그별 연결 협상 결과 캐시.
+
+plugp100 은 DeviceConnectConfiguration 에 장치 종류/암호화 방식이 없으면 연결할 때마다
+Passthrough → KLAP v1 → KLAP v2 순서로 프로토콜을 시험하고 get_device_info 로 종류를 알아냅니다.
+한 번 연결에 성공한 플러그의 프로토콜·장치 종류·모델을 기억해 두었다가(HANDSHAKE_CACHE_PATH 에도 저장)
+다음 연결에서 넘겨 주면 이 탐색 왕복을 건너뜁니다. 저장된 정보로 연결이 실패하면
+Pyp100Service 가 캐시를 지우고 전체 협상으로 다시 연결합니다.
+
+연결 후에 알게 된 기능 지원 여부(capabilities, 예: multipleRequest)도 같은 항목에 함께 기억합니다.
+
+KLAP 세션 키 자체는 저장하지 않습니다. plugp100 5.1.4 의 KlapSession 은 만료 판정이
+초/밀리초 단위가 섞여 있어 모든 세션을 만료로 보므로, 저장해도 재사용되지 않습니다.
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def describe_device(device) -> Optional[dict]:
+    """연결된 plugp100 장치에서 DeviceConnectConfiguration 에 넘길 값들을 뽑습니다."""
+    try:
+        protocol = device.client.protocol.name      # "Passthrough" / "Klap V1" / "Klap V2"
+        info = device.device_info
+    except Exception:
+        return None
+    if protocol == "Passthrough":
+        encryption_type, encryption_version = "aes", None
+    elif protocol.startswith("Klap"):
+        encryption_type, encryption_version = "klap", 2 if protocol.endswith("V2") else 1
+    else:
+        return None
+    return {
+        "device_type": info.type,
+        "device_model": info.model,
+        "encryption_type": encryption_type,
+        "encryption_version": encryption_version,
+    }
+
+
+class HandshakeCache:
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._loaded = False
+        self._entries: Dict[str, dict] = {}
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.HANDSHAKE_CACHE_PATH
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = dict(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"핸드셰이크 캐시 읽기 실패 ({self.path}): {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"핸드셰이크 캐시 저장 실패 ({self.path}): {e}")
+
+    def get(self, name: str) -> Optional[dict]:
+        """DeviceConnectConfiguration 키워드 인자 (없으면 None)."""
+        if not settings.HANDSHAKE_CACHE_ENABLED:
+            return None
+        self._ensure_loaded()
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        return {key: value for key, value in entry.items() if key not in ("updated", "capabilities")}
+
+    def remember(self, name: str, device) -> None:
+        """연결에 성공한 장치의 협상 결과를 기록합니다. 바뀐 것이 있을 때만 파일에 씁니다."""
+        if not settings.HANDSHAKE_CACHE_ENABLED:
+            return
+        described = describe_device(device)
+        if described is None:
+            return
+        self._ensure_loaded()
+        if self.get(name) == described:
+            return
+        capabilities = self._entries.get(name, {}).get("capabilities")
+        self._entries[name] = {**described, "updated": time.time()}
+        if capabilities:
+            self._entries[name]["capabilities"] = capabilities
+        self._save()
+
+    def capability(self, name: str, key: str) -> Optional[bool]:
+        """기억해 둔 기능 지원 여부 (모르면 None). 캐시가 꺼져 있어도 실행 중에는 메모리에 유지."""
+        self._ensure_loaded()
+        return self._entries.get(name, {}).get("capabilities", {}).get(key)
+
+    def set_capability(self, name: str, key: str, value: bool) -> None:
+        if self.capability(name, key) == value:
+            return
+        self._entries.setdefault(name, {}).setdefault("capabilities", {})[key] = value
+        if settings.HANDSHAKE_CACHE_ENABLED:
+            self._save()
+
+    def forget(self, name: str) -> None:
+        self._ensure_loaded()
+        if self._entries.pop(name, None) is not None:
+            self._save()
+
+
+# 싱글톤
+handshake_cache = HandshakeCache()
@@ -0,0 +1,247 @@
+# app/services/idempotency.py
+"""
+Idempotency-Key 결과 저장소.
+
+- 키(사용자별)마다 첫 실행의 응답(상태 코드·헤더·본문)을 저장하고, 같은 키의 재시도에는
+  세션 테이블이나 장치를 건드리지 않고 저장된 응답을 그대로 돌려줍니다.
+- 최근 결과는 메모리 LRU(IDEMPOTENCY_CACHE_SIZE)에 두어 재시도가 DB 조회 없이 끝나고,
+  워커 간 공유와 재시작 대비로 idempotency_keys 테이블에도 기록합니다 (IDEMPOTENCY_TTL_SECONDS 후 만료).
+- 실행은 DB 에 "실행 중" 행을 먼저 넣어 선점합니다. 같은 워커의 동시 중복 요청은 첫 실행의 future 를,
+  다른 워커의 중복 요청은 행이 완료될 때까지 DB 를 짧게 폴링하며 기다립니다.
+- 5xx·408·429 응답은 저장하지 않습니다 (재시도하면 다시 실행됨). 실행 중 표시는
+  IDEMPOTENCY_LOCK_SECONDS 가 지나면 무효라, 실행 도중 워커가 죽어도 키가 영구히 잠기지 않습니다.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.db import SessionLocal
+from app.exceptions import IdempotencyKeyInProgressException, IdempotencyKeyMismatchException
+from app.models import IdempotencyRecord
+from app.request_context import current_deadline
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 60.0
+POLL_SECONDS = (0.05, 0.1, 0.2, 0.5)        # 다른 워커의 실행을 기다릴 때 폴링 간격 (점점 늘림)
+UNSTORED_STATUS = {408, 429}                # 그 밖에 5xx 도 저장하지 않음
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    expires: float                          # time.time() 기준
+
+
+def scoped_key(user: str, key: str) -> str:
+    """사용자마다 키 공간을 나눕니다 (다른 사용자의 결과를 재생하지 않도록)."""
+    return hashlib.sha256(f"{user}\0{key}".encode("utf-8")).hexdigest()
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    """같은 키로 다른 요청을 보냈는지 가리는 지문 (메서드·경로·쿼리 문자열·본문)."""
+    return hashlib.sha256(
+        method.encode() + b"\0" + path.encode("utf-8") + b"\0" + query + b"\0" + body
+    ).hexdigest()
+
+
+def storable(status_code: int) -> bool:
+    return status_code < 500 and status_code not in UNSTORED_STATUS
+
+
+class IdempotencyStore:
+    def __init__(self):
+        self._cache: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        # 이 워커에서 실행 중인 키 → (fingerprint, 결과 future; 실행이 실패·취소되면 None)
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._purged_at = 0.0
+        self.executed = 0
+        self.replayed = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    # ─── 메모리 LRU ─────────────────────────────────────────
+
+    def _cached(self, key: str) -> Optional[StoredResponse]:
+        stored = self._cache.get(key)
+        if stored is None:
+            return None
+        if stored.expires <= time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return stored
+
+    def _remember(self, key: str, stored: StoredResponse) -> None:
+        self._cache[key] = stored
+        self._cache.move_to_end(key)
+        while len(self._cache) > max(0, settings.IDEMPOTENCY_CACHE_SIZE):
+            self._cache.popitem(last=False)
+
+    # ─── DB ────────────────────────────────────────────────
+
+    @staticmethod
+    def _from_row(row: IdempotencyRecord) -> StoredResponse:
+        return StoredResponse(
+            fingerprint=row.fingerprint,
+            status_code=row.status_code,
+            headers=[tuple(h) for h in json.loads(row.headers or "[]")],
+            body=row.body or b"",
+            expires=(row.expires_at - datetime.utcnow()).total_seconds() + time.time(),
+        )
+
+    def _claim(self, key: str, fp: str) -> Union[bool, StoredResponse]:
+        """
+        DB 에 실행 중 행을 넣어 키를 선점합니다.
+        True = 선점함, False = 다른 워커가 실행 중, StoredResponse = 이미 완료된 결과.
+        """
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            row = db.get(IdempotencyRecord, key)
+            if row is not None and row.expires_at <= now:
+                db.delete(row)              # 만료된 결과 또는 중단된 실행
+                db.flush()
+                row = None
+            if row is not None:
+                if row.status_code is None:
+                    if row.fingerprint != fp:
+                        raise IdempotencyKeyMismatchException()
+                    return False
+                return self._from_row(row)
+            db.add(IdempotencyRecord(
+                key=key, fingerprint=fp,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()               # 다른 워커가 한발 먼저 선점
+                return False
+        return True
+
+    def _complete(self, key: str, stored: Optional[StoredResponse]) -> None:
+        """실행 결과를 기록합니다. stored 가 None 이면 선점을 풀어 재시도가 다시 실행되게 합니다."""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            row = db.get(IdempotencyRecord, key)
+            if stored is None:
+                if row is not None and row.status_code is None:
+                    db.delete(row)
+            elif row is not None:
+                row.status_code = stored.status_code
+                row.headers = json.dumps(stored.headers)
+                row.body = stored.body
+                row.expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            if time.monotonic() - self._purged_at >= PURGE_INTERVAL_SECONDS:
+                self._purged_at = time.monotonic()
+                db.query(IdempotencyRecord).filter(IdempotencyRecord.expires_at <= now).delete()
+            db.commit()
+
+    # ─── 실행 ──────────────────────────────────────────────
+
+    async def run(
+        self, key: str, fp: str, execute: Callable[[], Awaitable[StoredResponse]],
+    ) -> Tuple[StoredResponse, bool]:
+        """
+        키의 첫 요청이면 execute() 를 실행하고, 아니면 저장된(또는 실행 중인) 결과를 기다려 돌려줍니다.
+        반환값은 (응답, 재생 여부). 같은 키를 다른 요청에 쓰면 IdempotencyKeyMismatchException.
+
+        첫 실행은 요청 태스크와 분리되어 있어, 클라이언트가 기다리다 끊어도(nginx 타임아웃 등)
+        끝까지 실행되고 결과가 저장됩니다 — 뒤따르는 재시도가 그 결과를 받습니다.
+        """
+        polls = 0
+        while True:
+            stored = self._cached(key)
+            if stored is not None:
+                return self._replay(fp, stored)
+
+            pending = self._inflight.get(key)
+            if pending is not None:
+                if pending[0] != fp:
+                    raise IdempotencyKeyMismatchException()
+                result = await asyncio.shield(pending[1])
+                if result is not None:
+                    self.replayed += 1
+                    return result, True
+                continue                    # 첫 실행이 실패·취소됨 — 다시 선점을 시도
+
+            claimed = self._claim(key, fp)
+            if isinstance(claimed, StoredResponse):
+                self._remember(key, claimed)
+                return self._replay(fp, claimed)
+            if claimed:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = (fp, future)
+                task = asyncio.ensure_future(self._execute(key, fp, execute, future))
+                task.add_done_callback(_log_failure)
+                return await asyncio.shield(task), False
+
+            # 다른 워커가 실행 중 — 요청 deadline 안에서 완료를 기다린다
+            deadline = current_deadline()
+            delay = POLL_SECONDS[min(polls, len(POLL_SECONDS) - 1)]
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise IdempotencyKeyInProgressException()
+            polls += 1
+            await asyncio.sleep(delay)
+
+    def _replay(self, fp: str, stored: StoredResponse) -> Tuple[StoredResponse, bool]:
+        if stored.fingerprint != fp:
+            raise IdempotencyKeyMismatchException()
+        self.replayed += 1
+        return stored, True
+
+    async def _execute(
+        self, key: str, fp: str, execute: Callable[[], Awaitable[StoredResponse]],
+        future: asyncio.Future,
+    ) -> StoredResponse:
+        response = None
+        try:
+            response = (await execute())._replace(
+                fingerprint=fp, expires=time.time() + settings.IDEMPOTENCY_TTL_SECONDS)
+            self.executed += 1
+            if storable(response.status_code):
+                self._complete(key, response)
+                self._remember(key, response)
+            else:
+                self._complete(key, None)
+            return response
+        except BaseException:
+            response = None
+            try:
+                self._complete(key, None)
+            except Exception as e:
+                logger.error(f"[Idempotency] 선점 해제 실패: {e}")
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(response)
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+        }
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    # 요청이 먼저 끊긴 경우 아무도 결과를 받지 않으므로 예외는 여기서 남긴다
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"[Idempotency] 실행 실패: {task.exception()!r}")
+
+
+# 싱글톤
+idempotency_store = IdempotencyStore()
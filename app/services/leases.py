@@ -0,0 +1,216 @@
+# app/services/leases.py
+"""
+플러그 세션 임대(lease) 관리.
+
+- 대시보드에서 잡은 세션은 SESSION_LEASE_SECONDS 동안만 유효하며,
+  heartbeat 로 갱신하지 않으면 만료되어 일반 해제 경로(sessions.release)로 정리됩니다.
+- 만료 감시는 전체 테이블 주기 스캔이 아니라 deadline 힙(DeadlineQueue)으로 구동됩니다.
+  DB 는 시작 시 한 번만 읽습니다.
+- heartbeat 는 메모리에서만 갱신하고, 변경분은 LEASE_FLUSH_INTERVAL_SECONDS 마다
+  한 번의 executemany 로 DB 에 반영합니다.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import and_, bindparam
+
+from app.config import settings
+from app.db import SessionLocal
+from app.exceptions import PlugNotInUseException
+from app.models import PlugSession
+from app.services.deadlines import DeadlineQueue, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+LeaseKey = Tuple[str, int]   # (plug_name, user_id)
+
+EXPIRE_RETRY_SECONDS = 5.0          # 만료 해제 실패 시 재시도 간격 (실패할수록 두 배, 최대 EXPIRE_RETRY_MAX_SECONDS)
+EXPIRE_RETRY_MAX_SECONDS = 300.0
+
+_sessions_table = PlugSession.__table__
+_flush_stmt = (
+    _sessions_table.update()
+    .where(and_(
+        _sessions_table.c.plug_name == bindparam("b_plug"),
+        _sessions_table.c.user_id == bindparam("b_user"),
+    ))
+    .values(expires_at=bindparam("b_expires"))
+)
+
+
+def to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+class LeaseManager:
+    def __init__(self):
+        self._queue = DeadlineQueue()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._dirty: Dict[LeaseKey, float] = {}
+        self._retries: Dict[LeaseKey, int] = {}     # 만료 해제 연속 실패 수
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> int:
+        return len(self._queue)
+
+    def expires_at(self, name: str, user_id: int) -> Optional[datetime]:
+        deadline = self._queue.get((name, user_id))
+        return to_datetime(deadline) if deadline is not None else None
+
+    # ─── 시작/종료 ─────────────────────────────────────────
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        with SessionLocal() as db:
+            rows = (
+                db.query(PlugSession.plug_name, PlugSession.user_id, PlugSession.expires_at)
+                .filter(PlugSession.expires_at.isnot(None))
+                .all()
+            )
+        for name, user_id, expires_at in rows:
+            self._track((name, user_id), to_timestamp(expires_at))
+        self._task = asyncio.create_task(self._run(), name="lease-sweeper")
+        logger.info(f"[LeaseManager] 시작: 임대 중인 세션 {len(rows)}개")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.flush()
+
+    # ─── 세션 훅 (app.services.sessions 에서 호출) ───────────
+    def grant(self, name: str, user_id: int, ttl: int, persisted: bool = False) -> datetime:
+        """세션에 임대 기한을 부여/연장합니다. persisted=False 면 다음 flush 때 DB 에 반영."""
+        deadline = time.time() + ttl
+        key = (name, user_id)
+        self._track(key, deadline)
+        if not persisted:
+            self._dirty[key] = deadline
+        self._notify()
+        return to_datetime(deadline)
+
+    def revoke(self, name: str, user_id: int) -> None:
+        key = (name, user_id)
+        self._queue.discard(key)
+        self._dirty.pop(key, None)
+        self._retries.pop(key, None)
+        names = self._by_user.get(user_id)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._by_user[user_id]
+
+    def revoke_plug(self, name: str) -> None:
+        for user_id in [uid for uid, names in self._by_user.items() if name in names]:
+            self.revoke(name, user_id)
+
+    def heartbeat(self, user_id: int, ttl: int) -> int:
+        """사용자가 가진 모든 임대를 메모리에서 연장합니다. DB 쓰기는 flush 로 모읍니다."""
+        names = self._by_user.get(user_id, ())
+        deadline = time.time() + ttl
+        for name in names:
+            key = (name, user_id)
+            self._queue.push(key, deadline)
+            self._dirty[key] = deadline
+        return len(names)
+
+    def flush(self) -> int:
+        """밀린 heartbeat 를 한 번의 executemany UPDATE 로 기록합니다."""
+        if not self._dirty:
+            return 0
+        batch, self._dirty = self._dirty, {}
+        params = [
+            {"b_plug": name, "b_user": user_id, "b_expires": to_datetime(deadline)}
+            for (name, user_id), deadline in batch.items()
+        ]
+        try:
+            with SessionLocal() as db:
+                db.execute(_flush_stmt, params)
+                db.commit()
+        except Exception as e:
+            logger.error(f"[LeaseManager] heartbeat flush 실패 ({len(params)}건): {e}")
+            # 다음 주기에 다시 시도 (그 사이 더 새로운 갱신이 있으면 그것을 유지)
+            for key, deadline in batch.items():
+                self._dirty.setdefault(key, deadline)
+            return 0
+        logger.debug(f"[LeaseManager] heartbeat {len(params)}건 flush")
+        return len(params)
+
+    # ─── 내부 ──────────────────────────────────────────────
+    def _track(self, key: LeaseKey, deadline: float) -> None:
+        self._queue.push(key, deadline)
+        self._by_user.setdefault(key[1], set()).add(key[0])
+
+    def _notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        next_flush = time.time() + settings.LEASE_FLUSH_INTERVAL_SECONDS
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            if now >= next_flush:
+                self.flush()
+                next_flush = now + settings.LEASE_FLUSH_INTERVAL_SECONDS
+
+            deadline = self._queue.peek()
+            wake_at = next_flush if deadline is None else min(deadline, next_flush)
+            if wake_at > now:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wake_at - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            expired = self._queue.pop_due(now)
+            if expired:
+                try:
+                    await asyncio.gather(*(self._expire(key) for _, key in expired))
+                except Exception as e:
+                    logger.error(f"[LeaseManager] 만료 처리 실패: {e}", exc_info=True)
+
+    async def _expire(self, key: LeaseKey) -> None:
+        from app.services import sessions   # 순환 import 방지
+
+        name, user_id = key
+        self._dirty.pop(key, None)
+        try:
+            with SessionLocal() as db:
+                row = db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
+                if row is None or row.expires_at is None:
+                    self.revoke(name, user_id)
+                    return
+                # 다른 워커가 이미 연장해 DB 에 기록했다면 그 기한을 따른다
+                if to_timestamp(row.expires_at) > time.time():
+                    self._queue.push(key, to_timestamp(row.expires_at))
+                    return
+                try:
+                    logger.info(f"[LeaseManager] '{name}' 사용자(ID: {user_id}) 임대 만료 — 세션 해제")
+                    await sessions.release(db, name, user_id)
+                except PlugNotInUseException:
+                    self.revoke(name, user_id)
+        except Exception as e:
+            # 큐에서는 이미 빠졌으므로 다시 넣어 재시도 (DB 잠김 등) — 그대로 두면 세션이 영구히 남는다
+            attempts = self._retries[key] = self._retries.get(key, 0) + 1
+            delay = min(EXPIRE_RETRY_MAX_SECONDS, EXPIRE_RETRY_SECONDS * 2 ** (attempts - 1))
+            self._track(key, time.time() + delay)
+            logger.error(f"[LeaseManager] '{name}' 사용자(ID: {user_id}) 만료 해제 실패 "
+                         f"({attempts}회째, {delay:.0f}초 후 재시도): {e}")
+            return
+        self._retries.pop(key, None)
+
+
+# 싱글톤
+lease_manager = LeaseManager()
@@ -0,0 +1,284 @@
+# app/services/mqtt_bridge.py
+"""
+MQTT 브리지 (Home Assistant 등 홈 자동화 연동).
+
+이벤트 버스를 구독해 플러그별 상태를 retained 토픽으로 내보내고, 명령 토픽을 받아
+일반 사용자와 같은 참조 카운트 경로(sessions.acquire / release)로 처리합니다.
+연동 쪽은 GET /plugs/ 를 폴링하지 않고 브로커만 구독하면 됩니다.
+
+토픽 (MQTT_TOPIC_PREFIX=tapo)
+  tapo/bridge/status        retained  "online" / "offline" (연결이 끊기면 브로커가 LWT 로 offline)
+  tapo/plug/<이름>/state    retained  {"status": true, "active_users": 1, "users": ["mqtt"], "updated_at": …}
+  tapo/plug/<이름>/set      ← "on" / "off"  (MQTT_COMMAND_USER 명의의 세션 추가 / 해제)
+
+멀티탭 콘센트는 tapo/plug/책상/모니터/state 처럼 이름의 "/" 가 그대로 토픽 단계가 됩니다.
+
+이벤트는 연결 여부와 상관없이 받아 플러그별 최신 상태에 합치고 "보낼 플러그"로 표시해 두며,
+연결된 동안 그 플러그의 현재 상태를 보냅니다. 그래서 연결이 끊겼던 동안의 변화도 재연결 후
+최신 값 하나로 정리되어 나가고, 재연결할 때마다 모든 플러그의 상태를 한 번 다시 보냅니다.
+
+전송 계층은 교체할 수 있습니다 (transport_factory). 기본은 aiomqtt (선택 의존성: pip install aiomqtt),
+점검 시에는 benchmarks/local_broker.py 의 로컬 브로커 대역을 넣습니다.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import AsyncIterator, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from app.config import settings
+from app.db import SessionLocal
+from app.exceptions import PlugNotInUseException
+from app.models import User
+from app.services import sessions
+from app.services.events import Event, event_bus
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+logger = logging.getLogger(__name__)
+
+ONLINE, OFFLINE = "online", "offline"
+
+
+class AiomqttTransport:
+    """aiomqtt 기반 전송 계층 (async with 로 연결)."""
+
+    def __init__(self, url: str, client_id: str, will: Tuple[str, str]):
+        self._url = urlsplit(url)
+        self._client_id = client_id
+        self._will = will
+        self._client = None
+
+    async def __aenter__(self) -> "AiomqttTransport":
+        try:
+            import aiomqtt
+        except ImportError as e:
+            raise RuntimeError("MQTT_ENABLED=true 이려면 aiomqtt 패키지가 필요합니다 (pip install aiomqtt)") from e
+
+        url = self._url
+        self._client = aiomqtt.Client(
+            url.hostname or "localhost",
+            port=url.port or (8883 if url.scheme == "mqtts" else 1883),
+            username=unquote(url.username) if url.username else None,
+            password=unquote(url.password) if url.password else None,
+            identifier=self._client_id,
+            will=aiomqtt.Will(self._will[0], self._will[1], qos=1, retain=True),
+            tls_params=aiomqtt.TLSParameters() if url.scheme == "mqtts" else None,
+        )
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._client is not None:
+            await self._client.__aexit__(*exc)
+            self._client = None
+
+    async def publish(self, topic: str, payload: str, retain: bool = False) -> None:
+        await self._client.publish(topic, payload, qos=1, retain=retain)
+
+    async def subscribe(self, topic: str) -> None:
+        await self._client.subscribe(topic, qos=1)
+
+    async def messages(self) -> AsyncIterator[Tuple[str, bytes]]:
+        async for message in self._client.messages:
+            yield message.topic.value, bytes(message.payload or b"")
+
+
+def default_transport(will: Tuple[str, str]) -> AiomqttTransport:
+    return AiomqttTransport(settings.MQTT_URL, settings.MQTT_CLIENT_ID, will)
+
+
+class MqttBridge:
+    def __init__(self, transport_factory: Optional[Callable[[Tuple[str, str]], object]] = None):
+        self._factory = transport_factory or default_transport
+        self._states: Dict[str, dict] = {}
+        self._dirty: Set[str] = set()
+        self._changed: Optional[asyncio.Event] = None
+        self._subscription = None
+        self._tasks: list = []
+        self.connected = False
+
+    @property
+    def prefix(self) -> str:
+        return settings.MQTT_TOPIC_PREFIX.rstrip("/")
+
+    def state_topic(self, name: str) -> str:
+        return f"{self.prefix}/plug/{name}/state"
+
+    def _plug_from_command(self, topic: str) -> Optional[str]:
+        head, tail = f"{self.prefix}/plug/", "/set"
+        if topic.startswith(head) and topic.endswith(tail) and len(topic) > len(head) + len(tail):
+            return topic[len(head):-len(tail)]
+        return None
+
+    # ─── 상태 추적 ──────────────────────────────────────────
+
+    def _snapshot(self) -> None:
+        """시작 시 상태 캐시와 세션 테이블로 모든 플러그의 현재 상태를 채웁니다."""
+        names = list(pyp100_service.plugs)
+        with SessionLocal() as db:
+            counts = sessions.count_active_many(db, names) if names else {}
+            users = sessions.list_users_many(db, names) if names else {}
+        for name in names:
+            state = plug_state_cache.get(name)
+            self._states[name] = {
+                "status": state.status if state else None,
+                "active_users": counts.get(name, 0),
+                "users": users.get(name, []),
+                "updated_at": state.updated_at if state else None,
+            }
+        self._dirty.update(names)
+
+    def _apply(self, event: Event) -> None:
+        state = self._states.setdefault(
+            event.plug, {"status": None, "active_users": 0, "users": [], "updated_at": None}
+        )
+        if event.type == "plug.state":
+            state["status"] = event.data.get("status")
+        else:
+            state["active_users"] = event.data.get("active_users", state["active_users"])
+            state["users"] = event.data.get("users", state["users"])
+        state["updated_at"] = event.ts
+        self._dirty.add(event.plug)
+        self._changed.set()
+
+    async def _track(self) -> None:
+        async for event in self._subscription:
+            self._apply(event)
+
+    # ─── 연결 ───────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if not settings.MQTT_ENABLED or self._tasks:
+            return
+        self._changed = asyncio.Event()
+        # 상태 추적은 메모리 작업뿐이라 빨리 비워지므로, 이벤트를 잃지 않도록 block 으로 구독
+        self._subscription = event_bus.subscribe("mqtt-bridge", policy="block")
+        self._snapshot()
+        self._tasks = [
+            asyncio.create_task(self._track(), name="mqtt-bridge-track"),
+            asyncio.create_task(self._run(), name="mqtt-bridge"),
+        ]
+        logger.info(f"[MQTT] 브리지 시작: {urlsplit(settings.MQTT_URL).hostname} (토픽 {self.prefix}/…)")
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    async def _run(self) -> None:
+        status_topic = f"{self.prefix}/bridge/status"
+        while True:
+            try:
+                async with self._factory((status_topic, OFFLINE)) as transport:
+                    self.connected = True
+                    logger.info("[MQTT] 브로커 연결됨")
+                    try:
+                        await self._session(transport, status_topic)
+                    except asyncio.CancelledError:
+                        # 정상 종료 시에는 LWT 가 나가지 않으므로 직접 offline 을 남긴다
+                        with contextlib.suppress(Exception):
+                            await asyncio.wait_for(transport.publish(status_topic, OFFLINE, retain=True), 1.0)
+                        raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[MQTT] 연결 끊김: {e} — {settings.MQTT_RECONNECT_SECONDS:g}초 후 재연결")
+            finally:
+                self.connected = False
+            await asyncio.sleep(settings.MQTT_RECONNECT_SECONDS)
+
+    async def _session(self, transport, status_topic: str) -> None:
+        await transport.publish(status_topic, ONLINE, retain=True)
+        # 멀티탭 콘센트(멀티탭/콘센트)까지: + 는 한 단계만 맞으므로 두 패턴을 구독
+        await transport.subscribe(f"{self.prefix}/plug/+/set")
+        await transport.subscribe(f"{self.prefix}/plug/+/+/set")
+        self._dirty.update(self._states)        # 재연결마다 전체 상태를 다시 보냄
+        self._changed.set()
+
+        tasks = [
+            asyncio.create_task(self._publish_loop(transport)),
+            asyncio.create_task(self._listen(transport)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # 어느 쪽이든 끝났다면 연결이 끊긴 것 — 재연결로 이어지도록 올려 보낸다
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        raise ConnectionError("메시지 스트림이 끝났습니다")
+
+    async def _listen(self, transport) -> None:
+        async for topic, payload in transport.messages():
+            await self._command(topic, payload)
+
+    async def _publish_loop(self, transport) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            while self._dirty:
+                name = self._dirty.pop()
+                try:
+                    await transport.publish(
+                        self.state_topic(name),
+                        json.dumps(self._states[name], ensure_ascii=False),
+                        retain=True,
+                    )
+                except Exception:
+                    self._dirty.add(name)       # 재연결 후 다시 보냄
+                    raise
+
+    # ─── 명령 ───────────────────────────────────────────────
+
+    async def _command(self, topic: str, payload: bytes) -> None:
+        name = self._plug_from_command(topic)
+        if name is None:
+            return
+        action = payload.decode("utf-8", "replace").strip().lower()
+        if action not in ("on", "off"):
+            logger.warning(f"[MQTT] {topic}: 알 수 없는 명령 '{action[:20]}' (on/off)")
+            return
+        if name not in pyp100_service.plugs:
+            logger.warning(f"[MQTT] {topic}: 등록되지 않은 플러그 '{name}'")
+            return
+
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            user = db.query(User).filter_by(username=settings.MQTT_COMMAND_USER).first()
+            if user is None:
+                logger.warning(f"[MQTT] 명령 사용자 '{settings.MQTT_COMMAND_USER}' 가 없습니다 (MQTT_COMMAND_USER)")
+                return
+            try:
+                if action == "on":
+                    await sessions.acquire(db, name, user.id)
+                else:
+                    await sessions.release(db, name, user.id)
+            except PlugNotInUseException:
+                db.rollback()
+                logger.info(f"[MQTT] '{name}' off: 브리지 명의의 세션이 없음 — 건너뜀")
+                return
+            except Exception as e:
+                db.rollback()
+                logger.error(f"[MQTT] '{name}' {action} 실패: {e}")
+                return
+        logger.info(f"[MQTT] '{name}' {action} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+
+# 싱글톤
+mqtt_bridge = MqttBridge()
@@ -0,0 +1,75 @@
+# app/services/plug_listing.py
+"""
+플러그 목록 페이지 (GET /plugs/).
+
+플러그 이름을 정렬해 둔 인덱스에서 커서(마지막으로 받은 이름) 다음 위치를 bisect 로 찾고,
+필터를 적용하면서 limit + 1 개를 찾을 때까지만 훑습니다. 응답 크기와 작업량이 전체 플러그 수가 아니라
+페이지 크기에 비례하며, 이름 접두어 필터는 정렬 순서를 이용해 범위를 벗어나는 즉시 멈춥니다.
+
+커서는 마지막 이름의 base64url 이라 플러그가 추가·삭제돼도 다음 페이지가 어긋나지 않습니다.
+필터는 요청마다 다시 주어야 합니다 (커서에는 위치만 들어 있음).
+"""
+import base64
+import binascii
+import bisect
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.exceptions import InvalidCursorException
+from app.services.pyp100 import pyp100_service
+
+
+class PlugIndex:
+    """이름순 플러그 목록 — 설정(pyp100_service.plugs)이 바뀔 때만 다시 정렬합니다."""
+
+    def __init__(self):
+        self._source: Optional[Dict[str, str]] = None
+        self._count = 0
+        self._names: List[str] = []
+
+    def names(self) -> List[str]:
+        plugs = pyp100_service.plugs
+        if plugs is not self._source or len(plugs) != self._count:
+            self._names = sorted(plugs)
+            self._source, self._count = plugs, len(plugs)
+        return self._names
+
+
+def encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        name = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorException(cursor)
+    if not name:
+        raise InvalidCursorException(cursor)
+    return name
+
+
+def page(
+    after: Optional[str], limit: int, prefix: Optional[str] = None,
+    predicate: Optional[Callable[[str], bool]] = None,
+) -> Tuple[List[str], Optional[str]]:
+    """after 다음부터 조건에 맞는 이름 limit 개와, 더 있으면 다음 커서를 돌려줍니다."""
+    names = plug_index.names()
+    start = 0 if after is None else bisect.bisect_right(names, after)
+    if prefix:
+        start = max(start, bisect.bisect_left(names, prefix))
+
+    result: List[str] = []
+    for i in range(start, len(names)):
+        name = names[i]
+        if prefix and not name.startswith(prefix):
+            break
+        if predicate is not None and not predicate(name):
+            continue
+        if len(result) == limit:
+            return result, encode_cursor(result[-1])
+        result.append(name)
+    return result, None
+
+
+# 싱글톤
+plug_index = PlugIndex()
@@ -1,64 +1,378 @@
+import asyncio
 import logging
 from fastapi import HTTPException, status
-from plugp100.common.credentials import AuthCredential
-from plugp100.new.device_factory import (
-    connect,
-    DeviceConnectConfiguration,
-)
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple, TypeVar
 
 from app.config import settings
+from app.log import event
+from app.timing import span
+from app.request_context import current_deadline
+from app.services import device_batch
+from app.services.device_queue import device_queues, PRIORITY_COMMAND, PRIORITY_STATUS
+from app.services.discovery import plug_discovery, is_mac
+from app.services.edge_hub import edge_hub, site_of
+from app.services.handshake_cache import handshake_cache
+from app.services.state_cache import plug_state_cache
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# 멀티탭 콘센트 이름 구분자: "멀티탭/콘센트"
+OUTLET_SEP = "/"
+
 
 class Pyp100Service:
     """
     비동기 Tapo P100 제어 서비스 (plugp100 v5.1.4).
+
+    연결(핸드셰이크)은 플러그별로 캐시해 다음 호출에서 재사용하고, 같은 플러그에 대한
+    호출은 플러그별 우선순위 큐(device_queue)로 직렬화합니다 (ON/OFF 가 상태 조회보다 먼저).
+    명령과 뒤따르는 상태 조회는 펌웨어가 지원하면 multipleRequest 한 번으로 보냅니다 (device_batch).
+    캐시된 연결이 실패하면 한 번 새로 연결합니다. 새 연결은 지난번에 협상한 프로토콜/장치 종류
+    (handshake_cache)를 넘겨 탐색 왕복을 건너뛰고, 그래도 실패하면 전체 협상으로 다시 시도합니다.
+    plugp100 은 첫 연결 때 import 합니다 (서버 시작 시간 단축).
+
+    멀티탭(P300/P304, PLUG_STRIPS)은 콘센트마다 "멀티탭/콘센트" 이름의 플러그로 등록되고, 세션 참조
+    카운트도 콘센트별입니다. 연결·장치 큐는 멀티탭 단위로 하나를 공유하며, 상태는
+    get_child_device_list 한 번으로 모든 콘센트를 읽습니다 (동시에 들어온 콘센트별 조회는 한 번으로 합침).
+
+    PLUGS 값이 "edge:<사이트>" 인 플러그는 이 프로세스에서 연결하지 않고, 그 사이트의 엣지 에이전트에
+    명령을 넘깁니다 (edge_hub). 에이전트 쪽에서는 같은 이름이 실제 IP 로 설정되어 있습니다.
     """
 
     def __init__(self):
-        # 디버그 로그 추가
-        logger.debug(f"PLUGS 설정 초기화 시작: raw={settings.PLUGS_RAW!r}")
-        logger.debug(f"파싱된 PLUGS: {list(settings.PLUGS)}")
-        
+        self._plugs: Optional[Dict[str, str]] = None
+        self._outlets: Dict[str, Tuple[str, int]] = {}      # "멀티탭/콘센트" → (멀티탭, 위치)
+        self._child_ids: Dict[str, Dict[int, str]] = {}     # 멀티탭 → {위치: 자식 device_id}
+        self._strip_reads: Dict[str, asyncio.Task] = {}
+        self._devices: Dict[str, Any] = {}                  # 연결 키(플러그명 또는 멀티탭명) → 장치
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def _load_plugs(self) -> Dict[str, str]:
+        logger.debug("PLUGS 설정 초기화 시작: raw=%r", settings.PLUGS_RAW)
+
         # PlugConfig 리스트를 딕셔너리로 변환
-        self._plugs: Dict[str, str] = {
+        plugs: Dict[str, str] = {
             plug.name: plug.ip for plug in settings.PLUGS
         }
-        
-        logger.debug(f"최종 플러그 목록: {self._plugs}")
-        
-        if not self._plugs:
+
+        # IP 대신 MAC 으로 지정된 플러그는 발견 캐시의 마지막 IP 로 시작
+        for name, addr in list(plugs.items()):
+            if is_mac(addr):
+                plug_discovery.pin(name, addr)
+                plugs[name] = plug_discovery.ip_of(name) or ""
+
+        # 멀티탭은 콘센트 항목들로 펼친다 (모두 멀티탭의 주소와 연결을 공유)
+        self._outlets = {}
+        for strip, outlets in settings.PLUG_STRIPS.items():
+            if strip not in plugs:
+                logger.warning("PLUG_STRIPS 의 '%s' 가 PLUGS 에 없습니다", strip)
+                continue
+            ip = plugs.pop(strip)
+            for outlet, position in outlets.items():
+                name = f"{strip}{OUTLET_SEP}{outlet}"
+                plugs[name] = ip
+                self._outlets[name] = (strip, position)
+
+        logger.debug("최종 플러그 목록: %s", plugs)
+
+        if not plugs:
             logger.warning("유효한 플러그 설정이 없습니다. 환경변수 PLUGS를 확인하세요.")
+        return plugs
 
     @property
     def plugs(self) -> Dict[str, str]:
+        if self._plugs is None:
+            self._plugs = self._load_plugs()
         return self._plugs
 
+    def connection_of(self, name: str) -> str:
+        """플러그가 쓰는 연결 키 — 콘센트는 멀티탭 이름, 나머지는 플러그 이름 그대로."""
+        outlet = self.outlet(name)
+        return outlet[0] if outlet else name
+
+    def outlet(self, name: str) -> Optional[Tuple[str, int]]:
+        """멀티탭 콘센트면 (멀티탭, 위치), 아니면 None."""
+        if self._plugs is None:
+            self._plugs = self._load_plugs()
+        return self._outlets.get(name)
+
+    def _names_on(self, key: str) -> List[str]:
+        """연결 키를 공유하는 플러그 이름들."""
+        if key in self.plugs:
+            return [key]
+        return [name for name, (strip, _) in self._outlets.items() if strip == key]
+
+    def site_of(self, name: str) -> Optional[str]:
+        """엣지 에이전트를 거쳐 제어하는 플러그면 사이트 이름."""
+        return site_of(self.plugs.get(name))
+
+    def is_warm(self, name: str) -> bool:
+        """재사용 가능한 연결이 캐시되어 있는지 (원격 플러그는 에이전트 연결 여부)."""
+        site = self.site_of(name)
+        if site is not None:
+            return edge_hub.connected(site)
+        return self.connection_of(name) in self._devices
+
+    @property
+    def warm_fraction(self) -> float:
+        if not self.plugs:
+            return 1.0
+        return sum(1 for name in self.plugs if self.is_warm(name)) / len(self.plugs)
+
+    async def warm_up(self) -> int:
+        """
+        모든 플러그에 동시에 연결해 두고 상태 캐시를 채웁니다 (시작 직후 백그라운드 실행).
+        연결에 성공한 플러그 수를 돌려줍니다. 원격(엣지) 플러그는 에이전트가 상태를 보내므로 건너뜁니다.
+        """
+        names = [name for name in self.plugs if self.site_of(name) is None]
+        results = await asyncio.gather(
+            *(self.get_status(name) for name in names), return_exceptions=True
+        )
+        warmed = sum(1 for name in names if self.is_warm(name))
+        failed = [name for name, result in zip(names, results) if isinstance(result, BaseException)]
+        logger.info("[Pyp100Service] 연결 예열 완료: %d/%d (실패: %s)", warmed, len(names), failed or "-")
+        return warmed
+
+    def refresh_later(self, name: str) -> None:
+        """상태 조회를 백그라운드로 예약합니다 (플러그당 하나만). 원격 플러그는 에이전트가 변화를 보내므로 하지 않습니다."""
+        if self.site_of(name) is not None:
+            return
+        task = self._refreshing.get(name)
+        if task is None or task.done():
+            self._refreshing[name] = asyncio.create_task(self._refresh(name))
+
+    async def _refresh(self, name: str) -> None:
+        try:
+            await self.get_status(name)
+        except Exception:
+            pass    # get_status 에서 이미 로그를 남김
+
+    async def close(self) -> None:
+        for task in self._refreshing.values():
+            task.cancel()
+        self._refreshing.clear()
+        devices, self._devices = self._devices, {}
+        for device in devices.values():
+            await self._close_device(device)
+
+    async def _close_device(self, device) -> None:
+        try:
+            await device.client.close()
+        except Exception:
+            pass
+
+    async def _with_device(
+        self,
+        name: str,
+        op: Callable[[Any], Awaitable[T]],
+        refresh: bool = False,
+        priority: int = PRIORITY_COMMAND,
+    ) -> T:
+        """
+        장치 큐에서 차례를 받은 뒤 캐시된 연결로 op 를 실행합니다. 연결이 없거나 캐시된 연결에서
+        실패하면 새로 연결해(_connect) 한 번 더 실행합니다. refresh=True 면 캐시된 연결의 상태를 먼저 갱신.
+
+        차례를 기다리는 동안 요청 deadline 이 지나거나 요청이 취소되면 장치에 보내지 않습니다.
+        이미 장치에 보내기 시작한 호출은 요청이 취소되어도 끝까지 실행합니다 (연결 상태 보호).
+        멀티탭 콘센트는 멀티탭의 큐와 연결을 씁니다.
+        """
+        name = self.connection_of(name)
+        queue = device_queues.get(name)
+        await queue.acquire(priority, current_deadline())
+        try:
+            running = asyncio.ensure_future(self._run_device_op(name, op, refresh))
+        except BaseException:
+            queue.release()
+            raise
+        running.add_done_callback(lambda _: queue.release())
+        return await asyncio.shield(running)
+
+    async def _run_device_op(
+        self, name: str, op: Callable[[Any], Awaitable[T]], refresh: bool
+    ) -> T:
+        device = self._devices.get(name)
+        if device is not None:
+            try:
+                if refresh:
+                    await self._refresh_device(name, device)
+                return await op(device)
+            except Exception as e:
+                logger.warning("[Pyp100Service] '%s' 캐시된 연결 실패, 다시 연결합니다: %s", name, e)
+                self._devices.pop(name, None)
+                await self._close_device(device)
+
+        device = await self._connect(name)
+        self._devices[name] = device
+        return await op(device)
+
+    async def _refresh_device(self, name: str, device) -> None:
+        """device.update() — 지원하면 구성 요소별 조회까지 한 번의 묶음 요청으로."""
+        with span("tapo.update"):
+            if device_batch.supported(name, device):
+                try:
+                    return await device_batch.set_and_refresh(name, device)
+                except device_batch.BatchUnsupported:
+                    pass
+            await device.update()
+
+    async def _switch(self, name: str, device, on: bool) -> bool:
+        """ON/OFF 명령 후 실제 상태를 재조회합니다 — 지원하면 명령과 조회를 한 번의 묶음 요청으로."""
+        if device_batch.supported(name, device):
+            try:
+                with span("tapo.batch"):
+                    await device_batch.set_and_refresh(name, device, on)
+                return self._parse_state(device.raw_state)
+            except device_batch.BatchUnsupported:
+                pass
+        with span("tapo.command"):
+            await (device.turn_on() if on else device.turn_off())
+        # 실제로 바뀌었는지 재조회
+        with span("tapo.confirm"):
+            await device.update()
+        return self._parse_state(device.raw_state)
+
     async def _connect(self, name: str):
-        if name not in self._plugs:
+        """연결 키(플러그명 또는 멀티탭명)로 장치에 연결합니다."""
+        names = self._names_on(name)
+        if not names:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Plug '{name}' not found"
             )
-        ip = self._plugs[name]
-        creds = AuthCredential(settings.TAPO_EMAIL, settings.TAPO_PASSWORD)
-        cfg = DeviceConnectConfiguration(host=ip, port=81, credentials=creds)
+        ip = self.plugs[names[0]]
 
         try:
-            device = await connect(cfg)
-            # 최초 상태 채우기
-            await device.update()
-            return device
+            if not ip:
+                raise ConnectionError("IP 주소를 아직 찾지 못했습니다")
+            device = await self._open_known(name, ip)
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"[Pyp100Service] connect/update '{name}' failed: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Cannot communicate with plug '{name}' ({ip}): {e}"
-            )
+            # DHCP 로 주소가 바뀌었을 수 있으니 타임아웃을 반복하기 전에 한 번 재발견
+            new_ip = await self._rediscover(name, ip)
+            if new_ip is None:
+                logger.error("[Pyp100Service] connect/update '%s' failed: %s", name, e)
+                for plug in names:
+                    plug_state_cache.update(plug, None)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Cannot communicate with plug '{name}' ({ip}): {e}"
+                )
+            ip = new_ip
+            try:
+                device = await self._open_known(name, ip)
+            except Exception as e:
+                logger.error("[Pyp100Service] connect/update '%s' (%s) failed: %s", name, ip, e)
+                for plug in names:
+                    plug_state_cache.update(plug, None)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Cannot communicate with plug '{name}' ({ip}): {e}"
+                )
+
+        plug_discovery.remember(name, device.mac, ip)
+        handshake_cache.remember(name, device)
+        return device
+
+    async def _open_known(self, name: str, ip: str):
+        """저장된 협상 결과로 먼저 연결하고, 실패하면(시간 초과 제외) 전체 협상으로 한 번 더."""
+        known = handshake_cache.get(name)
+        if known:
+            try:
+                return await self._open(ip, known)
+            except TimeoutError:
+                raise       # 장치가 응답하지 않는 것 — 협상 방식을 바꿔도 소용없다
+            except Exception as e:
+                logger.warning("[Pyp100Service] '%s' 저장된 협상 정보로 연결 실패, 전체 협상으로 재시도: %s", name, e)
+                handshake_cache.forget(name)
+        return await self._open(ip)
+
+    async def _open(self, ip: str, known: Optional[dict] = None):
+        from plugp100.common.credentials import AuthCredential
+        from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+
+        creds = AuthCredential(settings.TAPO_EMAIL, settings.TAPO_PASSWORD)
+        cfg = DeviceConnectConfiguration(host=ip, port=81, credentials=creds, **(known or {}))
+        device = None
+
+        async def open_and_update():
+            nonlocal device
+            with span("tapo.connect"):
+                device = await connect(cfg)
+            # 최초 상태 채우기
+            with span("tapo.update"):
+                await device.update()
+
+        try:
+            await asyncio.wait_for(open_and_update(), settings.TAPO_CONNECT_TIMEOUT_SECONDS)
+            return device
+        except BaseException as e:
+            if device is not None:
+                await self._close_device(device)
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(f"{settings.TAPO_CONNECT_TIMEOUT_SECONDS}초 내 응답 없음") from e
+            raise
+
+    async def _rediscover(self, name: str, old_ip: str) -> Optional[str]:
+        if not settings.DISCOVERY_ENABLED:
+            return None
+        with span("tapo.discovery"):
+            new_ip = await plug_discovery.resolve(name)
+        if not new_ip or new_ip == old_ip:
+            return None
+        logger.warning(f"[Pyp100Service] '{name}' 주소 변경 감지: {old_ip or '-'} → {new_ip}")
+        for plug in self._names_on(name):
+            self._plugs[plug] = new_ip
+        return new_ip
+
+    # ─── 멀티탭 ────────────────────────────────────────────
+    async def _read_children(self, strip: str, device) -> Dict[str, Optional[bool]]:
+        """get_child_device_list 한 번으로 멀티탭의 모든 콘센트 상태를 읽어 상태 캐시에 반영합니다."""
+        with span("tapo.children"):
+            children = (await device.client.get_child_device_list()).get_or_raise()
+        by_position = {
+            int(child.get("position", -1)): child for child in children.get_children(lambda x: x)
+        }
+        self._child_ids[strip] = {
+            position: child.get("device_id") for position, child in by_position.items()
+        }
+        states: Dict[str, Optional[bool]] = {}
+        for name in self._names_on(strip):
+            child = by_position.get(self._outlets[name][1])
+            states[name] = self._parse_state(child) if child is not None else None
+            plug_state_cache.update(name, states[name])
+        return states
+
+    async def _read_strip(self, strip: str) -> Dict[str, Optional[bool]]:
+        """멀티탭 상태 읽기 — 진행 중인 읽기가 있으면 새로 보내지 않고 그 결과를 함께 기다린다."""
+        task = self._strip_reads.get(strip)
+        if task is None or task.done():
+            async def op(device) -> Dict[str, Optional[bool]]:
+                return await self._read_children(strip, device)
+
+            task = asyncio.ensure_future(self._with_device(strip, op, priority=PRIORITY_STATUS))
+            self._strip_reads[strip] = task
+        return await asyncio.shield(task)
+
+    async def _switch_outlet(self, name: str, device, on: bool) -> bool:
+        """콘센트 하나를 control_child 로 켜고/끈 뒤 멀티탭 전체 상태를 한 번에 재조회합니다."""
+        from plugp100.api.requests.tapo_request import TapoRequest
+
+        strip, position = self._outlets[name]
+        child_id = self._child_ids.get(strip, {}).get(position)
+        if child_id is None:
+            await self._read_children(strip, device)
+            child_id = self._child_ids[strip].get(position)
+            if child_id is None:
+                raise LookupError(f"멀티탭 '{strip}' 에 {position}번 콘센트가 없습니다")
+        with span("tapo.command"):
+            request = TapoRequest.set_device_info({"device_on": on})
+            (await device.client.control_child(child_id, request)).get_or_raise()
+        with span("tapo.confirm"):
+            states = await self._read_children(strip, device)
+        return bool(states[name])
 
     def _parse_state(self, raw: dict[str, Any]) -> bool:
         """
@@ -85,64 +399,75 @@ class Pyp100Service:
         return False
 
     async def turn_on(self, name: str) -> bool:
-        device = await self._connect(name)
+        async def op(device) -> bool:
+            if self.outlet(name):
+                return await self._switch_outlet(name, device, True)
+            return await self._switch(name, device, True)
+
+        site = self.site_of(name)
         try:
-            await device.turn_on()
-            # 실제로 켜졌는지 재조회
-            await device.update()
-            state = self._parse_state(device.raw_state)
-            logger.info(f"[Pyp100Service] '{name}' turn_on → {'on' if state else 'off'}")
-            return state
+            state = await (edge_hub.call(site, "on", name) if site else self._with_device(name, op))
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"[Pyp100Service] turn_on '{name}' failed: {e}")
-            return False
-        finally:
-            # 세션은 꼭 닫아 줍니다
-            try:
-                await device.session.close()
-            except:
-                pass
+            logger.error("[Pyp100Service] turn_on '%s' failed: %s", name, e)
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Cannot turn on '{name}': {e}"
+            )
+        plug_state_cache.update(name, state)
+        event(logger, "device.turn_on", plug=name, state=state)
+        return state
 
     async def turn_off(self, name: str) -> bool:
-        device = await self._connect(name)
+        async def op(device) -> bool:
+            if self.outlet(name):
+                return await self._switch_outlet(name, device, False)
+            return await self._switch(name, device, False)
+
+        site = self.site_of(name)
         try:
-            await device.turn_off()
-            await device.update()
-            state = self._parse_state(device.raw_state)
-            logger.info(f"[Pyp100Service] '{name}' turn_off → {'on' if state else 'off'}")
-            return state
+            state = await (edge_hub.call(site, "off", name) if site else self._with_device(name, op))
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"[Pyp100Service] turn_off '{name}' failed: {e}")
-            # 실패 시에도 raw_state 로 남아 있는 실제 상태를 리턴
-            try:
-                await device.update()
-                return self._parse_state(device.raw_state)
-            except:
-                return True
-        finally:
-            try:
-                await device.session.close()
-            except:
-                pass
+            # 상태를 추측해 돌려주지 않는다 — 호출자(Reconciler)가 실패로 보고 재시도
+            logger.error("[Pyp100Service] turn_off '%s' failed: %s", name, e)
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Cannot turn off '{name}': {e}"
+            )
+        plug_state_cache.update(name, state)
+        event(logger, "device.turn_off", plug=name, state=state)
+        return state
 
     async def get_status(self, name: str) -> bool:
-        device = await self._connect(name)
+        async def op(device) -> bool:
+            return self._parse_state(device.raw_state)
+
+        site = self.site_of(name)
         try:
-            raw = device.raw_state
-            state = self._parse_state(raw)
-            logger.info(f"[Pyp100Service] '{name}' status → {'on' if state else 'off'}")
-            return state
+            if site:
+                state = await edge_hub.call(site, "status", name)
+            elif self.outlet(name):
+                strip, position = self.outlet(name)
+                state = (await self._read_strip(strip)).get(name)
+                if state is None:
+                    raise LookupError(f"멀티탭 '{strip}' 에 {position}번 콘센트가 없습니다")
+            else:
+                # 새 연결은 _open 에서 이미 update() 했으므로 캐시된 연결만 갱신
+                state = await self._with_device(name, op, refresh=True, priority=PRIORITY_STATUS)
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"[Pyp100Service] get_status '{name}' failed: {e}")
+            logger.error("[Pyp100Service] get_status '%s' failed: %s", name, e)
             raise HTTPException(
                 status_code=status.HTTP_502_BAD_GATEWAY,
                 detail=f"Cannot get status for '{name}': {e}"
             )
-        finally:
-            try:
-                await device.session.close()
-            except:
-                pass
+        plug_state_cache.update(name, state)
+        event(logger, "device.status", logging.DEBUG, plug=name, state=state)
+        return state
 
 
 # 싱글톤
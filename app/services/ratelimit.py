@@ -0,0 +1,107 @@
+# app/services/ratelimit.py
+"""
+토큰 버킷 기반 요청 제한(admission control).
+
+- 버킷은 (종류, 키) 마다 하나이며, 검사할 때 지난 시간만큼 토큰을 채우는 방식이라
+  타이머/백그라운드 작업 없이 검사 한 번이 O(1) 입니다.
+- 버킷 수는 RATE_LIMIT_MAX_KEYS 로 제한되는 LRU(OrderedDict) 이므로 메모리가 무한히 늘지 않습니다.
+  오래 안 쓴 버킷은 어차피 가득 찬 상태이므로 버려도 동작이 바뀌지 않습니다.
+- 여러 버킷(사용자, 사용자×플러그, 장치)을 한 번에 검사해 모두 통과할 때만 소비합니다.
+  장치 버킷은 연결(pyp100_service.connection_of) 단위라 멀티탭의 콘센트들이 하나를 나눠 씁니다.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional
+
+from app.config import settings
+from app.services.pyp100 import pyp100_service
+
+
+class Limit(NamedTuple):
+    per_minute: float
+    burst: int
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    def __init__(self, max_keys: Optional[int] = None):
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _bucket(self, key: Hashable, limit: Limit, now: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(float(limit.burst), now)
+            max_keys = self._max_keys or settings.RATE_LIMIT_MAX_KEYS
+            if len(self._buckets) > max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            rate = limit.per_minute / 60.0
+            bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        return bucket
+
+    def admit(self, checks: List[tuple], cost: float = 1.0) -> float:
+        """
+        checks: [(key, Limit), ...]
+        모두 통과하면 각 버킷에서 cost 만큼 소비하고 0 을, 아니면 아무것도 소비하지 않고
+        다시 시도할 수 있을 때까지의 초를 돌려줍니다.
+        """
+        now = time.monotonic()
+        buckets = [(self._bucket(key, limit, now), limit) for key, limit in checks]
+        wait = 0.0
+        for bucket, limit in buckets:
+            if bucket.tokens < cost:
+                if limit.per_minute <= 0:
+                    return math.inf
+                wait = max(wait, (cost - bucket.tokens) * 60.0 / limit.per_minute)
+        if wait > 0:
+            return wait
+        for bucket, _ in buckets:
+            bucket.tokens -= cost
+        return 0.0
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+def role_limit(role: Optional[str]) -> Limit:
+    limits = settings.RATE_LIMIT_ROLES
+    conf = limits.get(role or "user") or limits.get("user") or {}
+    return Limit(
+        float(conf.get("per_minute", settings.RATE_LIMIT_USER_PER_MINUTE)),
+        int(conf.get("burst", settings.RATE_LIMIT_USER_BURST)),
+    )
+
+
+def plug_checks(user: str, role: Optional[str], plugs: List[str]) -> List[tuple]:
+    """플러그 명령 한 번에 적용되는 버킷 목록 (사용자 / 사용자×플러그 / 장치)."""
+    user_plug = Limit(settings.RATE_LIMIT_USER_PLUG_PER_MINUTE, settings.RATE_LIMIT_USER_PLUG_BURST)
+    device = Limit(settings.RATE_LIMIT_DEVICE_PER_MINUTE, settings.RATE_LIMIT_DEVICE_BURST)
+    checks = [(("user", user), role_limit(role))]
+    for plug in plugs:
+        checks.append((("user-plug", user, plug), user_plug))
+    # 같은 멀티탭의 콘센트는 한 장치 — 한 요청(그룹 명령)에서 한 번만 소비
+    for connection in dict.fromkeys(pyp100_service.connection_of(plug) for plug in plugs):
+        checks.append((("device", connection), device))
+    return checks
+
+
+def retry_after_seconds(wait: float) -> int:
+    return 3600 if math.isinf(wait) else max(1, math.ceil(wait))
+
+
+# 싱글톤
+rate_limiter = RateLimiter()
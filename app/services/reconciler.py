@@ -0,0 +1,385 @@
+# app/services/reconciler.py
+"""
+목표 상태(desired state) 조정 루프.
+
+- 세션 참조 카운트가 플러그의 목표 상태를 정합니다 (사용자가 있으면 ON, 없으면 OFF).
+  acquire/release 는 목표를 desired_plug_states 테이블(저널)에 커밋하고 바로 돌아옵니다.
+- Reconciler 는 목표와 상태 캐시(plug_state_cache)의 관측값을 비교해, 반영되지 않은 명령이나
+  어긋난 플러그에 장치 명령을 보냅니다. 실패하면 지수 백오프로 재시도하고, 저널이 DB 에 있으므로
+  재시작 후에도 이어서 재시도합니다 (장치가 꺼져 있던 동안의 OFF 명령 등).
+- RECONCILE_INTERVAL_SECONDS 마다 저널을 다시 읽어 다른 워커의 변경을 반영하고,
+  세션 수와 어긋난 저널 행이 있으면 세션 수 기준으로 바로잡습니다. DB 작업은 스레드에서 하므로
+  이벤트 루프를 막지 않습니다.
+- 반영이 끝난 뒤 밖에서(버튼·앱) 바뀐 상태는 RECONCILE_CORRECT_EXTERNAL 을 켠 경우에만 되돌립니다.
+- 그룹·tapoctl 처럼 한 번에 여러 목표가 바뀌어도 장치 명령은 동시에 GROUP_MAX_CONCURRENCY 개까지만 보냅니다.
+- 플러그별로 목표와 어긋나 있던 시간(drift)을 집계합니다 (GET /debug/drift).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.log import event
+from app.models import DesiredPlugState, PlugSession
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _PlugSync:
+    """플러그별 조정 상태와 drift 지표 (메모리)."""
+    __slots__ = ("desired", "version", "pending", "attempts", "next_attempt", "last_error",
+                 "drift_since", "drift_count", "drift_total", "drift_max")
+
+    def __init__(self):
+        self.desired = False
+        self.version = 0
+        self.pending = False            # 저널의 applied_at 이 비어 있음
+        self.attempts = 0
+        self.next_attempt = 0.0         # time.monotonic()
+        self.last_error: Optional[str] = None
+        self.drift_since: Optional[float] = None     # time.time()
+        self.drift_count = 0
+        self.drift_total = 0.0
+        self.drift_max = 0.0
+
+    def out_of_sync(self, now: float) -> None:
+        if self.drift_since is None:
+            self.drift_since = now
+            self.drift_count += 1
+
+    def in_sync(self, now: float) -> None:
+        if self.drift_since is not None:
+            elapsed = now - self.drift_since
+            self.drift_total += elapsed
+            self.drift_max = max(self.drift_max, elapsed)
+            self.drift_since = None
+
+
+class Reconciler:
+    def __init__(self):
+        self._plugs: Dict[str, _PlugSync] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._limit: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ─── 목표 기록 ─────────────────────────────────────────
+    def set_desired(self, db: Session, name: str, on: bool) -> bool:
+        """
+        목표 상태를 저널에 커밋합니다. 이미 같은 목표면 아무것도 하지 않고 False.
+        장치 명령은 Reconciler 루프가 보내므로 호출자는 기다리지 않습니다.
+        """
+        return bool(self.set_desired_many(db, [name], on))
+
+    def set_desired_many(self, db: Session, names: Iterable[str], on: bool) -> List[str]:
+        """여러 플러그의 목표를 한 번의 커밋으로 기록하고, 목표가 바뀐 플러그 목록을 돌려줍니다."""
+        return self.load_desired(self.write_desired(db, names, on))
+
+    def write_desired(self, db: Session, names: Iterable[str], on: bool) -> List[DesiredPlugState]:
+        """
+        set_desired_many 의 DB 작업만 합니다 (메모리 상태는 건드리지 않으므로 스레드에서 불러도 됨).
+        목표가 바뀐 저널 행을 돌려주며, 이벤트 루프에서 load_desired 로 반영해야 루프가 명령을 보냅니다.
+        """
+        names = list(names)
+        if not names:
+            return []
+        rows = {
+            row.plug_name: row
+            for row in db.query(DesiredPlugState).filter(DesiredPlugState.plug_name.in_(names))
+        }
+        changed = []
+        for name in names:
+            row = rows.get(name)
+            if row is not None and row.desired == on:
+                continue
+            if row is None:
+                row = rows[name] = DesiredPlugState(plug_name=name, version=0)
+                db.add(row)
+            self._journal(row, on)
+            changed.append(name)
+        if not changed:
+            return []
+        db.commit()
+        return [rows[name] for name in changed]
+
+    def load_desired(self, rows: List[DesiredPlugState]) -> List[str]:
+        """write_desired 가 커밋한 행을 메모리에 반영하고 루프를 깨웁니다 (이벤트 루프에서)."""
+        for row in rows:
+            self._load(row)
+            event(logger, "reconcile.desired", plug=row.plug_name, desired=row.desired, version=row.version)
+        if rows:
+            self._notify()
+        return [row.plug_name for row in rows]
+
+    @staticmethod
+    def _journal(row: DesiredPlugState, on: bool) -> None:
+        row.desired = on
+        row.version = (row.version or 0) + 1
+        row.requested_at = datetime.utcnow()
+        row.applied_at = None
+        row.attempts = 0
+        row.last_error = None
+
+    def _load(self, row: DesiredPlugState) -> None:
+        state = self._plugs.get(row.plug_name)
+        if state is None:
+            state = self._plugs[row.plug_name] = _PlugSync()
+        if row.version < state.version:
+            return      # 스레드에서 읽는 사이 다른 요청이 더 새 목표를 커밋함
+        if row.version != state.version:
+            # 새 목표 — 백오프를 초기화하고 바로 시도
+            state.attempts = 0
+            state.next_attempt = 0.0
+            state.last_error = row.last_error
+        state.desired = bool(row.desired)
+        state.version = row.version
+        state.pending = row.applied_at is None
+
+    def is_pending(self, name: str) -> bool:
+        state = self._plugs.get(name)
+        return state is not None and state.pending
+
+    def desired(self, name: str) -> Optional[bool]:
+        state = self._plugs.get(name)
+        return state.desired if state else None
+
+    # ─── 저널 동기화 ───────────────────────────────────────
+    def sync(self) -> int:
+        """
+        저널을 다시 읽고, 세션 수와 어긋난 행(커밋 사이 중단 등)을 바로잡습니다.
+        바로잡은 행 수를 돌려줍니다. 이벤트 루프에서는 sync_async() 를 쓰세요.
+        """
+        fixed, rows = self._read_journal()
+        for row in rows:
+            self._load(row)
+        return fixed
+
+    async def sync_async(self) -> int:
+        """sync() 의 DB 작업을 스레드에서 실행하고, 메모리 반영만 루프에서 합니다."""
+        fixed, rows = await asyncio.to_thread(self._read_journal)
+        for row in rows:
+            self._load(row)
+        return fixed
+
+    def _read_journal(self) -> Tuple[int, List[DesiredPlugState]]:
+        """DB 작업만 합니다 (메모리 상태는 건드리지 않음). 세션을 닫은 뒤에도 읽을 수 있는 행을 돌려줍니다."""
+        fixed = 0
+        with SessionLocal(expire_on_commit=False) as db:
+            counts = dict(
+                db.query(PlugSession.plug_name, func.count(PlugSession.id))
+                .group_by(PlugSession.plug_name)
+                .all()
+            )
+            rows = {row.plug_name: row for row in db.query(DesiredPlugState)}
+            for name in set(counts) | set(rows):
+                want = counts.get(name, 0) > 0
+                row = rows.get(name)
+                if row is None or row.desired != want:
+                    if row is None:
+                        row = rows[name] = DesiredPlugState(plug_name=name, version=0)
+                        db.add(row)
+                    self._journal(row, want)
+                    fixed += 1
+            if fixed:
+                db.commit()
+        return fixed, list(rows.values())
+
+    # ─── 루프 ──────────────────────────────────────────────
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        fixed = await self.sync_async()
+        pending = sum(1 for state in self._plugs.values() if state.pending)
+        self._task = asyncio.create_task(self._run(), name="plug-reconciler")
+        logger.info(f"[Reconciler] 시작: 플러그 {len(self._plugs)}개, 반영 대기 {pending}개 (세션 기준 보정 {fixed}개)")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._inflight.values()):
+            task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._inflight.clear()
+        self._limit = None
+
+    def _notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _needs_action(self, state: _PlugSync, observed: Optional[bool]) -> bool:
+        if state.pending:
+            return True
+        # 반영이 끝난 뒤 밖에서(버튼/앱) 바뀐 경우
+        return settings.RECONCILE_CORRECT_EXTERNAL and observed is not None and observed != state.desired
+
+    async def _run(self) -> None:
+        next_sync = time.monotonic() + settings.RECONCILE_INTERVAL_SECONDS
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if now >= next_sync:
+                try:
+                    await self.sync_async()
+                except Exception as e:
+                    logger.error(f"[Reconciler] 저널 동기화 실패: {e}")
+                next_sync = now + settings.RECONCILE_INTERVAL_SECONDS
+
+            wake_at = next_sync
+            wall = time.time()
+            for name, state in self._plugs.items():
+                if name not in pyp100_service.plugs:
+                    continue
+                observed = plug_state_cache.status(name)
+                if not self._needs_action(state, observed):
+                    if observed == state.desired:
+                        state.in_sync(wall)
+                    continue
+                if observed != state.desired:
+                    state.out_of_sync(wall)
+                if name in self._inflight:
+                    continue
+                if state.next_attempt > now:
+                    wake_at = min(wake_at, state.next_attempt)
+                    continue
+                self._inflight[name] = asyncio.create_task(self._apply(name, state.desired, state.version))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, wake_at - now))
+            except asyncio.TimeoutError:
+                pass
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """동시 장치 명령 제한. 루프 없이 apply_now 만 쓰는 프로세스(tapoctl)도 있어 이벤트 루프마다 새로 만든다."""
+        loop = asyncio.get_running_loop()
+        if self._limit is None or self._limit[0] is not loop:
+            self._limit = (loop, asyncio.Semaphore(settings.GROUP_MAX_CONCURRENCY))
+        return self._limit[1]
+
+    async def _apply(self, name: str, desired: bool, version: int) -> None:
+        state = self._plugs[name]
+        error: Optional[str] = None
+        try:
+            action = pyp100_service.turn_on if desired else pyp100_service.turn_off
+            async with self._semaphore():
+                observed = await action(name)
+            if observed != desired:
+                error = f"명령 후 상태가 {'ON' if observed else 'OFF'}"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(getattr(e, "detail", e))
+        finally:
+            self._inflight.pop(name, None)
+
+        try:
+            if error is None:
+                state.attempts = 0
+                state.next_attempt = 0.0
+                state.last_error = None
+                if state.version == version:
+                    state.pending = False
+                    state.in_sync(time.time())
+                self._record(name, version, applied=True)
+                event(logger, "reconcile.applied", plug=name, desired=desired, version=version)
+            else:
+                state.attempts += 1
+                delay = min(settings.RECONCILE_BACKOFF_MAX_SECONDS,
+                            settings.RECONCILE_BACKOFF_SECONDS * 2 ** (state.attempts - 1))
+                state.next_attempt = time.monotonic() + delay
+                state.last_error = error
+                self._record(name, version, applied=False, attempts=state.attempts, error=error)
+                logger.warning("[Reconciler] '%s' %s 반영 실패 (%d회째, %.0f초 후 재시도): %s",
+                               name, "ON" if desired else "OFF", state.attempts, delay, error)
+        finally:
+            self._notify()
+
+    async def apply_now(self, name: str) -> bool:
+        """
+        반영 대기 중인 목표를 루프를 기다리지 않고 바로 장치에 보냅니다 (tapoctl 처럼 루프가 없는 프로세스용).
+        반영됐으면(또는 대기 중이 아니면) True, 실패하면 False (오류는 저널에 남고 서버의 Reconciler 가 이어서 재시도).
+        """
+        state = self._plugs.get(name)
+        if state is None or not state.pending:
+            return True
+        # 루프가 이미 반영 중이면 그 결과를 기다린다 (같은 플러그에 명령을 두 번 보내지 않도록)
+        task = self._inflight.get(name)
+        if task is None:
+            task = self._inflight[name] = asyncio.create_task(self._apply(name, state.desired, state.version))
+        await task
+        return not state.pending
+
+    def retry_now(self, names: Iterable[str]) -> int:
+        """
+        반영 대기 중인 플러그의 백오프를 풀고 루프를 깨웁니다 (엣지 에이전트 재연결 직후 등).
+        명령은 루프가 보내므로 이미 반영 중인 플러그와 겹치지 않습니다. 대상 플러그 수를 돌려줍니다.
+        """
+        count = 0
+        for name in names:
+            state = self._plugs.get(name)
+            if state is not None and state.pending:
+                state.attempts = 0
+                state.next_attempt = 0.0
+                count += 1
+        if count:
+            self._notify()
+        return count
+
+    def last_error(self, name: str) -> Optional[str]:
+        state = self._plugs.get(name)
+        return state.last_error if state else None
+
+    @staticmethod
+    def _record(name: str, version: int, applied: bool, attempts: int = 0, error: Optional[str] = None) -> None:
+        """저널 행에 결과를 남깁니다. 그 사이 목표가 바뀌었으면(version) 건드리지 않습니다."""
+        values = {"attempts": attempts, "last_error": error[:200] if error else None}
+        if applied:
+            values["applied_at"] = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                (
+                    db.query(DesiredPlugState)
+                    .filter_by(plug_name=name, version=version)
+                    .update(values, synchronize_session=False)
+                )
+                db.commit()
+        except Exception as e:
+            logger.error(f"[Reconciler] '{name}' 저널 기록 실패: {e}")
+
+    # ─── 지표 ──────────────────────────────────────────────
+    def stats(self) -> List[dict]:
+        now, mono = time.time(), time.monotonic()
+        result = []
+        for name, state in sorted(self._plugs.items()):
+            current = now - state.drift_since if state.drift_since is not None else 0.0
+            result.append({
+                "plug": name,
+                "desired": state.desired,
+                "observed": plug_state_cache.status(name),
+                "pending": state.pending,
+                "out_of_sync_seconds": round(current, 1),
+                "drift_count": state.drift_count,
+                "drift_total_seconds": round(state.drift_total + current, 1),
+                "drift_max_seconds": round(max(state.drift_max, current), 1),
+                "attempts": state.attempts,
+                "next_attempt_seconds": round(max(0.0, state.next_attempt - mono), 1) if state.attempts else None,
+                "last_error": state.last_error,
+            })
+        return result
+
+
+# 싱글톤
+reconciler = Reconciler()
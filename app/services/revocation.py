@@ -0,0 +1,146 @@
+# app/services/revocation.py
+"""
+JWT 폐기 목록(denylist).
+
+- 폐기된 jti 는 revoked_tokens 테이블에 기록하고, 요청마다의 검사는 메모리 dict 로만
+  수행합니다 (DB 조회 없음, O(1)).
+- 다른 워커가 폐기한 토큰은 REVOCATION_SYNC_SECONDS 마다 revoked_at 이 마지막으로
+  본 시각 이후인 행만 읽어 합칩니다.
+- 항목은 토큰 만료 시각에 DeadlineQueue 로 메모리에서 빠지고, DB 행도 같은 주기로 정리됩니다.
+- refresh 토큰은 로그인마다 새 계열(family, 토큰의 fam)을 갖고 회전해도 계열을 물려받습니다.
+  이미 쓴 refresh 토큰이 다시 오면(재사용 — 탈취 의심) 계열 전체를 "fam:<id>" 항목으로 폐기해
+  그 계열의 access/refresh 토큰이 모두 거절됩니다.
+- revoke() 는 스레드풀의 동기 라우트에서, sync() 는 스레드(asyncio.to_thread)에서 불리므로 메모리 상태(dict·큐)는
+  잠금 안에서만 바꿉니다. DB 작업은 잠금 밖에서 합니다.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import RevokedToken
+from app.services.deadlines import DeadlineQueue, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+FAMILY_PREFIX = "fam:"
+
+
+class TokenDenylist:
+    def __init__(self):
+        self._expires: Dict[str, float] = {}     # jti → 토큰 만료 timestamp
+        self._queue = DeadlineQueue()
+        self._lock = threading.Lock()
+        self._synced_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        exp = self._expires.get(jti)
+        return exp is not None and exp > time.time()
+
+    def is_family_revoked(self, family: Optional[str]) -> bool:
+        return bool(family) and self.is_revoked(FAMILY_PREFIX + family)
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> bool:
+        """
+        토큰을 폐기합니다. expires_at 은 토큰의 exp (naive UTC).
+        이 호출이 폐기를 기록했으면 True, 이미 폐기되어 있었으면(다른 요청·워커가 먼저) False.
+        jti 가 기본 키라 INSERT 는 한 요청만 성공하므로, refresh 회전의 "한 번만 사용" 검사로 씁니다.
+        """
+        if not jti or jti in self._expires:
+            return False
+        recorded = False
+        if db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+            try:
+                db.commit()
+                recorded = True
+            except IntegrityError:
+                db.rollback()       # 동시에 들어온 다른 요청(또는 다른 워커)이 먼저 기록함
+        with self._lock:
+            self._remember(jti, to_timestamp(expires_at))
+        return recorded
+
+    def revoke_family(self, db: Session, family: str) -> bool:
+        """refresh 계열 전체를 폐기합니다 (계열의 토큰은 REFRESH_TOKEN_EXPIRE_DAYS 안에 모두 만료)."""
+        expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        return self.revoke(db, FAMILY_PREFIX + family, expires_at)
+
+    def _remember(self, jti: str, exp: float) -> None:
+        """self._lock 을 잡은 상태에서 호출합니다."""
+        if jti in self._expires:
+            return
+        self._expires[jti] = exp
+        self._queue.push(jti, exp)
+
+    def _prune(self) -> None:
+        """self._lock 을 잡은 상태에서 호출합니다."""
+        for _, jti in self._queue.pop_due(time.time()):
+            self._expires.pop(jti, None)
+
+    def sync(self) -> int:
+        """다른 워커가 추가한 폐기 항목을 읽어오고, 만료된 행을 지웁니다."""
+        now = datetime.utcnow()
+        # 커밋 시각과 revoked_at 사이의 작은 차이를 덮도록 약간 겹쳐 읽는다
+        since = self._synced_at - timedelta(seconds=5) if self._synced_at else None
+        with SessionLocal() as db:
+            query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+                RevokedToken.expires_at > now
+            )
+            if since is not None:
+                query = query.filter(RevokedToken.revoked_at >= since)
+            rows = query.all()
+            db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete()
+            db.commit()
+        self._synced_at = now
+        added = 0
+        with self._lock:
+            for jti, expires_at in rows:
+                if jti not in self._expires:
+                    self._remember(jti, to_timestamp(expires_at))
+                    added += 1
+            self._prune()
+        return added
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        await asyncio.to_thread(self.sync)
+        self._task = asyncio.create_task(self._run(), name="token-denylist-sync")
+        logger.info(f"[TokenDenylist] 시작: 폐기된 토큰 {len(self._expires)}개")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                added = await asyncio.to_thread(self.sync)
+                if added:
+                    logger.debug("[TokenDenylist] 다른 워커의 폐기 %d건 반영", added)
+            except Exception as e:
+                logger.error(f"[TokenDenylist] 동기화 실패: {e}")
+
+
+# 싱글톤
+token_denylist = TokenDenylist()
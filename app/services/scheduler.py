@@ -0,0 +1,227 @@
+# app/services/scheduler.py
+"""
+프로세스 내 플러그 스케줄러.
+
+- 스케줄은 DB(plug_schedules)에 저장되고, 메모리에는 (다음 실행 시각, id) 힙만 유지합니다.
+  스케줄 수가 수천 개여도 대기/등록/취소가 모두 O(log n) 입니다.
+- 같은 시각에 도래한 스케줄은 하나의 배치로 묶어 동시에(fan-out) 실행합니다.
+- 실행은 app.services.sessions 의 acquire/release 와 같은 단계(acquire_rows → acquired 등)를 쓰므로
+  reserve_on / release_off 와 동일한 참조 카운트 규칙을 따릅니다. DB 작업은 스레드에서 하므로
+  이벤트 루프를 막지 않습니다.
+- 재시작 시 SCHEDULE_MISFIRE_GRACE_SECONDS 이내에 놓친 실행은 즉시 한 번 복구합니다.
+"""
+import asyncio
+import itertools
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+from app.db import SessionLocal
+from app.exceptions import InvalidScheduleException, PlugNotInUseException
+from app.models import PlugSchedule
+from app.services import sessions
+from app.services.deadlines import DeadlineQueue, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+ALL_WEEKDAYS = 0x7F
+_TIME_OF_DAY = re.compile(r"^([01]\d|2[0-3]):([0-5]\d)$")
+
+
+# -------------------------------------------------------------------
+# 시간 계산 helpers (DB 에는 기존 컬럼과 같이 naive UTC 로 저장)
+# -------------------------------------------------------------------
+def parse_time_of_day(value: str) -> Tuple[int, int]:
+    match = _TIME_OF_DAY.match(value or "")
+    if not match:
+        raise InvalidScheduleException(f"time_of_day 는 'HH:MM' 형식이어야 합니다: {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def weekdays_to_mask(days: List[int]) -> int:
+    mask = 0
+    for day in days:
+        if not 0 <= day <= 6:
+            raise InvalidScheduleException(f"weekdays 는 0(월)~6(일) 사이여야 합니다: {day}")
+        mask |= 1 << day
+    return mask
+
+
+def mask_to_weekdays(mask: int) -> List[int]:
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+def next_run(schedule: PlugSchedule, after: datetime) -> Optional[datetime]:
+    """after(naive UTC) 이후의 다음 실행 시각. 더 이상 실행할 일이 없으면 None."""
+    if not schedule.time_of_day:
+        # 1회성 스케줄
+        if schedule.run_at and schedule.run_at > after:
+            return schedule.run_at
+        return None
+
+    hour, minute = parse_time_of_day(schedule.time_of_day)
+    mask = ALL_WEEKDAYS if schedule.weekdays is None else schedule.weekdays
+    tz = ZoneInfo(settings.SCHEDULE_TIMEZONE)
+    local_after = after.replace(tzinfo=timezone.utc).astimezone(tz)
+    for offset in range(8):
+        day = local_after.date() + timedelta(days=offset)
+        if not mask & (1 << day.weekday()):
+            continue
+        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        if candidate > local_after:
+            return candidate.astimezone(timezone.utc).replace(tzinfo=None)
+    return None
+
+
+class PlugScheduler:
+    """plug_schedules 를 deadline 힙으로 구동하는 단일 asyncio 태스크."""
+
+    def __init__(self):
+        self._queue = DeadlineQueue()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._load()
+        self._task = asyncio.create_task(self._run(), name="plug-scheduler")
+        logger.info(f"[PlugScheduler] 시작: 대기 중인 스케줄 {len(self._queue)}개")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def schedule(self, schedule_id: int, next_run_at: Optional[datetime]) -> None:
+        """스케줄 생성/변경 후 호출 — 다음 실행 시각을 힙에 반영합니다."""
+        if next_run_at is None:
+            self._queue.discard(schedule_id)
+        else:
+            self._queue.push(schedule_id, to_timestamp(next_run_at))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def unschedule(self, schedule_id: int) -> None:
+        self.schedule(schedule_id, None)
+
+    def _load(self) -> None:
+        """DB 에서 활성 스케줄을 읽어 힙을 채우고, 놓친 실행을 정리합니다."""
+        now = datetime.utcnow()
+        oldest_allowed = now - timedelta(seconds=settings.SCHEDULE_MISFIRE_GRACE_SECONDS)
+        recovered = skipped = 0
+        with SessionLocal() as db:
+            rows = db.query(PlugSchedule).filter(PlugSchedule.enabled.is_(True)).all()
+            for sched in rows:
+                if sched.next_run_at is None:
+                    continue
+                if sched.next_run_at < oldest_allowed:
+                    # 허용 범위를 넘겨 놓친 실행은 버리고 다음 주기로 넘어간다
+                    skipped += 1
+                    sched.next_run_at = next_run(sched, now)
+                    if sched.next_run_at is None:
+                        sched.enabled = False
+                        continue
+                elif sched.next_run_at <= now:
+                    # 과거 시각 그대로 넣으면 시작 직후 원래 순서대로 실행된다
+                    recovered += 1
+                self._queue.push(sched.id, to_timestamp(sched.next_run_at))
+            db.commit()
+        if recovered or skipped:
+            logger.warning(
+                f"[PlugScheduler] 놓친 실행 복구 {recovered}건, 허용 시간 초과로 건너뜀 {skipped}건"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            deadline = self._queue.peek()
+            delay = None if deadline is None else deadline - time.time()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._queue.pop_due(time.time())
+            # 같은 시각에 도래한 스케줄끼리 한 번에 fan-out, 시각 순서는 유지
+            for _, batch in itertools.groupby(due, key=lambda item: item[0]):
+                try:
+                    await self._fire_batch([key for _, key in batch])
+                except Exception as e:
+                    logger.error(f"[PlugScheduler] 배치 실행 실패: {e}", exc_info=True)
+
+    async def _fire_batch(self, schedule_ids: List[int]) -> None:
+        limit = asyncio.Semaphore(settings.SCHEDULER_MAX_CONCURRENCY)
+
+        async def run(schedule_id: int) -> None:
+            async with limit:
+                await self._fire(schedule_id)
+
+        await asyncio.gather(*(run(schedule_id) for schedule_id in schedule_ids))
+
+    async def _fire(self, schedule_id: int) -> None:
+        # DB 작업(스케줄·세션·저널)은 스레드에서 하고, 메모리 반영(Reconciler·이벤트·힙)만 루프에서
+        fired = await asyncio.to_thread(self._fire_rows, schedule_id)
+        if fired is None:
+            return
+        action, change, next_run_at = fired
+        if change is not None:
+            if action == "on":
+                sessions.acquired(change)
+            else:
+                sessions.released(change)
+        if next_run_at is not None:
+            self._queue.push(schedule_id, to_timestamp(next_run_at))
+
+    @staticmethod
+    def _fire_rows(
+        schedule_id: int,
+    ) -> Optional[Tuple[str, Optional[sessions.SessionChange], Optional[datetime]]]:
+        """스케줄 한 건의 DB 작업. (action, 세션 변경 또는 None, 다음 실행 시각), 비활성이면 None."""
+        now = datetime.utcnow()
+        with SessionLocal(expire_on_commit=False) as db:
+            sched = db.get(PlugSchedule, schedule_id)
+            if sched is None or not sched.enabled:
+                return None
+
+            name, user_id, action = sched.plug_name, sched.user_id, sched.action
+            change = None
+            try:
+                if action == "on":
+                    change = sessions.acquire_rows(db, name, user_id)
+                else:
+                    change = sessions.release_rows(db, name, user_id)
+                logger.info(f"[PlugScheduler] #{schedule_id} '{name}' {action} 실행 (사용자 ID: {user_id})")
+            except PlugNotInUseException:
+                db.rollback()
+                logger.info(f"[PlugScheduler] #{schedule_id} '{name}' 이미 해제된 세션 — 건너뜀")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"[PlugScheduler] #{schedule_id} '{name}' {action} 실패: {e}")
+
+            sched.last_run_at = now
+            sched.next_run_at = next_run(sched, now)
+            if sched.next_run_at is None:
+                sched.enabled = False
+            db.commit()
+            return action, change, sched.next_run_at
+
+
+# 싱글톤
+plug_scheduler = PlugScheduler()
@@ -0,0 +1,275 @@
+# app/services/sessions.py
+"""
+플러그 세션(참조 카운트) 처리.
+
+reserve_on / release_off 라우터와 스케줄러 등 내부 작업이 모두
+이 모듈을 통해 세션을 만들고 지우므로, "첫 사용자면 ON / 마지막 사용자면 OFF"
+규칙이 한 곳에만 존재합니다.
+
+장치 명령은 직접 보내지 않고 목표 상태로 저널(reconciler)에 커밋한 뒤 바로 돌아오며,
+실제 반영과 실패 시 재시도는 Reconciler 가 맡습니다.
+
+acquire / release 는 DB 작업(acquire_rows / release_rows)과 메모리 반영(acquired / released)으로
+나뉘어 있어, 요청 밖에서 도는 작업(스케줄러)은 DB 작업만 스레드로 보낼 수 있습니다.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.log import event
+from app.exceptions import PlugNotInUseException
+from app.models import DesiredPlugState, PlugSession, User
+from app.schemas import PlugStatus
+from app.services.change_feed import plug_changes
+from app.services.events import event_bus
+from app.services.leases import lease_manager
+from app.services.reconciler import reconciler
+from app.services import usage
+
+logger = logging.getLogger(__name__)
+
+
+def count_active(db: Session, name: str) -> int:
+    return db.query(PlugSession).filter_by(plug_name=name).count()
+
+
+def list_users(db: Session, name: str) -> List[str]:
+    rows = (
+        db.query(PlugSession, User.username)
+        .join(User, PlugSession.user_id == User.id)
+        .filter(PlugSession.plug_name == name)
+        .all()
+    )
+    return [str(uname).strip() for _, uname in rows]
+
+
+def count_active_many(db: Session, names: List[str]) -> Dict[str, int]:
+    rows = (
+        db.query(PlugSession.plug_name, func.count(PlugSession.id))
+        .filter(PlugSession.plug_name.in_(names))
+        .group_by(PlugSession.plug_name)
+        .all()
+    )
+    counts = dict.fromkeys(names, 0)
+    counts.update({name: count for name, count in rows})
+    return counts
+
+
+def list_users_many(db: Session, names: List[str]) -> Dict[str, List[str]]:
+    rows = (
+        db.query(PlugSession.plug_name, User.username)
+        .join(User, PlugSession.user_id == User.id)
+        .filter(PlugSession.plug_name.in_(names))
+        .all()
+    )
+    users: Dict[str, List[str]] = {name: [] for name in names}
+    for name, uname in rows:
+        users[name].append(str(uname).strip())
+    return users
+
+
+def _publish_many(db: Session, type: str, names: List[str], user_id: int) -> None:
+    """묶음 경로(그룹 명령)도 플러그별 이벤트로 — 구독자가 없으면 조회하지 않는다."""
+    if not names or not event_bus.subscribed:
+        return
+    counts, users = count_active_many(db, names), list_users_many(db, names)
+    for name in names:
+        event_bus.publish(type, name, user_id=user_id, active_users=counts.get(name, 0),
+                          users=users.get(name, []))
+
+
+class SessionChange(NamedTuple):
+    """
+    acquire_rows / release_rows 의 DB 결과. 메모리 반영(변경 피드·임대·목표·이벤트)은
+    이벤트 루프에서 acquired / released 로 합니다.
+    """
+    name: str
+    user_id: int
+    changed: bool                       # 세션 행을 추가·삭제함
+    leased: bool                        # acquire 전부터 임대 중이던 세션 (기한만 연장)
+    active: int
+    users: List[str]
+    desired: List[DesiredPlugState]     # 목표가 바뀐 저널 행
+
+
+def acquire_rows(
+    db: Session, name: str, user_id: int, lease_seconds: Optional[int] = None
+) -> SessionChange:
+    """acquire 의 DB 작업만 합니다 (스레드에서 불러도 됨)."""
+    # 해당 사용자가 이미 해당 플러그를 사용 중인지 확인
+    exists = db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
+
+    # 이미 사용 중이면 새로 추가하지 않고 성공으로 처리 (임대 중이면 기한만 연장)
+    if exists:
+        logger.debug("사용자(ID: %s)가 이미 플러그 '%s'을 사용 중입니다.", user_id, name)
+        leased = exists.expires_at is not None
+    else:
+        # 신규 세션 추가
+        logger.debug("사용자(ID: %s)가 새로 플러그 '%s'을 사용합니다.", user_id, name)
+        sess = PlugSession(plug_name=name, user_id=user_id)
+        if lease_seconds:
+            sess.expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        db.add(sess)
+        db.commit()
+        leased = False
+
+    # 첫 번째 사용자인 경우 목표 ON (이미 ON 이면 변화 없음)
+    return SessionChange(
+        name=name, user_id=user_id, changed=exists is None, leased=leased,
+        active=count_active(db, name), users=list_users(db, name),
+        desired=reconciler.write_desired(db, [name], True),
+    )
+
+
+def acquired(change: SessionChange, lease_seconds: Optional[int] = None) -> PlugStatus:
+    """acquire_rows 결과를 메모리에 반영합니다 (이벤트 루프에서)."""
+    name, user_id = change.name, change.user_id
+    if change.changed:
+        plug_changes.touch(name)
+    if lease_seconds and (change.changed or change.leased):
+        lease_manager.grant(name, user_id, lease_seconds, persisted=change.changed)
+
+    switched = bool(reconciler.load_desired(change.desired))
+    event(logger, "session.acquire", plug=name, user_id=user_id, active=change.active,
+          users=change.users, switch_on=switched)
+    event_bus.publish("session.acquire", name, user_id=user_id, active_users=change.active, users=change.users)
+
+    return PlugStatus(
+        name=name, status=True, active_users=change.active, users=change.users,
+        lease_expires_at=lease_manager.expires_at(name, user_id),
+        pending=reconciler.is_pending(name),
+    )
+
+
+def release_rows(db: Session, name: str, user_id: int) -> SessionChange:
+    """release 의 DB 작업만 합니다 (스레드에서 불러도 됨). 세션이 없으면 PlugNotInUseException."""
+    sess = db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
+    if not sess:
+        raise PlugNotInUseException(name)
+
+    usage.record_closed(db, [(sess.plug_name, sess.user_id, sess.started_at)])
+    db.delete(sess)
+    db.commit()
+
+    # 마지막 사용자였다면 목표 OFF — 장치가 응답하지 않아도 Reconciler 가 재시도
+    active = count_active(db, name)
+    return SessionChange(
+        name=name, user_id=user_id, changed=True, leased=False,
+        active=active, users=list_users(db, name),
+        desired=reconciler.write_desired(db, [name], False) if active == 0 else [],
+    )
+
+
+def released(change: SessionChange) -> PlugStatus:
+    """release_rows 결과를 메모리에 반영합니다 (이벤트 루프에서)."""
+    name, user_id = change.name, change.user_id
+    plug_changes.touch(name)
+    lease_manager.revoke(name, user_id)
+
+    event(logger, "session.release", plug=name, user_id=user_id, active=change.active,
+          users=change.users, switch_off=change.active == 0)
+    event_bus.publish("session.release", name, user_id=user_id, active_users=change.active, users=change.users)
+    reconciler.load_desired(change.desired)
+
+    return PlugStatus(name=name, status=change.active > 0, active_users=change.active, users=change.users,
+                      pending=reconciler.is_pending(name))
+
+
+async def acquire(
+    db: Session, name: str, user_id: int, lease_seconds: Optional[int] = None
+) -> PlugStatus:
+    """
+    세션을 추가하고, 첫 번째 사용자라면 목표 상태를 ON 으로 기록합니다.
+    lease_seconds 를 주면 heartbeat 로 갱신해야 하는 임대 세션이 됩니다.
+    """
+    return acquired(acquire_rows(db, name, user_id, lease_seconds), lease_seconds)
+
+
+async def release(db: Session, name: str, user_id: int) -> PlugStatus:
+    """세션을 삭제하고, 마지막 사용자였다면 목표 상태를 OFF 로 기록합니다."""
+    return released(release_rows(db, name, user_id))
+
+
+async def acquire_many(
+    db: Session, names: List[str], user_id: int, lease_seconds: Optional[int] = None
+) -> List[str]:
+    """
+    여러 플러그 세션을 한 트랜잭션으로 추가한 뒤, 첫 사용자가 된 플러그의 목표를 ON 으로 기록합니다.
+    목표가 바뀐 플러그 목록을 돌려줍니다 (장치 반영과 오류는 Reconciler 가 플러그별로 관리).
+    """
+    # 이미 가진 세션 → 만료 시각 (None 이면 임대 없는 세션 — 스케줄 등이 잡은 것은 임대로 바꾸지 않는다)
+    held = dict(
+        db.query(PlugSession.plug_name, PlugSession.expires_at)
+        .filter(PlugSession.plug_name.in_(names), PlugSession.user_id == user_id)
+    )
+    expires_at = (
+        datetime.utcnow() + timedelta(seconds=lease_seconds) if lease_seconds else None
+    )
+    added = [name for name in names if name not in held]
+    for name in added:
+        db.add(PlugSession(plug_name=name, user_id=user_id, expires_at=expires_at))
+    db.commit()
+    plug_changes.touch_many(added)
+
+    if lease_seconds:
+        for name in added:
+            lease_manager.grant(name, user_id, lease_seconds, persisted=True)
+        for name, held_until in held.items():
+            if held_until is not None:
+                lease_manager.grant(name, user_id, lease_seconds)
+
+    switched = reconciler.set_desired_many(db, names, True)
+    event(logger, "session.acquire_many", user_id=user_id, plugs=len(names), switch_on=len(switched))
+    _publish_many(db, "session.acquire", added, user_id)
+    return switched
+
+
+async def release_many(
+    db: Session, names: List[str], user_id: int
+) -> List[str]:
+    """여러 플러그에서 사용자의 세션을 한 트랜잭션으로 지우고, 남은 사용자가 없는 플러그의 목표를 OFF 로 (목표가 바뀐 플러그 목록)."""
+    closed = (
+        db.query(PlugSession.plug_name, PlugSession.user_id, PlugSession.started_at)
+        .filter(PlugSession.plug_name.in_(names), PlugSession.user_id == user_id)
+        .all()
+    )
+    released = [name for name, _, _ in closed]
+    usage.record_closed(db, closed)
+    (
+        db.query(PlugSession)
+        .filter(PlugSession.plug_name.in_(released), PlugSession.user_id == user_id)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    plug_changes.touch_many(released)
+    for name in released:
+        lease_manager.revoke(name, user_id)
+
+    counts = count_active_many(db, released) if released else {}
+    to_turn_off = [name for name in released if counts[name] == 0]
+    switched = reconciler.set_desired_many(db, to_turn_off, False)
+    event(logger, "session.release_many", user_id=user_id, plugs=len(released), switch_off=len(switched))
+    _publish_many(db, "session.release", released, user_id)
+    return switched
+
+
+async def clear(db: Session, name: str) -> int:
+    """[Admin] 플러그의 모든 세션을 지우고 목표를 OFF 로 기록합니다."""
+    closed = (
+        db.query(PlugSession.plug_name, PlugSession.user_id, PlugSession.started_at)
+        .filter_by(plug_name=name)
+        .all()
+    )
+    usage.record_closed(db, closed, reason="clear")
+    removed = db.query(PlugSession).filter_by(plug_name=name).delete()
+    db.commit()
+    if removed:
+        plug_changes.touch(name)
+    lease_manager.revoke_plug(name)
+    logger.info(f"플러그 {name} 세션 {removed}개 강제 초기화")
+    event_bus.publish("session.clear", name, removed=removed, active_users=0, users=[])
+    reconciler.set_desired(db, name, False)
+    return removed
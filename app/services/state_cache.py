@@ -0,0 +1,136 @@
+# app/services/state_cache.py
+"""
+플러그 상태 캐시.
+
+Pyp100Service 가 장치와 통신할 때마다 마지막으로 관측한 상태를 기록합니다.
+그룹 상태 같은 집계는 N 번의 장치 조회 대신 이 캐시를 읽습니다.
+종료 시 STATE_CACHE_PATH 에 저장하고 시작 시 다시 읽어, 재시작 직후에도
+연결 예열이 끝나기 전까지 마지막 상태를 바로 보여줄 수 있습니다.
+
+플러그가 수천 개여도 작게 유지되도록 상태는 플러그별 객체가 아니라 이름 → 슬롯 번호와
+슬롯별 배열 두 개(상태 1바이트, 관측 시각 8바이트)로 보관하고, get() 이 호출될 때만
+PlugState 를 만들어 돌려줍니다.
+"""
+import json
+import logging
+import os
+import time
+from array import array
+from typing import Dict, NamedTuple, Optional
+
+from app.config import settings
+from app.services.change_feed import plug_changes
+from app.services.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+
+class PlugState(NamedTuple):
+    status: Optional[bool]      # None = 통신 실패
+    updated_at: float           # time.time()
+
+
+# 슬롯의 상태 값
+_ABSENT, _UNREACHABLE, _OFF, _ON = -2, -1, 0, 1
+_DECODE = {_UNREACHABLE: None, _OFF: False, _ON: True}
+
+
+def _encode(status: Optional[bool]) -> int:
+    return _UNREACHABLE if status is None else int(bool(status))
+
+
+class PlugStateCache:
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._status = array("b")       # _ABSENT / _UNREACHABLE / _OFF / _ON
+        self._updated = array("d")      # time.time()
+
+    def _slot(self, name: str) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = len(self._status)
+            self._status.append(_ABSENT)
+            self._updated.append(0.0)
+        return slot
+
+    def update(self, name: str, status: Optional[bool], observed_at: Optional[float] = None) -> None:
+        """observed_at: 다른 곳(엣지 에이전트)에서 관측한 시각 — 없으면 지금."""
+        slot = self._slot(name)
+        previous, code = self._status[slot], _encode(status)
+        self._status[slot] = code
+        self._updated[slot] = observed_at or time.time()
+        if previous != code:
+            plug_changes.touch(name)
+            event_bus.publish("plug.state", name, status=status, previous=_DECODE.get(previous))
+
+    def get(self, name: str) -> Optional[PlugState]:
+        slot = self._slots.get(name)
+        if slot is None or self._status[slot] == _ABSENT:
+            return None
+        return PlugState(_DECODE[self._status[slot]], self._updated[slot])
+
+    def status(self, name: str) -> Optional[bool]:
+        slot = self._slots.get(name)
+        return None if slot is None else _DECODE.get(self._status[slot])
+
+    def updated_at(self, name: str) -> Optional[float]:
+        slot = self._slots.get(name)
+        if slot is None or self._status[slot] == _ABSENT:
+            return None
+        return self._updated[slot]
+
+    def matches(self, name: str, state: str) -> bool:
+        """목록 필터: state 는 "on" / "off" / "unreachable" (관측한 적 없거나 통신 실패)."""
+        slot = self._slots.get(name)
+        code = _ABSENT if slot is None else self._status[slot]
+        if state == "on":
+            return code == _ON
+        if state == "off":
+            return code == _OFF
+        return code in (_ABSENT, _UNREACHABLE)
+
+    def forget(self, name: str) -> None:
+        slot = self._slots.get(name)
+        if slot is not None and self._status[slot] != _ABSENT:
+            self._status[slot] = _ABSENT
+            plug_changes.touch(name)
+
+    def nbytes(self) -> int:
+        """상태 배열이 차지하는 바이트 (이름 → 슬롯 dict 제외)."""
+        return (self._status.itemsize * len(self._status)
+                + self._updated.itemsize * len(self._updated))
+
+    def load(self, path: Optional[str] = None) -> int:
+        path = path or settings.STATE_CACHE_PATH
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"플러그 상태 캐시 읽기 실패 ({path}): {e}")
+            return 0
+        for name, (status, updated_at) in data.items():
+            # 실행 중에 이미 관측한 상태가 있으면 그것이 더 새롭다
+            slot = self._slot(name)
+            if self._status[slot] == _ABSENT:
+                self._status[slot] = _encode(status)
+                self._updated[slot] = updated_at
+        return len(data)
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or settings.STATE_CACHE_PATH
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({name: [_DECODE[self._status[slot]], self._updated[slot]]
+                           for name, slot in self._slots.items() if self._status[slot] != _ABSENT},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"플러그 상태 캐시 저장 실패 ({path}): {e}")
+
+
+# 싱글톤
+plug_state_cache = PlugStateCache()
@@ -0,0 +1,265 @@
+# app/services/usage.py
+"""
+플러그 사용량 집계 (plug-hours).
+
+세션이 닫힐 때(해제, 임대 만료, 강제 초기화) 그 세션을 plug_session_history 에 옮기고,
+같은 트랜잭션에서 사용 구간을 버킷으로 나눠 두 집계 테이블에 더합니다.
+
+  usage_user_daily  : (user_id, 날짜)     → 초, 세션 수
+  usage_plug_hourly : (plug_name, 시각)   → 초
+
+버킷은 모두 UTC 기준입니다. 조회는 기간 안의 집계 행만 합산하므로 1년치라도
+사용자 수 × 365 / 플러그 수 × 8760 행 범위의 인덱스 스캔으로 끝납니다.
+아직 열려 있는 세션은 조회 시점까지의 사용량을 메모리에서 같은 방식으로 나눠 더합니다.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import PlugSession, PlugSessionHistory, UsagePlugHour, UsageUserDay, User
+
+logger = logging.getLogger(__name__)
+
+DAY = timedelta(days=1)
+HOUR = timedelta(hours=1)
+
+# (plug_name, user_id, started_at)
+ClosedSession = Tuple[str, int, datetime]
+
+
+def _floor_day(ts: datetime) -> datetime:
+    return datetime.combine(ts.date(), time())
+
+
+def _floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def split(start: datetime, end: datetime, floor, step: timedelta) -> Iterator[Tuple[datetime, float]]:
+    """[start, end) 를 버킷 경계에서 잘라 (버킷 시작, 초) 로 돌려줍니다."""
+    cursor = start
+    while cursor < end:
+        bucket = floor(cursor)
+        edge = min(bucket + step, end)
+        yield bucket, (edge - cursor).total_seconds()
+        cursor = edge
+
+
+class UsageBuckets:
+    """구간들을 버킷별로 모읍니다 (세션 종료 시 누적, 백필, 열린 세션 계산에 공통)."""
+
+    def __init__(self):
+        self.user_days: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0])
+        self.plug_hours: Dict[Tuple[str, datetime], float] = defaultdict(float)
+
+    def add(
+        self, plug_name: str, user_id: int, started_at: datetime, ended_at: datetime,
+        count: bool = True,
+    ) -> None:
+        if ended_at <= started_at:
+            return
+        if count:
+            self.user_days[(user_id, started_at.date())][1] += 1
+        for day, seconds in split(started_at, ended_at, _floor_day, DAY):
+            self.user_days[(user_id, day.date())][0] += seconds
+        for hour, seconds in split(started_at, ended_at, _floor_hour, HOUR):
+            self.plug_hours[(plug_name, hour)] += seconds
+
+    def __bool__(self) -> bool:
+        return bool(self.user_days or self.plug_hours)
+
+
+def _insert(db: Session):
+    """방언별 INSERT … ON CONFLICT (SQLite / PostgreSQL)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def upsert(db: Session, buckets: UsageBuckets) -> None:
+    """버킷 값을 집계 테이블에 더합니다 (커밋은 호출자가)."""
+    if not buckets:
+        return
+    insert = _insert(db)
+    if buckets.user_days:
+        stmt = insert(UsageUserDay)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsageUserDay.user_id, UsageUserDay.day],
+            set_={
+                "seconds": UsageUserDay.seconds + stmt.excluded.seconds,
+                "sessions": UsageUserDay.sessions + stmt.excluded.sessions,
+            },
+        )
+        db.execute(stmt, [
+            {"user_id": user_id, "day": day, "seconds": seconds, "sessions": count}
+            for (user_id, day), (seconds, count) in buckets.user_days.items()
+        ])
+    if buckets.plug_hours:
+        stmt = insert(UsagePlugHour)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsagePlugHour.plug_name, UsagePlugHour.hour],
+            set_={"seconds": UsagePlugHour.seconds + stmt.excluded.seconds},
+        )
+        db.execute(stmt, [
+            {"plug_name": plug_name, "hour": hour, "seconds": seconds}
+            for (plug_name, hour), seconds in buckets.plug_hours.items()
+        ])
+
+
+def record_closed(
+    db: Session, closed: Iterable[ClosedSession], reason: str = "release",
+    ended_at: Optional[datetime] = None,
+) -> int:
+    """
+    닫히는 세션들을 이력에 남기고 집계에 더합니다.
+    세션 삭제와 같은 트랜잭션 안에서(커밋 전에) 호출해야 합니다.
+    """
+    ended_at = ended_at or datetime.utcnow()
+    buckets = UsageBuckets()
+    rows = []
+    for plug_name, user_id, started_at in closed:
+        started_at = min(started_at or ended_at, ended_at)
+        rows.append(PlugSessionHistory(
+            plug_name=plug_name, user_id=user_id, started_at=started_at,
+            ended_at=ended_at, reason=reason,
+        ))
+        buckets.add(plug_name, user_id, started_at, ended_at)
+    db.add_all(rows)
+    upsert(db, buckets)
+    return len(rows)
+
+
+def _open_buckets(db: Session, now: datetime, start: datetime) -> UsageBuckets:
+    """열린 세션의 [started_at, now) 중 조회 기간에 걸친 부분."""
+    buckets = UsageBuckets()
+    for plug_name, user_id, started_at in (
+        db.query(PlugSession.plug_name, PlugSession.user_id, PlugSession.started_at)
+    ):
+        started_at = started_at or now
+        # 기간 전 부분은 버린다 (세션 수는 시작일 기준이므로 기간 전에 시작했으면 세지 않음)
+        buckets.add(plug_name, user_id, max(started_at, start), now, count=started_at >= start)
+    return buckets
+
+
+def _range(start: date, end: date) -> Tuple[datetime, datetime]:
+    """[start, end] (날짜, 양끝 포함) → [시작 시각, 끝 다음 날 0시)."""
+    return datetime.combine(start, time()), datetime.combine(end, time()) + DAY
+
+
+def by_user(db: Session, start: date, end: date, include_open: bool = True) -> List[dict]:
+    """기간 안의 사용자별 사용 시간 (많이 쓴 순)."""
+    totals: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+    for user_id, seconds, count in (
+        db.query(UsageUserDay.user_id, func.sum(UsageUserDay.seconds), func.sum(UsageUserDay.sessions))
+        .filter(UsageUserDay.day >= start, UsageUserDay.day <= end)
+        .group_by(UsageUserDay.user_id)
+    ):
+        totals[user_id][0] += seconds or 0.0
+        totals[user_id][1] += count or 0
+    if include_open:
+        lo, hi = _range(start, end)
+        for (user_id, day), (seconds, count) in _open_buckets(db, min(datetime.utcnow(), hi), lo).user_days.items():
+            totals[user_id][0] += seconds
+            totals[user_id][1] += count
+
+    names = dict(db.query(User.id, User.username).filter(User.id.in_(list(totals))))
+    rows = [
+        {"user_id": user_id, "username": names.get(user_id, ""),
+         "hours": round(seconds / 3600, 3), "sessions": int(count)}
+        for user_id, (seconds, count) in totals.items()
+    ]
+    return sorted(rows, key=lambda r: (-r["hours"], r["user_id"]))
+
+
+def by_plug(db: Session, start: date, end: date, include_open: bool = True) -> List[dict]:
+    """기간 안의 플러그별 사용 시간 (많이 쓴 순)."""
+    lo, hi = _range(start, end)
+    totals: Dict[str, float] = defaultdict(float)
+    for plug_name, seconds in (
+        db.query(UsagePlugHour.plug_name, func.sum(UsagePlugHour.seconds))
+        .filter(UsagePlugHour.hour >= lo, UsagePlugHour.hour < hi)
+        .group_by(UsagePlugHour.plug_name)
+    ):
+        totals[plug_name] += seconds or 0.0
+    if include_open:
+        for (plug_name, _), seconds in _open_buckets(db, min(datetime.utcnow(), hi), lo).plug_hours.items():
+            totals[plug_name] += seconds
+
+    rows = [{"plug_name": name, "hours": round(seconds / 3600, 3)} for name, seconds in totals.items()]
+    return sorted(rows, key=lambda r: (-r["hours"], r["plug_name"]))
+
+
+def daily(
+    db: Session, start: date, end: date, user_id: Optional[int] = None,
+    plug_name: Optional[str] = None, include_open: bool = True,
+) -> List[dict]:
+    """
+    날짜별 사용 시간. user_id 를 주면 그 사용자의, plug_name 을 주면 그 플러그의 사용량이며
+    (둘 다 주면 plug_name 은 무시), 아무것도 주지 않으면 전체 합계입니다.
+    """
+    lo, hi = _range(start, end)
+    totals: Dict[date, float] = defaultdict(float)
+    if plug_name is not None and user_id is None:
+        # 시간 버킷을 날짜로 접는다 (DB 방언과 무관하게 파이썬에서)
+        for hour, seconds in (
+            db.query(UsagePlugHour.hour, UsagePlugHour.seconds)
+            .filter(UsagePlugHour.plug_name == plug_name,
+                    UsagePlugHour.hour >= lo, UsagePlugHour.hour < hi)
+        ):
+            totals[hour.date()] += seconds
+    else:
+        query = (
+            db.query(UsageUserDay.day, func.sum(UsageUserDay.seconds))
+            .filter(UsageUserDay.day >= start, UsageUserDay.day <= end)
+        )
+        if user_id is not None:
+            query = query.filter(UsageUserDay.user_id == user_id)
+        for day, seconds in query.group_by(UsageUserDay.day):
+            totals[day] += seconds or 0.0
+
+    if include_open:
+        buckets = _open_buckets(db, min(datetime.utcnow(), hi), lo)
+        if plug_name is not None and user_id is None:
+            for (name, hour), seconds in buckets.plug_hours.items():
+                if name == plug_name:
+                    totals[hour.date()] += seconds
+        else:
+            for (uid, day), (seconds, _) in buckets.user_days.items():
+                if user_id is None or uid == user_id:
+                    totals[day] += seconds
+
+    return [
+        {"day": day, "hours": round(seconds / 3600, 3)}
+        for day, seconds in sorted(totals.items())
+        if seconds > 0
+    ]
+
+
+def rebuild(db: Session, chunk: int = 5000) -> int:
+    """
+    집계 테이블을 비우고 plug_session_history 전체로 다시 만듭니다 (backfill_usage.py).
+    이력은 chunk 행씩 읽어 메모리의 버킷에 모은 뒤 한 번에 씁니다.
+    """
+    db.query(UsageUserDay).delete(synchronize_session=False)
+    db.query(UsagePlugHour).delete(synchronize_session=False)
+    buckets = UsageBuckets()
+    count = 0
+    for plug_name, user_id, started_at, ended_at in (
+        db.query(PlugSessionHistory.plug_name, PlugSessionHistory.user_id,
+                 PlugSessionHistory.started_at, PlugSessionHistory.ended_at)
+        .order_by(PlugSessionHistory.id)
+        .yield_per(chunk)
+    ):
+        buckets.add(plug_name, user_id, started_at, ended_at)
+        count += 1
+    upsert(db, buckets)
+    db.commit()
+    logger.info("사용량 집계 재생성: 이력 %d건 → 사용자·일 %d행, 플러그·시간 %d행",
+                count, len(buckets.user_days), len(buckets.plug_hours))
+    return count
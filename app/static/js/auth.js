@@ -0,0 +1,48 @@
+// static/js/auth.js
+// 대시보드의 토큰 보관과 fetch 인증 헤더 (dashboard.html 이 dashboard.js 보다 먼저 로드)
+
+(function (global) {
+  const ACCESS = 'access_token';
+  const REFRESH = 'refresh_token';
+
+  // 백엔드(ui.py)가 페이지를 그릴 때 사용자 이름을 읽는 쿠키
+  function setCookie(token) {
+    global.document.cookie = `${ACCESS}=${token}; path=/; max-age=86400; SameSite=Strict`;
+  }
+
+  const TapoAuth = {
+    accessToken: () => global.localStorage.getItem(ACCESS),
+    refreshToken: () => global.localStorage.getItem(REFRESH),
+
+    // 로그인·재발급 후 호출 — 이후의 모든 요청과 페이지 쿠키가 새 토큰을 쓴다
+    store(access, refresh) {
+      global.localStorage.setItem(ACCESS, access);
+      if (refresh) global.localStorage.setItem(REFRESH, refresh);
+      setCookie(access);
+    },
+
+    clear() {
+      global.localStorage.removeItem(ACCESS);
+      global.localStorage.removeItem(REFRESH);
+    },
+
+    // 모든 fetch 에 Authorization 헤더를 붙인다. 토큰은 요청마다 localStorage 에서 읽으므로
+    // refresh 로 바뀐 토큰이 재시도에 바로 쓰이고, 호출자가 헤더를 직접 넣었으면 그대로 둔다.
+    install() {
+      const originalFetch = global.fetch;
+      global.fetch = function (url, options = {}) {
+        const token = TapoAuth.accessToken();
+        const headers = new Headers(options.headers || {});
+        if (token && !headers.has('Authorization')) {
+          headers.set('Authorization', `Bearer ${token}`);
+          options = { ...options, headers };
+        }
+        return originalFetch(url, options);
+      };
+      const token = TapoAuth.accessToken();
+      if (token) setCookie(token);
+    }
+  };
+
+  global.TapoAuth = TapoAuth;
+})(window);
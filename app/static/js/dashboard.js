@@ -4,17 +4,40 @@
   /* ─── 1. DOM 요소 캐시 ────────────────────────── */
   const tbody     = document.getElementById("plugTableBody");
   const alertBox  = document.getElementById("plugAlert");
-  const logoutBtns = document.querySelectorAll("#logoutBtn");
+  
+  // 내가 사용 중인 플러그 수 (heartbeat 필요 여부 판단)
+  let myPlugCount = 0;
   
   /* ─── 토큰 관리 함수 ────────────────────────────── */
   // 로컬 스토리지에서 토큰 가져오기
   const getToken = () => localStorage.getItem('access_token');
   
-  // 토큰 저장
-  const saveToken = (token) => localStorage.setItem('access_token', token);
-  
   // 토큰 삭제
-  const clearToken = () => localStorage.removeItem('access_token');
+  const clearToken = () => TapoAuth.clear();
+
+  // refresh 토큰으로 access 토큰 재발급 (동시에 여러 요청이 401 을 받아도 한 번만)
+  let refreshing = null;
+  function refreshToken() {
+    const refresh = localStorage.getItem('refresh_token');
+    if (!refresh) return Promise.resolve(false);
+    if (!refreshing) {
+      refreshing = fetch("/auth/refresh", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refresh })
+      })
+        .then(async res => {
+          if (!res.ok) return false;
+          const data = await res.json();
+          // 새 토큰 저장 + 쿠키 갱신 — 재시도와 이후 요청이 모두 새 토큰을 쓴다
+          TapoAuth.store(data.access_token, data.refresh_token);
+          return true;
+        })
+        .catch(() => false)
+        .finally(() => { refreshing = null; });
+    }
+    return refreshing;
+  }
   
   // 디버깅: 현재 USERNAME 확인
   console.log("현재 로그인한 사용자:", USERNAME);
@@ -55,21 +78,8 @@
   });
 
   /* ─── 2. 로그아웃 처리 ────────────────────────── */
-  logoutBtns.forEach(btn => {
-    btn.addEventListener("click", async () => {
-      // 서버에 로그아웃 요청
-      await fetch("/auth/logout", {
-        method: "POST",
-        headers: {
-          "Authorization": `Bearer ${getToken()}`
-        }
-      });
-      
-      // 토큰 삭제 후 로그인 페이지로
-      clearToken();
-      location.href = "/login";
-    });
-  });
+  // dashboard.html 의 버튼 핸들러가 서버 로그아웃 + 토큰 삭제를 맡는다 (먼저 등록되어 먼저 실행되므로
+  // 여기서 다시 등록하면 토큰이 이미 지워진 뒤에 로그아웃 요청을 보내게 됨)
 
   /* ─── 3. 알림 표시 util ───────────────────────── */
   function showAlert(msg, sec = 4) {
@@ -79,18 +89,23 @@
   }
 
   /* ─── 4. Fetch + JSON 체크 util ───────────────── */
-  async function fetchWithJson(url, opts = {}) {
+  async function fetchWithJson(url, opts = {}, retried = false) {
     const token = getToken();
     
     const res = await fetch(url, {
       ...opts,
       headers: {
         "Accept": "application/json",
-        "Authorization": token ? `Bearer ${token}` : undefined,
+        ...(token ? { "Authorization": `Bearer ${token}` } : {}),
         ...(opts.headers || {})
       },
     });
 
+    if (res.status === 401 && !retried && await refreshToken()) {
+      // access 토큰 만료 → 재발급 후 한 번만 다시 시도
+      return fetchWithJson(url, opts, true);
+    }
+
     if (res.status === 401) {
       // 인증 실패 → 로그인으로
       clearToken();
@@ -112,150 +127,128 @@
   }
 
   /* ─── 5. 테이블 렌더링 ───────────────────────── */
-  function render(plugs) {
-    try {
-      tbody.innerHTML = "";
-      
-      if (!tbody) {
-        console.error("plugTableBody 요소를 찾을 수 없습니다.");
-        return;
-      }
-      
-      // 디버깅: 플러그 데이터 확인
-      console.log("플러그 목록:", plugs);
-      console.log("현재 로그인 사용자 세부정보:", {
-        username: window.REAL_USERNAME,
-        type: typeof window.REAL_USERNAME,
-        length: window.REAL_USERNAME.length,
-        trimmed: window.REAL_USERNAME.trim(),
-        trimmedLength: window.REAL_USERNAME.trim().length
-      });
+  // 플러그명 → { row, iUse } — 변경분이 오면 해당 행만 교체
+  const rows = new Map();
 
-      // 플러그 데이터가 없는 경우 처리
-      if (!Array.isArray(plugs) || plugs.length === 0) {
-        console.warn("플러그 목록이 비어있습니다.");
-        const tr = document.createElement("tr");
-        tr.innerHTML = `
-          <td colspan="3" class="text-center py-4">
-            <div class="text-muted">등록된 플러그가 없습니다.</div>
-          </td>
-        `;
-        tbody.append(tr);
-        return;
-      }
+  function showEmpty() {
+    tbody.innerHTML = `
+      <tr>
+        <td colspan="3" class="text-center py-4">
+          <div class="text-muted">등록된 플러그가 없습니다.</div>
+        </td>
+      </tr>
+    `;
+  }
 
-      plugs.forEach(plug => {
-        const {
-          name,
-          status       = null,  // true/false/null
-          active_users = 0,
-          users        = [],
-        } = plug;
+  function buildRow(plug) {
+    const {
+      name,
+      status       = null,  // true/false/null
+      active_users = 0,
+      users        = [],
+    } = plug;
 
-        // 디버깅: users 배열의 타입과 내용 상세 확인
-        console.log(`플러그 ${name} - users 배열 세부정보:`, {
-          usersArray: users,
-          arrayType: typeof users,
-          isArray: Array.isArray(users),
-          length: users.length,
-          elements: users.map(u => ({ value: u, type: typeof u, length: u?.length }))
-        });
+    // 항상 문자열로 변환하고 공백을 제거하여 비교
+    const usernameStr = String(window.REAL_USERNAME || "").trim();
+    const iUse = Array.isArray(users) && users.some(u => String(u || "").trim() === usernameStr);
+    const unknown = status === null;
 
-        // 항상 문자열로 변환하고 공백을 제거하여 비교
-        const usernameStr = String(window.REAL_USERNAME || "").trim();
-        
-        // 로깅 - 사용자 문자열 비교 정보
-        console.log(`${name} - 사용자 비교 정보:`, {
-          myUsername: usernameStr,
-          usersList: users,
-          userTypes: users.map(u => typeof u)
-        });
-        
-        // 사용자 ID 측면에서 문자열로 변환하여 비교
-        const iUse = Array.isArray(users) && users.some(u => {
-          const userStr = String(u || "").trim();
-          const isMatch = userStr === usernameStr;
-          console.log(`비교: '${userStr}' vs '${usernameStr}' => ${isMatch}`);
-          return isMatch;
-        });
-        
-        console.log(`${name} - 최종 사용자 비교 결과:`, {
-          username: usernameStr,
-          users,
-          iUse
-        });
-        
-        // 수정된 로직: 다른 사용자가 사용 중이어도 내가 사용할 수 있도록 수정
-        // locked = active_users > 0 && !iUse; // 이전 로직 - 다른 사용자가 사용 중이면 버튼 비활성화
-        const locked = false; // 수정된 로직 - 항상 사용 가능
-        const unknown = status === null;
-        
-        // 디버깅: 버튼 상태 계산 로직 확인
-        console.log(`플러그 ${name} - 버튼 상태:`, {
-          users,
-          currentUser: usernameStr,
-          iUse,
-          active_users,
-          locked,
-          unknown,
-          willBeDisabled: locked || unknown
-        });
-        
-        const badge = unknown
-          ? `<span class="badge bg-warning text-dark">?</span>`
-          : `<span class="badge ${status ? "bg-success" : "bg-secondary"}">
-               ${status ? "켜짐" : "꺼짐"}
-             </span>`;
+    const badge = unknown
+      ? `<span class="badge bg-warning text-dark">?</span>`
+      : `<span class="badge ${status ? "bg-success" : "bg-secondary"}">
+           ${status ? "켜짐" : "꺼짐"}
+         </span>`;
 
-        // 버튼 활성화/비활성화 상태 계산 결과 명확하게 표시
-        // 수정된 로직: 이미 내가 사용 중이면 "사용" 버튼 비활성화, 아니면 활성화
-        const useButtonDisabled = iUse || unknown;
-        // 수정된 로직: 내가 사용 중이면 "나가기" 버튼 활성화, 아니면 비활성화
-        const leaveButtonDisabled = !iUse || unknown;
+    // 다른 사용자가 사용 중이어도 내가 사용할 수 있음
+    // 이미 내가 사용 중이면 "사용" 버튼 비활성화, 내가 사용 중일 때만 "나가기" 버튼 활성화
+    const useButtonDisabled = iUse || unknown;
+    const leaveButtonDisabled = !iUse || unknown;
+
+    const tr = document.createElement("tr");
+    tr.dataset.plug = name;
+    tr.innerHTML = `
+      <td>${name}</td>
+      <td class="text-center">
+        ${badge}
+        <span class="badge bg-info ms-1">${active_users}</span>
+      </td>
+      <td>
+        <div class="buttons-container">
+          <button class="button-on" 
+                  data-name="${name}" 
+                  data-action="on"
+                  ${useButtonDisabled ? "disabled" : ""}>
+            사용
+          </button>
+          <button class="button-off" 
+                  data-name="${name}" 
+                  data-action="off"
+                  ${leaveButtonDisabled ? "disabled" : ""}>
+            나가기
+          </button>
+        </div>
+      </td>
+    `;
+    return { row: tr, iUse };
+  }
 
-        // 로그 - 최종 버튼 상태
-        console.log(`${name} - 최종 버튼 상태:`, {
-          useButtonDisabled,
-          leaveButtonDisabled
+  function countMine() {
+    myPlugCount = 0;
+    rows.forEach(entry => { if (entry.iUse) myPlugCount += 1; });
+  }
+
+  // 전체 목록으로 교체 (첫 로드 / 재동기화)
+  function render(plugs) {
+    try {
+      rows.clear();
+      if (!Array.isArray(plugs) || plugs.length === 0) {
+        console.warn("플러그 목록이 비어있습니다.");
+        showEmpty();
+      } else {
+        const fragment = document.createDocumentFragment();
+        plugs.forEach(plug => {
+          const entry = buildRow(plug);
+          rows.set(plug.name, entry);
+          fragment.append(entry.row);
         });
+        tbody.replaceChildren(fragment);
+      }
+      countMine();
+    } catch (err) {
+      console.error("테이블 렌더링 오류:", err);
+      showAlert("데이터 표시 중 오류가 발생했습니다.");
+    }
+  }
 
-        // 단순화된 버튼 구조 - div로 컨테이너 구성
-        const tr = document.createElement("tr");
-        tr.innerHTML = `
-          <td>${name}</td>
-          <td class="text-center">
-            ${badge}
-            <span class="badge bg-info ms-1">${active_users}</span>
-          </td>
-          <td>
-            <div class="buttons-container">
-              <button class="button-on" 
-                      data-name="${name}" 
-                      data-action="on"
-                      ${useButtonDisabled ? "disabled" : ""}>
-                사용
-              </button>
-              <button class="button-off" 
-                      data-name="${name}" 
-                      data-action="off"
-                      ${leaveButtonDisabled ? "disabled" : ""}>
-                나가기
-              </button>
-            </div>
-          </td>
-        `;
-        tbody.append(tr);
+  // 바뀐 플러그의 행만 교체
+  function patch(plugs) {
+    try {
+      plugs.forEach(plug => {
+        const entry = buildRow(plug);
+        const current = rows.get(plug.name);
+        if (current) {
+          current.row.replaceWith(entry.row);
+        } else {
+          if (rows.size === 0) tbody.innerHTML = "";
+          tbody.append(entry.row);
+        }
+        rows.set(plug.name, entry);
       });
+      countMine();
     } catch (err) {
-      console.error("테이블 렌더링 오류:", err);
+      console.error("테이블 갱신 오류:", err);
       showAlert("데이터 표시 중 오류가 발생했습니다.");
     }
   }
 
   /* ─── 6. 서버 요청 함수 ───────────────────────── */
-  async function fetchPlugs() {
+  // 마지막으로 받은 변경 피드 version (null 이면 전체 목록 요청)
+  let cursor = null;
+
+  async function fetchChanges() {
     try {
-      return await fetchWithJson("/plugs/", { method: "GET" });
+      const query = cursor === null ? "" : `?since=${cursor}`;
+      return await fetchWithJson(`/plugs/changes${query}`, { method: "GET" });
     } catch (err) {
       console.error("플러그 데이터 요청 실패:", err);
       throw err;
@@ -311,6 +304,8 @@
       
       // 전체 데이터 다시 로드 (백그라운드)
       load();
+      // 장치 반영은 서버에서 비동기로 진행되므로 잠시 후 한 번 더 갱신
+      if (result.pending) setTimeout(load, 2_000);
     } catch (err) {
       console.error(`${plugName} 플러그 ${action} 요청 실패:`, err);
       showAlert(err.message);
@@ -320,13 +315,44 @@
   });
 
   /* ─── 8. 데이터 로드 ─────────────────────────── */
-  async function load() {
+  // 변경분만 받아 반영 — 진행 중에 다시 불리면 끝난 뒤 한 번 더 (같은 커서로 겹쳐 받지 않도록)
+  let loading = null;
+  let reloadAfter = false;
+
+  function load() {
+    if (loading) {
+      reloadAfter = true;
+      return loading;
+    }
+    loading = (async () => {
+      try {
+        const changes = await fetchChanges();
+        if (!changes || !Array.isArray(changes.plugs)) return;
+        if (changes.full) render(changes.plugs);
+        else patch(changes.plugs);
+        cursor = changes.version;
+      } catch (err) {
+        console.error("데이터 로드 실패:", err);
+        showAlert("플러그 정보를 불러오지 못했습니다.");
+      }
+    })().finally(() => {
+      loading = null;
+      if (reloadAfter) {
+        reloadAfter = false;
+        load();
+      }
+    });
+    return loading;
+  }
+
+  /* ─── 8-1. 세션 임대 연장 (heartbeat) ────────── */
+  // 사용 중인 플러그가 있을 때만 서버에 임대 연장을 알림
+  async function heartbeat() {
+    if (myPlugCount === 0) return;
     try {
-      const plugs = await fetchPlugs();
-      render(plugs);
+      await fetchWithJson("/plugs/heartbeat", { method: "POST" });
     } catch (err) {
-      console.error("데이터 로드 실패:", err);
-      showAlert("플러그 정보를 불러오지 못했습니다.");
+      console.error("heartbeat 실패:", err);
     }
   }
 
@@ -337,7 +363,9 @@
   } else {
     // 초기 로드
     load();
-    // 주기적 갱신 (15초마다)
-    setInterval(load, 15_000);
+    // 주기적 갱신 (5초마다) — 바뀐 플러그만 받으므로 플러그 수와 관계없이 가벼움
+    setInterval(load, 5_000);
+    // 세션 임대 연장 (60초마다)
+    setInterval(heartbeat, 60_000);
   }
 })();
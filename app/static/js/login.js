@@ -10,6 +10,7 @@
     
     // 로컬 스토리지 토큰 삭제
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
     
     // 모든 쿠키 삭제
     document.cookie.split(";").forEach(function(c) {
@@ -56,6 +57,7 @@
       const data = await res.json();
       if (data.access_token) {
         saveToken(data.access_token);
+        if (data.refresh_token) localStorage.setItem('refresh_token', data.refresh_token);
         // 로그인 성공 → 대시보드로 이동
         location.href = "/";
       } else {
@@ -0,0 +1,196 @@
+# app/timing.py
+"""
+요청 단위 구간(span) 측정과 Server-Timing 헤더, 느린 요청 프로파일.
+
+- span("tapo.connect") 처럼 감싼 구간의 소요 시간을 요청별로 합산합니다.
+  요청 컨텍스트(contextvar)가 없으면 아무 일도 하지 않으므로 꺼져 있을 때 비용은
+  contextvar 조회 한 번입니다.
+- DB 시간은 SQLAlchemy 커서 이벤트로 "db" 구간에 자동 합산됩니다.
+- TimingMiddleware 는 응답에 Server-Timing 헤더(auth/db/tapo.*/total)를 붙입니다.
+- PROFILING_ENABLED 이면 요청 태스크의 await 스택을 주기적으로 샘플링(wall-clock)하고,
+  가장 느린 PROFILE_KEEP 개 요청의 스택을 보관합니다 (GET /debug/profiles).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event as sa_event
+
+from app.config import settings
+
+# 구간 이름 → [누적 초, 횟수]
+_spans: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(name: str):
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(spans, name, time.perf_counter() - start)
+
+
+def _add(spans: Dict[str, List[float]], name: str, elapsed: float) -> None:
+    entry = spans.get(name)
+    if entry is None:
+        spans[name] = [elapsed, 1]
+    else:
+        entry[0] += elapsed
+        entry[1] += 1
+
+
+def install_db_timing(engine) -> None:
+    """engine 의 모든 쿼리 시간을 현재 요청의 "db" 구간에 합산합니다."""
+
+    @sa_event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _spans.get() is not None:
+            conn.info.setdefault("timing_start", []).append(time.perf_counter())
+
+    @sa_event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = _spans.get()
+        starts = conn.info.get("timing_start")
+        if spans is not None and starts:
+            _add(spans, "db", time.perf_counter() - starts.pop())
+
+
+def server_timing_header(spans: Dict[str, List[float]], total: float) -> str:
+    parts = []
+    for name, (elapsed, count) in spans.items():
+        desc = f';desc="{count}x"' if count > 1 else ""
+        parts.append(f"{name};dur={elapsed * 1000:.1f}{desc}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# -------------------------------------------------------------------
+# 느린 요청 프로파일
+# -------------------------------------------------------------------
+def _task_stack(task: asyncio.Task) -> Optional[str]:
+    """태스크의 현재 await 체인을 'file:func:line;...' (바깥 → 안쪽) 형태로."""
+    # Task.get_stack() 는 바깥 코루틴 프레임 하나만 주므로 cr_await 체인을 직접 따라간다
+    frames = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    if not frames:
+        return None
+    return ";".join(
+        f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}:{frame.f_lineno}"
+        for frame in frames
+    )
+
+
+async def _sample(task: asyncio.Task, stacks: Counter, interval: float) -> None:
+    while not task.done():
+        await asyncio.sleep(interval)
+        stack = _task_stack(task)
+        if stack:
+            stacks[stack] += 1
+
+
+class SlowRequestProfiles:
+    """소요 시간 기준 상위 N개 요청만 남기는 최소 힙."""
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._ids = itertools.count(1)
+
+    def offer(self, duration: float, profile: dict) -> None:
+        keep = settings.PROFILE_KEEP
+        if len(self._heap) >= keep and duration <= self._heap[0][0]:
+            return
+        profile["id"] = next(self._ids)
+        item = (duration, profile["id"], profile)
+        if len(self._heap) < keep:
+            heapq.heappush(self._heap, item)
+        else:
+            heapq.heapreplace(self._heap, item)
+
+    def list(self) -> List[dict]:
+        return [profile for _, _, profile in sorted(self._heap, reverse=True)]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        for _, pid, profile in self._heap:
+            if pid == profile_id:
+                return profile
+        return None
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+
+slow_profiles = SlowRequestProfiles()
+
+
+class TimingMiddleware:
+    """순수 ASGI 미들웨어 — 요청 태스크 안에서 span 컨텍스트를 열고 헤더를 붙입니다."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (settings.SERVER_TIMING_ENABLED or settings.PROFILING_ENABLED):
+            await self.app(scope, receive, send)
+            return
+
+        spans: Dict[str, List[float]] = {}
+        token = _spans.set(spans)
+        start = time.perf_counter()
+        status_code = 0
+
+        sampler = None
+        started_at = datetime.utcnow()
+        stacks: Counter = Counter()
+        if settings.PROFILING_ENABLED:
+            sampler = asyncio.create_task(_sample(
+                asyncio.current_task(), stacks, settings.PROFILE_INTERVAL_MS / 1000
+            ))
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    header = server_timing_header(spans, time.perf_counter() - start)
+                    message = {**message, "headers": [
+                        *message.get("headers", []), (b"server-timing", header.encode("latin-1"))
+                    ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            total = time.perf_counter() - start
+            _spans.reset(token)
+            if sampler is not None:
+                sampler.cancel()
+                slow_profiles.offer(total, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "started_at": started_at,
+                    "duration_ms": round(total * 1000, 1),
+                    "spans": {name: round(elapsed * 1000, 1) for name, (elapsed, _) in spans.items()},
+                    "samples": sum(stacks.values()),
+                    "stacks": [
+                        {"stack": stack, "count": count}
+                        for stack, count in stacks.most_common(settings.PROFILE_MAX_STACKS)
+                    ],
+                })
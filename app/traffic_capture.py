@@ -0,0 +1,191 @@
+# app/traffic_capture.py
+"""
+요청 트레이스 기록 (TRAFFIC_CAPTURE_PATH, 기본 꺼짐).
+
+실제 부하(아침 로그인 몰림, 같은 플러그에 몰리는 예약/해제)를 benchmarks/replay.py 로 다시 재생할 수 있도록
+요청마다 한 행을 남깁니다. 토큰·비밀번호·본문은 남기지 않습니다.
+
+  [ts_ms, method, route, plug, user, role, arg, status, ms]
+
+  ts_ms  도착 시각 (epoch ms)          route  라우트 템플릿 (/plugs/{name:path}/on)
+  plug   경로의 플러그·그룹 이름       user   사용자 별칭 (SECRET_KEY 로 키를 건 8자리 해시)
+  role   토큰의 역할                   arg    그룹 명령의 action (그 밖에는 null)
+  status 응답 코드 (클라이언트가 먼저 끊으면 499)   ms  처리 시간
+
+파일은 gzip 으로 압축한 JSON lines 입니다. 첫 줄은 {"format": "tapo-trace", …} 헤더이고, 행은 메모리에 모았다가
+TRAFFIC_CAPTURE_FLUSH_SECONDS 마다 gzip 멤버 하나로 덧붙입니다 (gzip.open 으로 이어 읽힘).
+읽는 쪽은 benchmarks/replay.py 의 read_trace.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from app.config import settings
+from app.request_context import _header
+from app.routers.auth import peek_token_payload
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "tapo-trace"
+VERSION = 1
+FIELDS = ["ts_ms", "method", "route", "plug", "user", "role", "arg", "status", "ms"]
+CLIENT_CLOSED = 499
+SKIP_PREFIXES = ("/static", "/favicon")
+
+
+def pseudonym(username: str) -> str:
+    """사용자 이름의 별칭 — 같은 서버(SECRET_KEY)에서는 항상 같고, 이름으로 되돌릴 수 없습니다."""
+    key = hashlib.sha256(settings.SECRET_KEY.encode("utf-8")).digest()
+    return hashlib.blake2b(username.encode("utf-8"), key=key, digest_size=4).hexdigest()
+
+
+class TrafficRecorder:
+    def __init__(self):
+        self._rows: List[list] = []
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.TRAFFIC_CAPTURE_PATH)
+
+    def record(self, row: list) -> None:
+        if len(self._rows) >= settings.TRAFFIC_CAPTURE_MAX_BUFFER:
+            self.dropped += 1
+            return
+        self._rows.append(row)
+        self.recorded += 1
+
+    def flush(self) -> int:
+        return self._write(self._take())
+
+    def _take(self) -> List[list]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    @staticmethod
+    def _write(rows: List[list]) -> int:
+        if not rows:
+            return 0
+        path = settings.TRAFFIC_CAPTURE_PATH
+        lines = []
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            lines.append(json.dumps({"format": FORMAT, "version": VERSION, "fields": FIELDS}))
+        lines.extend(json.dumps(row, ensure_ascii=False, separators=(",", ":")) for row in rows)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(gzip.compress(("\n".join(lines) + "\n").encode("utf-8")))
+        return len(rows)
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="traffic-capture")
+        logger.info(f"[TrafficCapture] 요청 트레이스 기록: {settings.TRAFFIC_CAPTURE_PATH}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.TRAFFIC_CAPTURE_FLUSH_SECONDS)
+            try:
+                # 버퍼 교체는 이벤트 루프에서, 압축·쓰기만 스레드에서
+                await asyncio.to_thread(self._write, self._take())
+            except Exception as e:
+                logger.error(f"[TrafficCapture] 기록 실패: {e}")
+
+
+class TrafficCaptureMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not traffic_recorder.enabled
+                or scope["path"].startswith(SKIP_PREFIXES)):
+            await self.app(scope, receive, send)
+            return
+
+        ts_ms = int(time.time() * 1000)
+        start = time.perf_counter()
+        payload = peek_token_payload(_header(scope, b"authorization"))
+        user = pseudonym(payload["sub"]) if payload else None
+        role = payload.get("role") if payload else None
+        arg = None
+
+        # 로그인 사용자 이름과 그룹 명령의 action 만 본문에서 읽는다
+        method, path = scope["method"], scope["path"]
+        if method == "POST" and (path == "/auth/login" or path.startswith("/groups/")):
+            messages, body = await _read_body(receive)
+            if messages is None:
+                return
+            receive = _replay(messages, receive)
+            if path == "/auth/login":
+                username = parse_qs(body.decode("utf-8", "replace")).get("username", [None])[0]
+                user = pseudonym(username) if username else None
+            else:
+                try:
+                    arg = json.loads(body).get("action")
+                except (ValueError, AttributeError):
+                    pass
+
+        status_code = CLIENT_CLOSED
+
+        async def send_tracked(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracked)
+        except Exception:
+            if status_code == CLIENT_CLOSED:
+                status_code = 500
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                params = scope.get("path_params") or {}
+                traffic_recorder.record([
+                    ts_ms, method, route.path, params.get("name"), user, role, arg, status_code,
+                    round((time.perf_counter() - start) * 1000, 1),
+                ])
+
+
+async def _read_body(receive):
+    messages = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None, b""
+        messages.append(message)
+        if not message.get("more_body"):
+            return messages, b"".join(m.get("body", b"") for m in messages)
+
+
+def _replay(messages: list, receive):
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+    return replay
+
+
+# 싱글톤
+traffic_recorder = TrafficRecorder()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# backfill_usage.py - 사용량 집계 테이블 재생성
+
+"""
+plug_session_history (닫힌 세션 이력) 전체로 usage_user_daily / usage_plug_hourly 를
+비우고 다시 만듭니다. 집계 방식을 바꿨거나, 이력을 직접 고쳤거나, 집계가 어긋났다고
+의심될 때 실행합니다. 한 트랜잭션으로 처리하므로 실행 중에도 API 는 이전 집계를 봅니다.
+
+사용법: python backfill_usage.py [--chunk 5000]
+"""
+import argparse
+import sys
+import time
+
+from app.db import SessionLocal, init_db
+from app.services import usage
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="사용량 집계 테이블 재생성")
+    parser.add_argument("--chunk", type=int, default=5000, help="이력을 한 번에 읽을 행 수")
+    args = parser.parse_args()
+
+    init_db()       # 집계 테이블이 아직 없으면 만든다
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        count = usage.rebuild(db, chunk=args.chunk)
+        print(f"사용량 집계 재생성 완료: 세션 이력 {count}건 ({time.perf_counter() - start:.1f}s)")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"사용량 집계 재생성 실패: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
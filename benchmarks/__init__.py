@@ -0,0 +1,70 @@
+# benchmarks/__init__.py
+"""
+마이크로벤치마크 하네스.
+
+@benchmark("이름") 으로 등록한 함수는 준비(setup)를 마친 뒤 측정할 호출 하나를 돌려줍니다.
+measure() 는 한 표본이 MIN_SAMPLE_SECONDS 이상 걸리도록 반복 횟수를 정한 뒤 REPEAT 개의 표본을 모아
+호출당 중앙값/최솟값을 냅니다. 실행과 기준값(baseline) 비교는 `python -m benchmarks` 를 보세요.
+"""
+import gc
+import statistics
+import time
+from typing import Callable, Dict, NamedTuple
+
+REPEAT = 7
+MIN_SAMPLE_SECONDS = 0.05
+
+Setup = Callable[[], Callable[[], object]]
+
+_registry: Dict[str, Setup] = {}
+
+
+class Result(NamedTuple):
+    name: str
+    loops: int              # 표본 하나당 호출 수
+    median_us: float        # 호출당 (µs)
+    min_us: float
+    stdev_pct: float        # 표본 간 편차 (중앙값 대비 %)
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        if name in _registry:
+            raise ValueError(f"벤치마크 이름 중복: {name}")
+        _registry[name] = setup
+        return setup
+    return register
+
+
+def registered() -> Dict[str, Setup]:
+    return dict(_registry)
+
+
+def _sample(func: Callable[[], object], loops: int) -> float:
+    # timeit 과 같이 표본 중에는 GC 를 멈춰 잡음을 줄인다
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def measure(name: str, func: Callable[[], object], repeat: int = REPEAT,
+            min_time: float = MIN_SAMPLE_SECONDS) -> Result:
+    func()      # 워밍업 (지연 import, 캐시 등)
+    loops = 1
+    while True:
+        elapsed = _sample(func, loops)
+        if elapsed >= min_time:
+            break
+        loops = loops * 10 if elapsed <= 0 else max(loops + 1, int(loops * min_time * 1.2 / elapsed))
+    samples = [_sample(func, loops) / loops * 1e6 for _ in range(repeat)]
+    median = statistics.median(samples)
+    stdev = statistics.stdev(samples) / median * 100 if len(samples) > 1 and median else 0.0
+    return Result(name, loops, median, min(samples), stdev)
+
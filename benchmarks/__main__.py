@@ -0,0 +1,107 @@
+# benchmarks/__main__.py
+"""
+마이크로벤치마크 실행 및 기준값(baseline) 비교.
+
+    python -m benchmarks --save             # 이 머신의 기준값을 benchmarks/baseline.json 에 저장
+    python -m benchmarks                    # 전체 실행, 기준값이 있으면 비교
+    python -m benchmarks -k jwt -k sessions # 이름에 jwt 또는 sessions 가 들어간 것만
+    python -m benchmarks --json             # 결과를 한 줄에 하나씩 JSON 으로
+
+비교는 잡음이 적은 최솟값 기준이며, 기준값보다 --threshold(기본 25%) 넘게 느려진 항목이 있으면 종료 코드 1.
+기준값은 측정한 머신에 따라 다르므로 저장소에 두지 않습니다 (.gitignore). 비교할 머신(CI 러너 등)에서
+변경 전 커밋으로 --save 한 뒤 같은 머신에서 다시 실행하세요. 기준값이 없으면 측정만 하고 종료 코드 0.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+import benchmarks
+from benchmarks import hot_paths  # noqa: F401  (벤치마크 등록)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _load_baseline(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except FileNotFoundError:
+        return {}
+
+
+def _save_baseline(path: str, results) -> None:
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        },
+        "results": {
+            r.name: {"median_us": round(r.median_us, 3), "min_us": round(r.min_us, 3)}
+            for r in results
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="마이크로벤치마크")
+    parser.add_argument("-k", dest="patterns", action="append", default=[],
+                        help="이름에 이 문자열이 포함된 벤치마크만 (여러 번 지정 가능)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준값 파일")
+    parser.add_argument("--save", action="store_true", help="결과를 기준값으로 저장")
+    parser.add_argument("--threshold", type=float, default=0.25, help="회귀로 볼 느려짐 비율")
+    parser.add_argument("--repeat", type=int, default=benchmarks.REPEAT, help="표본 수")
+    parser.add_argument("--json", action="store_true", help="JSON lines 출력")
+    args = parser.parse_args(argv)
+
+    names = [
+        name for name in benchmarks.registered()
+        if not args.patterns or any(p in name for p in args.patterns)
+    ]
+    if not names:
+        print("선택된 벤치마크가 없습니다", file=sys.stderr)
+        return 2
+
+    baseline = {} if args.save else _load_baseline(args.baseline)
+    if not args.save and not baseline:
+        print(f"기준값 없음 ({args.baseline}) — 비교 없이 측정만 합니다. 먼저 --save 로 만드세요", file=sys.stderr)
+    regressions = []
+    if not args.json:
+        print(f"{'benchmark':<36} {'median_us':>11} {'min_us':>11} {'stdev':>7} {'base_min':>11} {'ratio':>7}")
+
+    results = []
+    for name in names:
+        result = benchmarks.measure(name, benchmarks.registered()[name](), args.repeat)
+        results.append(result)
+        base = baseline.get(name, {}).get("min_us")
+        ratio = result.min_us / base if base else None
+        regressed = ratio is not None and ratio > 1 + args.threshold
+        if regressed:
+            regressions.append(name)
+        if args.json:
+            print(json.dumps({**result._asdict(), "baseline_us": base, "ratio": ratio,
+                              "regressed": regressed}), flush=True)
+        else:
+            base_col = f"{base:11.2f}" if base else f"{'-':>11}"
+            ratio_col = f"{ratio:6.2f}x" if ratio else f"{'-':>7}"
+            mark = "  REGRESSED" if regressed else ""
+            print(f"{name:<36} {result.median_us:11.2f} {result.min_us:11.2f} "
+                  f"{result.stdev_pct:6.1f}% {base_col} {ratio_col}{mark}", flush=True)
+
+    if args.save:
+        _save_baseline(args.baseline, results)
+        print(f"기준값 저장: {args.baseline}", file=sys.stderr)
+    if regressions:
+        print(f"회귀 {len(regressions)}건 (>{args.threshold:.0%}): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
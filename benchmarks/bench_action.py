@@ -0,0 +1,81 @@
+# benchmarks/bench_action.py
+"""
+사용자 동작 하나(ON/OFF, 상태 갱신)의 장치 왕복 수와 지연 — 시뮬레이션 KLAP v2 플러그(P110) 기준.
+
+batched   : multipleRequest 로 명령 + get_device_info + 에너지/카운트다운 조회를 한 번에
+fallback  : multipleRequest 를 모르는 펌웨어 — 첫 시도에서 미지원으로 기억한 뒤 개별 호출
+disabled  : DEVICE_BATCH_ENABLED=false (묶음 요청 도입 전과 같은 개별 호출)
+
+연결은 미리 맺어 두고(캐시된 연결) 동작만 잽니다. plugp100 5.1.4 는 KLAP 세션을 매번 만료로 보아
+요청마다 handshake1/handshake2 를 다시 하므로, 장치 요청 하나가 HTTP 왕복 3회로 셉니다.
+실행: python -m benchmarks.bench_action [반복 횟수] [RTT(ms)]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("TAPO_EMAIL", "bench@example.com")
+os.environ.setdefault("TAPO_PASSWORD", "bench")
+os.environ["PLUGS"] = '{"bench": "127.0.0.1"}'
+os.environ["DISCOVERY_ENABLED"] = "false"
+os.environ["LOG_CONSOLE"] = "false"
+os.environ["LOG_DIR"] = ""
+
+ACTIONS = ("turn_on", "turn_off", "refresh")
+
+
+async def _scenario(n: int, rtt_ms: float, multiple_request: bool, enabled: bool) -> dict:
+    from app.config import settings
+    from app.services import handshake_cache as hc, pyp100
+    from benchmarks.simulated_plug import SimulatedPlug
+
+    settings.DEVICE_BATCH_ENABLED = enabled
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DISCOVERY_CACHE_PATH = os.path.join(tmp, "discovery_cache.json")
+        settings.STATE_CACHE_PATH = os.path.join(tmp, "state_cache.json")
+        pyp100.handshake_cache = hc.HandshakeCache(os.path.join(tmp, "handshake_cache.json"))
+        pyp100.device_batch.handshake_cache = pyp100.handshake_cache
+        with SimulatedPlug(settings.TAPO_EMAIL, settings.TAPO_PASSWORD, rtt=rtt_ms / 1000,
+                           energy=True, multiple_request=multiple_request) as plug:
+            service = pyp100.Pyp100Service()
+            await service.get_status("bench")       # 연결 + (지원 여부 판별)
+            await service.turn_on("bench")
+            for action in ACTIONS:
+                call = {
+                    "turn_on": lambda: service.turn_on("bench"),
+                    "turn_off": lambda: service.turn_off("bench"),
+                    "refresh": lambda: service.get_status("bench"),
+                }[action]
+                before, start = plug.round_trips, time.perf_counter()
+                for _ in range(n):
+                    await call()
+                elapsed = time.perf_counter() - start
+                results[action] = (elapsed / n * 1000, (plug.round_trips - before) / n)
+            await service.close()
+    return results
+
+
+async def run(n: int = 10, rtt_ms: float = 20.0) -> dict:
+    return {
+        "batched": await _scenario(n, rtt_ms, multiple_request=True, enabled=True),
+        "fallback": await _scenario(n, rtt_ms, multiple_request=False, enabled=True),
+        "disabled": await _scenario(n, rtt_ms, multiple_request=True, enabled=False),
+    }
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    results = asyncio.run(run(n, rtt_ms))
+    print(f"사용자 동작당 장치 왕복 (RTT {rtt_ms:g}ms, {n}회 평균)")
+    for scenario, actions in results.items():
+        cells = "  ".join(f"{action} {ms:6.1f}ms/{trips:3.1f}회" for action, (ms, trips) in actions.items())
+        print(f"  {scenario:<9} {cells}")
+
+
+if __name__ == "__main__":
+    main()
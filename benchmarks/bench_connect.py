@@ -0,0 +1,74 @@
+# benchmarks/bench_connect.py
+"""
+플러그 연결(핸드셰이크) 지연 벤치마크 — 시뮬레이션 KLAP v2 플러그 기준.
+
+cold     : 협상 캐시 없음 (처음 보는 플러그 / 캐시 도입 전의 모든 연결)
+          Passthrough → KLAP v1 → KLAP v2 탐색 + get_device_info 로 장치 종류 확인
+restart  : 프로세스 재시작 후 — HANDSHAKE_CACHE_PATH 파일에서 읽은 협상 결과로 연결
+reconnect: 같은 프로세스에서 캐시된 연결이 끊긴 뒤 다시 연결 (메모리 캐시)
+
+실행: python -m benchmarks.bench_connect [반복 횟수] [RTT(ms)]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("TAPO_EMAIL", "bench@example.com")
+os.environ.setdefault("TAPO_PASSWORD", "bench")
+os.environ["PLUGS"] = '{"bench": "127.0.0.1"}'
+os.environ["DISCOVERY_ENABLED"] = "false"
+os.environ["LOG_CONSOLE"] = "false"
+os.environ["LOG_DIR"] = ""
+
+
+async def _connect_once(plug, cache_path: str, fresh_cache: bool) -> tuple:
+    from app.services import handshake_cache as hc, pyp100
+
+    if fresh_cache:
+        # 재시작 흉내: 파일에서 다시 읽는 새 캐시
+        pyp100.handshake_cache = hc.HandshakeCache(cache_path)
+    service = pyp100.Pyp100Service()
+    before = plug.round_trips
+    start = time.perf_counter()
+    device = await service._connect("bench")
+    elapsed = time.perf_counter() - start
+    await service._close_device(device)
+    return elapsed, plug.round_trips - before
+
+
+async def run(n: int = 10, rtt_ms: float = 20.0) -> dict:
+    from app.config import settings
+    from benchmarks.simulated_plug import SimulatedPlug
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "handshake_cache.json")
+        settings.DISCOVERY_CACHE_PATH = os.path.join(tmp, "discovery_cache.json")
+        with SimulatedPlug(settings.TAPO_EMAIL, settings.TAPO_PASSWORD, rtt=rtt_ms / 1000) as plug:
+            for scenario in ("cold", "restart", "reconnect"):
+                times, trips = [], 0
+                for _ in range(n):
+                    if scenario == "cold" and os.path.exists(cache_path):
+                        os.remove(cache_path)
+                    elapsed, count = await _connect_once(plug, cache_path, fresh_cache=scenario != "reconnect")
+                    times.append(elapsed)
+                    trips = count
+                results[scenario] = (sum(times) / n * 1000, trips)
+    return results
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    results = asyncio.run(run(n, rtt_ms))
+    cold = results["cold"][0]
+    print(f"플러그 연결 지연 (ms, RTT {rtt_ms:g}ms, {n}회 평균)")
+    for scenario, (ms, trips) in results.items():
+        print(f"  {scenario:<10} {ms:8.1f}  왕복 {trips:2d}회  ({cold / ms:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
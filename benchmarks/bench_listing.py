@@ -0,0 +1,127 @@
+# benchmarks/bench_listing.py
+"""
+GET /plugs/ 목록 페이지의 지연과 메모리 — 플러그 수를 10배씩 늘려 가며.
+
+플러그 수마다 별도 프로세스에서 (RSS 를 섞지 않도록) 실제 앱을 TestClient 로 띄우고
+상태 캐시를 채운 뒤(10% ON, 1% 통신 실패, 5% 사용 중) 다음을 잽니다.
+
+first   : 첫 페이지 (limit=100)
+last    : 마지막 근처 페이지 (커서)
+state   : state=on 필터 페이지
+prefix  : 이름 접두어 필터 페이지
+RSS     : 상태를 채운 뒤의 RSS 와, 페이지 요청 반복 동안 늘어난 RSS
+상태 배열: 상태 캐시 배열 크기 (플러그당 9바이트)
+
+장치와는 통신하지 않습니다 (상태가 오래되지 않았으므로 백그라운드 재조회도 없음).
+실행: python -m benchmarks.bench_listing [반복 횟수] [플러그 수 ...]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = (300, 3000, 30000)
+PAGE = 100
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _child(n: int, repeat: int) -> dict:
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)       # DATABASE_URL 은 ./users.db
+    os.environ.update({
+        "SECRET_KEY": "bench", "TAPO_EMAIL": "bench@example.com", "TAPO_PASSWORD": "bench",
+        "PLUGS": json.dumps({f"plug{i:05d}": f"10.{i // 65000}.{i // 250 % 260}.{i % 250 + 1}" for i in range(n)}),
+        "DISCOVERY_ENABLED": "false", "PREWARM_ENABLED": "false", "RATE_LIMIT_ENABLED": "false",
+        "SCHEDULER_ENABLED": "false", "SESSION_LEASE_SECONDS": "0",
+        "LOG_CONSOLE": "false", "LOG_DIR": "", "PROFILING_ENABLED": "false",
+        "STATE_CACHE_PATH": os.path.join(tmp, "state_cache.json"),
+        "CHANGE_FEED_REFRESH_SECONDS": "3600", "SERVE_STATIC": "false",
+    })
+    from fastapi.testclient import TestClient
+
+    from app.db import SessionLocal
+    from app.main import app
+    from app.models import PlugSession, User
+    from app.services.auth import get_password_hash
+    from app.services.plug_listing import encode_cursor
+    from app.services.state_cache import plug_state_cache
+
+    def timed(client, url, headers) -> float:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+        return statistics.median(samples)
+
+    with TestClient(app) as client:
+        names = [f"plug{i:05d}" for i in range(n)]
+        for i, name in enumerate(names):
+            plug_state_cache.update(name, None if i % 100 == 1 else i % 10 == 0)
+        with SessionLocal() as db:
+            user = User(username="bench", hashed_password=get_password_hash("bench"), role="admin")
+            db.add(user)
+            db.commit()
+            db.add_all(PlugSession(plug_name=name, user_id=user.id) for name in names[::20])
+            db.commit()
+        token = client.post("/auth/login", data={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        client.get(f"/plugs/?limit={PAGE}", headers=headers)       # 준비 (정렬 인덱스 등)
+        rss_before = _rss_kb()
+        last_cursor = encode_cursor(names[-PAGE // 2])
+        result = {
+            "plugs": n,
+            "first_ms": timed(client, f"/plugs/?limit={PAGE}", headers),
+            "last_ms": timed(client, f"/plugs/?limit={PAGE}&cursor={last_cursor}", headers),
+            "state_ms": timed(client, f"/plugs/?limit={PAGE}&state=on", headers),
+            "prefix_ms": timed(client, f"/plugs/?limit={PAGE}&prefix=plug0001", headers),
+            "rss_mb": round(rss_before / 1024, 1),
+            "rss_growth_kb": _rss_kb() - rss_before,
+            "state_kb": round(plug_state_cache.nbytes() / 1024, 1),
+        }
+    return result
+
+
+def run(repeat: int = 30, sizes=DEFAULT_SIZES) -> list:
+    results = []
+    for n in sizes:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_listing", "--child", str(n), str(repeat)],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(_child(int(sys.argv[2]), int(sys.argv[3]))))
+        return
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    sizes = [int(arg) for arg in sys.argv[2:]] or DEFAULT_SIZES
+    print(f"GET /plugs/ 페이지(limit={PAGE}) 중앙값, {repeat}회")
+    print(f"  {'플러그':>7}  {'first':>8}  {'last':>8}  {'state=on':>8}  {'prefix':>8}  {'RSS':>8}  {'증가':>7}  {'상태 배열':>9}")
+    for r in run(repeat, sizes):
+        print(f"  {r['plugs']:>7}  {r['first_ms']:>6.2f}ms  {r['last_ms']:>6.2f}ms  {r['state_ms']:>6.2f}ms"
+              f"  {r['prefix_ms']:>6.2f}ms  {r['rss_mb']:>6.1f}MB  {r['rss_growth_kb']:>5}KB  {r['state_kb']:>7.1f}KB")
+
+
+if __name__ == "__main__":
+    main()
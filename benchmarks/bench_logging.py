@@ -0,0 +1,112 @@
+# benchmarks/bench_logging.py
+"""
+요청당 로깅 오버헤드 마이크로벤치마크 (이벤트 루프 스레드 기준).
+
+before: basicConfig + 파일 StreamHandler 동기 쓰기, f-string INFO/DEBUG 로그
+after : app.log 파이프라인 (QueueHandler → QueueListener, 지연 포맷 event, DEBUG 샘플링)
+
+실행: python -m benchmarks.bench_logging [반복 횟수]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("TAPO_EMAIL", "bench@example.com")
+os.environ.setdefault("TAPO_PASSWORD", "bench")
+
+USERS = ["admin", "user1", "user2", "user3"]
+PLUGS = [f"plug{i}" for i in range(8)]
+
+
+def request_before(logger: logging.Logger) -> None:
+    """기존 list_plugs + reserve_on 경로의 로그 패턴."""
+    username, user_id = "user1", 2
+    logger.info(f"플러그 목록 조회: 사용자 '{username}' (ID: {user_id})")
+    for name in PLUGS:
+        users = list(USERS)
+        logger.info(f"[Pyp100Service] '{name}' status → {'on'}")
+        logger.info(f"플러그 {name} 사용자 목록: {users}")
+        is_using = username in users
+        logger.info(f"사용자 '{username}'가 '{name}' 플러그 사용 중: {is_using}")
+        logger.debug(f"사용자 비교 상세: 현재={username}, 목록={users}, 타입={type(username)}")
+    logger.info(f"플러그 {PLUGS[0]} 사용 예약 요청: 사용자 '{username}' (ID: {user_id})")
+    logger.info(f"사용자(ID: {user_id})가 새로 플러그 '{PLUGS[0]}'을 사용합니다.")
+    logger.info(f"플러그 {PLUGS[0]}의 현재 사용자 목록: {USERS}")
+    logger.info(f"플러그 {PLUGS[0]}를 ON으로 전환 (첫 번째 사용자)")
+
+
+def request_after(logger: logging.Logger) -> None:
+    """같은 경로를 app.log.event / lazy 포맷으로 바꾼 패턴."""
+    from app.log import event
+
+    username, user_id = "user1", 2
+    event(logger, "plugs.list", user=username, user_id=user_id)
+    for name in PLUGS:
+        users = list(USERS)
+        event(logger, "device.status", logging.DEBUG, plug=name, state=True)
+        event(logger, "plugs.list.plug", logging.DEBUG, plug=name, users=users, using=username in users)
+    event(logger, "plug.reserve", plug=PLUGS[0], user=username, user_id=user_id)
+    logger.debug("사용자(ID: %s)가 새로 플러그 '%s'을 사용합니다.", user_id, PLUGS[0])
+    event(logger, "session.acquire", plug=PLUGS[0], user_id=user_id, active=1,
+          users=USERS, switch_on=True)
+
+
+def _reset_root() -> logging.Logger:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    return root
+
+
+def _measure(func, logger: logging.Logger, n: int) -> float:
+    for _ in range(min(200, n)):
+        func(logger)
+    start = time.perf_counter()
+    for _ in range(n):
+        func(logger)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def run(n: int = 5000) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for level in ("INFO", "WARNING"):
+            # before: 루트 로거에 파일 핸들러 직접 연결 (동기 쓰기)
+            root = _reset_root()
+            handler = logging.FileHandler(os.path.join(tmp, f"before-{level}.log"), encoding="utf-8")
+            handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+            root.addHandler(handler)
+            root.setLevel(level)
+            results[f"before/{level}"] = _measure(request_before, logging.getLogger("bench"), n)
+
+            # after: app.log 파이프라인
+            _reset_root()
+            os.environ["LOG_LEVEL"] = level
+            os.environ["LOG_CONSOLE"] = "false"
+            os.environ["LOG_DIR"] = os.path.join(tmp, f"after-{level}")
+            from app import config, log
+
+            config.settings = config.Settings()
+            log.settings = config.settings
+            log.setup_logging()
+            results[f"after/{level}"] = _measure(request_after, logging.getLogger("bench"), n)
+            log.shutdown_logging()
+        _reset_root()
+    return results
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    results = run(n)
+    print(f"요청당 로깅 오버헤드 (µs, 호출 스레드 기준, {n}회 평균)")
+    for level in ("INFO", "WARNING"):
+        before, after = results[f"before/{level}"], results[f"after/{level}"]
+        print(f"  LOG_LEVEL={level:<8} before {before:8.1f}  after {after:8.1f}  ({before / after:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# benchmarks/edge_sites.py
+"""
+멀티 사이트 엣지 에이전트 로컬 점검 — 중앙 서버 하나와 사이트별 에이전트 프로세스 여러 개를 이 머신에서 띄웁니다.
+
+임시 디렉터리에 중앙 서버(uvicorn, PLUGS 는 모두 "edge:<사이트>")와 --sites 개의 에이전트(edge_agent.py,
+사이트마다 --plugs 개의 시뮬레이션 KLAP 플러그)를 실행하고, 다음을 차례로 확인합니다.
+
+  1. 연결     모든 사이트가 /edge/ws 로 붙기까지
+  2. 명령     모든 플러그에 /on — 응답 지연과, 에이전트가 올린 상태가 목록(GET /plugs/)에 ON 으로 보이기까지
+  3. 업링크   중앙 서버를 내렸다 다시 올림 — 에이전트는 그동안 로컬에서 계속 동작하고, 재연결 후 상태가 다시 맞기까지
+  4. 에이전트 한 사이트의 에이전트를 죽인 채 그 사이트 플러그에 /off (목표만 저널에 남음) — 에이전트를 다시 띄우면
+              재연결 직후 반영되어 목록에 OFF 로 보이기까지
+
+시뮬레이션 플러그는 에이전트 프로세스 안에 있으므로, 에이전트를 다시 띄울 때는 마지막 목표(EDGE_DESIRED_PATH)로
+릴레이 상태를 이어받습니다 (실제 플러그는 에이전트가 죽어도 상태를 유지하므로).
+중앙 서버의 WebSocket 에는 uvicorn 의 WebSocket 구현(pip install websockets)이 필요합니다.
+
+실행: python -m benchmarks.edge_sites [--sites 3] [--plugs 4] [--rtt-ms 20] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "edge-sites"
+WAIT_SECONDS = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _layout(sites: int, plugs: int) -> Dict[str, Dict[str, str]]:
+    """{사이트: {플러그: 가짜 IP}}"""
+    return {
+        f"site{s + 1}": {f"site{s + 1}-plug{p + 1}": f"10.{s + 1}.0.{p + 1}" for p in range(plugs)}
+        for s in range(sites)
+    }
+
+
+def _base_env(tmp: str, name: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT, "SECRET_KEY": "edge-sites",
+        "TAPO_EMAIL": "edge@example.com", "TAPO_PASSWORD": "edge-sites",
+        "DISCOVERY_ENABLED": "false", "PREWARM_ENABLED": "false", "SCHEDULER_ENABLED": "false",
+        "MQTT_ENABLED": "false", "SERVE_STATIC": "false", "TRAFFIC_CAPTURE_PATH": "",
+        "RATE_LIMIT_ENABLED": "false", "LOG_CONSOLE": "false", "LOG_DIR": "",
+        "STATE_CACHE_PATH": os.path.join(tmp, name, "state_cache.json"),
+        "DISCOVERY_CACHE_PATH": os.path.join(tmp, name, "discovery_cache.json"),
+        "HANDSHAKE_CACHE_PATH": os.path.join(tmp, name, "handshake_cache.json"),
+    })
+    os.makedirs(os.path.join(tmp, name), exist_ok=True)
+    return env
+
+
+class Harness:
+    def __init__(self, args, tmp: str):
+        self.args = args
+        self.tmp = tmp
+        self.layout = _layout(args.sites, args.plugs)
+        self.tokens = {site: f"token-{site}" for site in self.layout}
+        self.port = _free_port()
+        self.central = None
+        self.agents: Dict[str, subprocess.Popen] = {}
+
+        self.central_env = _base_env(tmp, "central")
+        self.central_env.update({
+            "PLUGS": json.dumps({plug: f"edge:{site}" for site, plugs in self.layout.items() for plug in plugs}),
+            "EDGE_TOKENS": json.dumps(self.tokens),
+        })
+
+    # ─── 프로세스 ───────────────────────────────────────────
+
+    def start_central(self) -> None:
+        self.central = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=os.path.join(self.tmp, "central"), env=self.central_env,
+        )
+
+    def start_agent(self, site: str) -> None:
+        env = _base_env(self.tmp, site)
+        env.update({
+            "PLUGS": json.dumps(self.layout[site]),
+            "EDGE_SITE": site, "EDGE_TOKEN": self.tokens[site],
+            "EDGE_CENTRAL_URL": f"ws://127.0.0.1:{self.port}/edge/ws",
+            "EDGE_POLL_SECONDS": "2", "EDGE_RECONNECT_SECONDS": "0.5",
+            "EDGE_DESIRED_PATH": os.path.join(self.tmp, site, "edge_desired.json"),
+            "SIM_RTT": str(self.args.rtt_ms / 1000),
+        })
+        self.agents[site] = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.edge_sites", "--agent"], cwd=os.path.join(self.tmp, site), env=env,
+        )
+
+    @staticmethod
+    def _stop(process) -> None:
+        if process is not None and process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def stop_central(self) -> None:
+        self._stop(self.central)
+        self.central = None
+
+    def kill_agent(self, site: str) -> None:
+        process = self.agents.pop(site)
+        process.kill()
+        process.wait()
+
+    def stop_all(self) -> None:
+        for site in list(self.agents):
+            self._stop(self.agents.pop(site))
+        self.stop_central()
+
+    # ─── 시나리오 ───────────────────────────────────────────
+
+    async def run(self) -> dict:
+        import httpx
+
+        result: dict = {"sites": len(self.layout), "plugs": sum(map(len, self.layout.values()))}
+        self.start_central()
+        for site in self.layout:
+            self.start_agent(site)
+
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{self.port}", timeout=30) as client:
+            async def wait_for(check: Callable, what: str) -> float:
+                started = time.perf_counter()
+                while time.perf_counter() - started < WAIT_SECONDS:
+                    try:
+                        if await check():
+                            return round(time.perf_counter() - started, 2)
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.05)
+                raise SystemExit(f"{WAIT_SECONDS:g}초 안에 {what} 되지 않았습니다")
+
+            async def server_up() -> bool:
+                return (await client.get("/healthz")).status_code < 500
+
+            await wait_for(server_up, "중앙 서버가 응답하게")
+            login = await client.post("/auth/login", data={"username": "edge-admin", "password": PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            async def connected(sites: List[str]) -> bool:
+                stats = (await client.get("/debug/edge", headers=headers)).json()
+                up = {row["site"] for row in stats if row["connected"]}
+                return set(sites) <= up
+
+            async def states() -> Dict[str, bool]:
+                rows, cursor = [], None
+                while True:
+                    params = {"cursor": cursor} if cursor else {}
+                    response = await client.get("/plugs/", params=params, headers=headers)
+                    rows.extend(response.json())
+                    cursor = response.headers.get("X-Next-Cursor")
+                    if not cursor:
+                        return {row["name"]: row["status"] for row in rows}
+
+            def all_are(plugs: List[str], want: bool) -> Callable:
+                async def check() -> bool:
+                    current = await states()
+                    return all(current.get(plug) is want for plug in plugs)
+                return check
+
+            everything = [plug for plugs in self.layout.values() for plug in plugs]
+
+            # 1. 연결
+            result["connect_s"] = await wait_for(lambda: connected(list(self.layout)), "모든 사이트가 연결")
+
+            # 2. 명령 — 응답 지연과, 스트림으로 올라온 상태가 보이기까지
+            async def turn(plug: str, action: str) -> float:
+                started = time.perf_counter()
+                response = await client.post(f"/plugs/{plug}/{action}", headers=headers)
+                response.raise_for_status()
+                return (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            latencies = sorted(await asyncio.gather(*(turn(plug, "on") for plug in everything)))
+            await wait_for(all_are(everything, True), "모든 플러그가 ON 으로")
+            result["on"] = {
+                "p50_ms": round(latencies[len(latencies) // 2], 1),
+                "max_ms": round(latencies[-1], 1),
+                "observed_s": round(time.perf_counter() - started, 2),
+            }
+
+            # 3. 업링크 끊김 — 중앙 서버 재시작
+            self.stop_central()
+            await asyncio.sleep(2.0)
+            self.start_central()
+            await wait_for(server_up, "중앙 서버가 다시 응답하게")
+            result["uplink"] = {
+                "reconnect_s": await wait_for(lambda: connected(list(self.layout)), "모든 사이트가 재연결"),
+                "states_s": await wait_for(all_are(everything, True), "재연결 후 상태가 ON 으로"),
+            }
+
+            # 4. 에이전트 끊김 — 끊긴 동안의 명령은 저널에 남았다가 재연결 직후 반영
+            site = next(iter(self.layout))
+            plugs = list(self.layout[site])
+            self.kill_agent(site)
+            await wait_for(lambda: self._disconnected(client, headers, site), f"'{site}' 연결이 끊겼다고 표시")
+            await asyncio.gather(*(turn(plug, "off") for plug in plugs))
+            still_on = await states()
+            started = time.perf_counter()
+            self.start_agent(site)
+            await wait_for(all_are(plugs, False), f"'{site}' 플러그가 OFF 로")
+            result["agent_outage"] = {
+                "site": site,
+                "on_while_down": sum(1 for plug in plugs if still_on.get(plug) is True),
+                "applied_after_restart_s": round(time.perf_counter() - started, 2),
+            }
+            result["edge"] = (await client.get("/debug/edge", headers=headers)).json()
+        return result
+
+    @staticmethod
+    async def _disconnected(client, headers: dict, site: str) -> bool:
+        stats = (await client.get("/debug/edge", headers=headers)).json()
+        return not any(row["site"] == site and row["connected"] for row in stats)
+
+
+def _seed_central(harness: Harness) -> None:
+    """중앙 DB 에 관리자 계정을 만듭니다 (중앙 서버와 같은 환경·디렉터리에서)."""
+    os.environ.update(harness.central_env)
+    os.chdir(os.path.join(harness.tmp, "central"))     # DATABASE_URL 은 ./users.db
+    from app.db import SessionLocal, init_db
+    from app.models import User
+    from app.services.auth import get_password_hash
+
+    init_db()
+    with SessionLocal() as db:
+        db.add(User(username="edge-admin", hashed_password=get_password_hash(PASSWORD), role="admin"))
+        db.commit()
+
+
+def _agent() -> int:
+    """에이전트 프로세스 (--agent): 이 사이트의 PLUGS 를 시뮬레이션 플러그로 바꿔 끼우고 edge_agent.py 를 실행."""
+    import edge_agent
+    from app.config import settings
+    from app.services.edge_agent import edge_agent as agent
+    from app.services.pyp100 import pyp100_service
+    from benchmarks.simulated_plug import SimulatedFleet
+
+    plugs = pyp100_service.plugs
+    with SimulatedFleet(settings.TAPO_EMAIL, settings.TAPO_PASSWORD, plugs.values(),
+                        rtt=float(os.environ.get("SIM_RTT", "0.02"))) as fleet:
+        agent.load_desired()
+        for name, on in agent._desired.items():
+            if name in plugs:
+                fleet.plugs[plugs[name]].device_on = on      # 실제 플러그처럼 릴레이 상태를 유지
+        return edge_agent.main(["--log-level", "WARNING"])
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.edge_sites", description="멀티 사이트 엣지 에이전트 로컬 점검")
+    parser.add_argument("--sites", type=int, default=3, help="사이트(에이전트 프로세스) 수")
+    parser.add_argument("--plugs", type=int, default=4, help="사이트마다 시뮬레이션 플러그 수")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="시뮬레이션 플러그 왕복 지연 (ms)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    parser.add_argument("--agent", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.agent:
+        return _agent()
+
+    harness = Harness(args, tempfile.mkdtemp(prefix="edge-sites-"))
+    _seed_central(harness)
+    try:
+        result = asyncio.run(harness.run())
+    finally:
+        harness.stop_all()
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    print(f"사이트 {result['sites']}개, 플러그 {result['plugs']}개 (RTT {args.rtt_ms:g}ms)")
+    print(f"  연결        모든 사이트 {result['connect_s']}s")
+    on = result["on"]
+    print(f"  /on         응답 p50 {on['p50_ms']}ms / max {on['max_ms']}ms, 목록에 ON {on['observed_s']}s")
+    uplink = result["uplink"]
+    print(f"  업링크      중앙 재시작 후 재연결 {uplink['reconnect_s']}s, 상태 일치 {uplink['states_s']}s")
+    outage = result["agent_outage"]
+    print(f"  에이전트    '{outage['site']}' 끊긴 동안 /off → 여전히 ON {outage['on_while_down']}개, "
+          f"재시작 후 반영 {outage['applied_after_restart_s']}s")
+    for row in result["edge"]:
+        print(f"  {row['site']:<10} 연결 {row['connected']!s:<5} 플러그 {row['plugs']} 명령 {row['calls']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,202 @@
+# benchmarks/hot_paths.py
+"""
+서비스/인증 hot path 마이크로벤치마크 (python -m benchmarks 가 import 해서 등록).
+
+- Pyp100Service._parse_state       : 장치 응답 형식 3가지
+- Settings.PLUGS                   : PLUGS 환경변수 파싱 (정상 JSON / 작은따옴표 보정 경로)
+- PlugInfo / PlugStatus 직렬화      : 10 / 100 / 1000 플러그 응답 (검증 + JSON)
+- JWT                              : create_access_token, get_token_payload(검증), get_current_user
+- 세션 쿼리 (app/routers/plugs.py)  : count_active / list_users / *_many — 메모리 SQLite
+"""
+import json
+import os
+from datetime import timedelta
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("TAPO_EMAIL", "bench@example.com")
+os.environ.setdefault("TAPO_PASSWORD", "bench")
+os.environ.setdefault("LOG_CONSOLE", "false")
+os.environ.setdefault("LOG_DIR", "")
+
+from benchmarks import benchmark
+
+SIZES = (10, 100, 1000)
+
+
+# -------------------------------------------------------------------
+# Pyp100Service._parse_state
+# -------------------------------------------------------------------
+def _parse_state_bench(raw: dict):
+    from app.services.pyp100 import Pyp100Service
+
+    parse = Pyp100Service()._parse_state
+    return lambda: parse(raw)
+
+
+@benchmark("parse_state/device_on")
+def _():
+    return _parse_state_bench({"device_on": True, "on_time": 120, "nickname": "x" * 16})
+
+
+@benchmark("parse_state/on")
+def _():
+    return _parse_state_bench({"on": 1})
+
+
+@benchmark("parse_state/relay_state")
+def _():
+    return _parse_state_bench({"system": {"get_sysinfo": {"relay_state": 1, "alias": "x"}}})
+
+
+# -------------------------------------------------------------------
+# Settings.PLUGS
+# -------------------------------------------------------------------
+def _plugs_env(n: int, quoted: bool) -> str:
+    data = {f"plug{i}": f"192.168.{i // 250}.{i % 250 + 1}" for i in range(n)}
+    if quoted:
+        return json.dumps(data)
+    # docker-compose 등에서 흔한 작은따옴표 형식 — json.loads 실패 후 보정 경로를 탄다
+    return json.dumps(data).replace('"', "'")
+
+
+def _settings_plugs_bench(n: int, quoted: bool):
+    from app.config import settings
+
+    raw = _plugs_env(n, quoted)
+
+    def parse():
+        saved = os.environ.get("PLUGS")
+        os.environ["PLUGS"] = raw
+        try:
+            return settings.PLUGS
+        finally:
+            if saved is None:
+                os.environ.pop("PLUGS", None)
+            else:
+                os.environ["PLUGS"] = saved
+    return parse
+
+
+for _n in (10, 100):
+    benchmark(f"settings_plugs/json/{_n}")(lambda n=_n: _settings_plugs_bench(n, True))
+    benchmark(f"settings_plugs/single_quoted/{_n}")(lambda n=_n: _settings_plugs_bench(n, False))
+
+
+# -------------------------------------------------------------------
+# PlugInfo / PlugStatus 직렬화 (FastAPI response_model 과 같은 검증 + JSON)
+# -------------------------------------------------------------------
+def _plug_rows(n: int) -> List[dict]:
+    return [
+        {"name": f"plug{i}", "ip": f"192.168.{i // 250}.{i % 250 + 1}", "status": i % 3 != 0,
+         "active_users": i % 4, "users": [f"user{j}" for j in range(i % 4)]}
+        for i in range(n)
+    ]
+
+
+def _serialize_bench(model_name: str, n: int):
+    from pydantic import TypeAdapter
+    from app import schemas
+
+    model = getattr(schemas, model_name)
+    adapter = TypeAdapter(List[model])
+    fields = set(model.model_fields)
+    rows = [{k: v for k, v in row.items() if k in fields} for row in _plug_rows(n)]
+
+    def serialize():
+        return adapter.dump_json([model(**row) for row in rows])
+    return serialize
+
+
+for _n in SIZES:
+    benchmark(f"serialize/plug_info/{_n}")(lambda n=_n: _serialize_bench("PlugInfo", n))
+    benchmark(f"serialize/plug_status/{_n}")(lambda n=_n: _serialize_bench("PlugStatus", n))
+
+
+# -------------------------------------------------------------------
+# JWT
+# -------------------------------------------------------------------
+@benchmark("jwt/create_access_token")
+def _():
+    from app.services.auth import create_access_token
+
+    data = {"sub": "user1", "role": "user"}
+    return lambda: create_access_token(data, timedelta(minutes=15))
+
+
+@benchmark("jwt/get_token_payload")
+def _():
+    from app.routers.auth import get_token_payload
+    from app.services.auth import create_access_token
+
+    header = "Bearer " + create_access_token({"sub": "user1", "role": "user"}, timedelta(minutes=15))
+    return lambda: get_token_payload(header)
+
+
+# -------------------------------------------------------------------
+# 세션 쿼리
+# -------------------------------------------------------------------
+def _session_db(plugs: int, users_per_plug: int = 3):
+    """메모리 SQLite 에 users / plug_sessions 를 채운 Session."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db import Base
+    from app.models import PlugSession, User
+    import app.models  # noqa: F401  (모든 테이블 등록)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool, future=True)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, future=True)()
+    users = [User(username=f"user{i}", hashed_password="x") for i in range(users_per_plug * 4)]
+    db.add_all(users)
+    db.flush()
+    for p in range(plugs):
+        for u in range(users_per_plug):
+            db.add(PlugSession(plug_name=f"plug{p}", user_id=users[(p + u) % len(users)].id))
+    db.commit()
+    return db, [f"plug{p}" for p in range(plugs)]
+
+
+@benchmark("jwt/get_current_user")
+def _():
+    from app.routers.auth import get_current_user
+
+    db, _plugs = _session_db(1)
+    payload = {"sub": "user1", "role": "user"}
+    return lambda: get_current_user(payload, db)
+
+
+@benchmark("sessions/count_active")
+def _():
+    from app.services.sessions import count_active
+
+    db, plugs = _session_db(100)
+    return lambda: count_active(db, plugs[50])
+
+
+@benchmark("sessions/list_users")
+def _():
+    from app.services.sessions import list_users
+
+    db, plugs = _session_db(100)
+    return lambda: list_users(db, plugs[50])
+
+
+for _n in (10, 100):
+    def _count_many(n=_n):
+        from app.services.sessions import count_active_many
+
+        db, plugs = _session_db(n)
+        return lambda: count_active_many(db, plugs)
+
+    def _users_many(n=_n):
+        from app.services.sessions import list_users_many
+
+        db, plugs = _session_db(n)
+        return lambda: list_users_many(db, plugs)
+
+    benchmark(f"sessions/count_active_many/{_n}")(_count_many)
+    benchmark(f"sessions/list_users_many/{_n}")(_users_many)
@@ -0,0 +1,99 @@
+# benchmarks/local_broker.py
+"""
+메모리 안의 MQTT 브로커 대역 (MQTT 브리지 점검·벤치마크 전용).
+
+MqttBridge 의 transport_factory 자리에 넣으면 실제 브로커나 aiomqtt 없이 브리지를 돌릴 수 있습니다.
+retained 메시지, + / # 와일드카드, LWT(연결이 비정상 종료될 때)를 흉내 냅니다.
+inject() 는 다른 클라이언트(Home Assistant 등)가 보낸 것처럼 메시지를 발행합니다.
+
+    broker = LocalBroker()
+    bridge = MqttBridge(transport_factory=broker.client)
+    await bridge.start()
+    await broker.inject("tapo/plug/p1/set", "on")
+    broker.retained["tapo/plug/p1/state"]
+"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    parts, levels = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(parts):
+        if part == "#":
+            return True
+        if i >= len(levels) or (part != "+" and part != levels[i]):
+            return False
+    return len(parts) == len(levels)
+
+
+class LocalClient:
+    def __init__(self, broker: "LocalBroker", will: Optional[Tuple[str, str]] = None):
+        self._broker = broker
+        self._will = will
+        self._filters: List[str] = []
+        self._inbox: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> "LocalClient":
+        if self._broker.refuse:
+            raise ConnectionRefusedError("local broker: 연결 거부")
+        self._broker.clients.append(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._broker.clients.remove(self)
+        # 예외로 끊긴 연결(취소 포함)은 LWT 를 남긴다 — 정상 종료(DISCONNECT)는 남기지 않음
+        if exc_type is not None and self._will is not None:
+            self._broker.route(self._will[0], self._will[1].encode(), retain=True)
+
+    async def publish(self, topic: str, payload: str, retain: bool = False) -> None:
+        if self not in self._broker.clients:
+            raise ConnectionError("local broker: 연결이 끊겼습니다")
+        self._broker.route(topic, payload.encode() if isinstance(payload, str) else payload, retain)
+
+    async def subscribe(self, pattern: str) -> None:
+        self._filters.append(pattern)
+        for topic, payload in self._broker.retained.items():
+            if topic_matches(pattern, topic):
+                self._inbox.put_nowait((topic, payload))
+
+    async def messages(self) -> AsyncIterator[Tuple[str, bytes]]:
+        while True:
+            item = await self._inbox.get()
+            if item is None:
+                raise ConnectionError("local broker: 연결이 끊겼습니다")
+            yield item
+
+    def deliver(self, topic: str, payload: bytes) -> None:
+        if any(topic_matches(pattern, topic) for pattern in self._filters):
+            self._inbox.put_nowait((topic, payload))
+
+
+class LocalBroker:
+    def __init__(self):
+        self.retained: Dict[str, bytes] = {}
+        self.log: List[Tuple[str, bytes, bool]] = []        # 발행된 모든 메시지 (topic, payload, retain)
+        self.clients: List[LocalClient] = []
+        self.refuse = False                                 # True 면 새 연결을 거부
+
+    def client(self, will: Optional[Tuple[str, str]] = None) -> LocalClient:
+        return LocalClient(self, will)
+
+    def route(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        self.log.append((topic, payload, retain))
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        for client in list(self.clients):
+            client.deliver(topic, payload)
+
+    async def inject(self, topic: str, payload: str) -> None:
+        """외부 클라이언트가 보낸 메시지처럼 발행하고, 구독자가 처리할 틈을 줍니다."""
+        self.route(topic, payload.encode())
+        await asyncio.sleep(0)
+
+    def disconnect_all(self) -> None:
+        """브로커 재시작처럼 모든 연결을 끊습니다."""
+        for client in list(self.clients):
+            client._inbox.put_nowait(None)
@@ -0,0 +1,254 @@
+# benchmarks/replay.py
+"""
+요청 트레이스(TRAFFIC_CAPTURE_PATH, app/traffic_capture.py) 재생 — 실제 부하를 시뮬레이션 플러그로 다시 돌립니다.
+
+임시 디렉터리(DB·캐시 파일)에서 앱을 이 프로세스 안에 띄우고, 트레이스에 나온 플러그마다 시뮬레이션 KLAP 플러그를
+하나씩 붙인 뒤(SimulatedFleet) 행을 기록된 간격대로 다시 보냅니다. --speed 10 이면 10배 빠르게, 0 이면 간격 없이
+(--parallel 개까지 동시에) 보냅니다. 사용자 별칭마다 계정을 만들어 두며(역할은 트레이스의 role),
+로그인 행은 실제로 /auth/login 을 호출하고 그 전에 쓰인 토큰은 직접 발급해 둡니다.
+
+본문은 기록되지 않으므로 로그인과 그룹 명령(action) 외에 본문이 필요한 요청은 원래와 다른 응답이 날 수 있습니다.
+응답 코드가 기록과 다른 수를 라우트별로 함께 보여 줍니다. 그룹 멤버도 기록되지 않으므로 --groups 로 넘기세요.
+
+보고: 라우트별 지연 분포(p50/p90/p99/max, 기록 당시 p50), 장치 HTTP 왕복 수와 장치 요청 method 별 수,
+DB 쿼리 수. Pyp100Service 나 라우터를 바꾼 전후로 같은 트레이스를 돌려 비교하세요 (--json 은 기계 판독용).
+
+실행: python -m benchmarks.replay <trace.jsonl.gz> [--speed 1] [--rtt-ms 20] [--parallel 256] [--groups JSON]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+PASSWORD = "replay"
+DRAIN_SECONDS = 30.0            # 재생 후 Reconciler 가 남은 목표를 반영하길 기다리는 최대 시간
+_NAME_PARAM = re.compile(r"\{name(?::path)?\}")
+
+TS, METHOD, ROUTE, PLUG, USER, ROLE, ARG, STATUS, MS = range(9)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def read_trace(path: str) -> Iterator[list]:
+    """트레이스 파일의 행 (헤더 줄은 건너뜀). 앱 설정을 읽기 전에 쓰이므로 app 을 import 하지 않습니다."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                if isinstance(row, list):
+                    yield row
+
+
+def _setup_env(tmp: str, plugs: List[str], groups: Dict[str, List[str]]) -> None:
+    """앱을 import 하기 전에: 임시 DB/캐시, 트레이스의 플러그(+그룹 멤버)에 가짜 IP."""
+    names = list(dict.fromkeys([*plugs, *(m for members in groups.values() for m in members)]))
+    os.chdir(tmp)       # DATABASE_URL 은 ./users.db
+    os.environ.update({
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "replay"),
+        "TAPO_EMAIL": "replay@example.com", "TAPO_PASSWORD": "replay",
+        "PLUGS": json.dumps({name: f"10.{(i + 1) >> 16 & 255}.{(i + 1) >> 8 & 255}.{(i + 1) & 255}"
+                             for i, name in enumerate(names)}, ensure_ascii=False),
+        "PLUG_GROUPS": json.dumps(groups, ensure_ascii=False),
+        "DISCOVERY_ENABLED": "false", "PREWARM_ENABLED": "false", "SCHEDULER_ENABLED": "false",
+        "MQTT_ENABLED": "false", "SERVE_STATIC": "false", "TRAFFIC_CAPTURE_PATH": "",
+        "LOG_CONSOLE": "false", "LOG_DIR": "",
+        "STATE_CACHE_PATH": os.path.join(tmp, "state_cache.json"),
+        "DISCOVERY_CACHE_PATH": os.path.join(tmp, "discovery_cache.json"),
+        "HANDSHAKE_CACHE_PATH": os.path.join(tmp, "handshake_cache.json"),
+    })
+
+
+def _request(row: list, tokens: Dict[str, str]) -> Optional[tuple]:
+    """행 → (method, path, httpx 인자). 경로를 채울 수 없으면 None (건너뜀)."""
+    path = _NAME_PARAM.sub(lambda _: quote(row[PLUG] or "", safe="/"), row[ROUTE])
+    if "{" in path:
+        return None
+    kwargs: dict = {}
+    user = row[USER]
+    if row[ROUTE] == "/auth/login":
+        # 실패했던 로그인은 틀린 비밀번호로 (bcrypt 검증 비용은 같음)
+        password = PASSWORD if row[STATUS] == 200 else PASSWORD + "-wrong"
+        kwargs["data"] = {"username": f"u{user}", "password": password}
+    elif user in tokens:
+        kwargs["headers"] = {"Authorization": f"Bearer {tokens[user]}"}
+    if row[ARG] is not None:
+        kwargs["json"] = {"action": row[ARG]}
+    return row[METHOD], path, kwargs
+
+
+async def _replay(rows: List[list], args) -> dict:
+    import httpx
+    from sqlalchemy import event as sa_event
+
+    from app.config import settings
+    from app.db import SessionLocal, engine
+    from app.main import app
+    from app.models import User
+    from app.services.auth import create_access_token, get_password_hash
+    from app.services.pyp100 import pyp100_service
+    from app.services.reconciler import reconciler
+    from benchmarks.simulated_plug import SimulatedFleet
+
+    statements = [0]
+
+    @sa_event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    roles: Dict[str, str] = {}
+    for row in rows:
+        if row[USER] is not None and (row[ROLE] == "admin" or row[USER] not in roles):
+            roles[row[USER]] = row[ROLE] or roles.get(row[USER]) or "user"
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    mismatched: Counter = Counter()
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    skipped = 0
+
+    with SimulatedFleet(settings.TAPO_EMAIL, settings.TAPO_PASSWORD, pyp100_service.plugs.values(),
+                        rtt=args.rtt_ms / 1000, energy=args.energy) as fleet:
+        async with app.router.lifespan_context(app):
+            hashed = get_password_hash(PASSWORD)
+            with SessionLocal() as db:
+                db.add_all(User(username=f"u{user}", hashed_password=hashed, role=role)
+                           for user, role in roles.items())
+                db.commit()
+            # 캡처 시작 전에 받아 둔 토큰으로 요청한 사용자 — 로그인 없이 직접 발급
+            tokens = {user: create_access_token({"sub": f"u{user}", "role": role})
+                      for user, role in roles.items()}
+
+            transport = httpx.ASGITransport(app=app)
+            limit = asyncio.Semaphore(max(1, args.parallel))
+            base = (statements[0], fleet.round_trips, fleet.requests)
+
+            async def one(row: list, request: tuple) -> None:
+                method, path, kwargs = request
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    status_code = response.status_code
+                except Exception:
+                    response, status_code = None, 0         # 앱 예외 (500 전에 전송 단계에서 올라옴)
+                finally:
+                    limit.release()
+                elapsed = (time.perf_counter() - started) * 1000
+                route = f"{row[METHOD]} {row[ROUTE]}"
+                latencies[route].append(elapsed)
+                recorded[route].append(row[MS])
+                statuses[route][status_code] += 1
+                if status_code != row[STATUS]:
+                    mismatched[route] += 1
+                if row[ROUTE] == "/auth/login" and status_code == 200:
+                    tokens[row[USER]] = response.json()["access_token"]
+
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+                loop = asyncio.get_running_loop()
+                t0, started = rows[0][TS], loop.time()
+                wall = time.perf_counter()
+                tasks = []
+                for row in rows:
+                    if args.speed > 0:
+                        delay = started + (row[TS] - t0) / 1000 / args.speed - loop.time()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    request = _request(row, tokens)
+                    if request is None:
+                        skipped += 1
+                        continue
+                    await limit.acquire()
+                    tasks.append(asyncio.create_task(one(row, request)))
+                await asyncio.gather(*tasks)
+                wall = time.perf_counter() - wall
+
+            # 응답 뒤에 Reconciler 가 장치에 반영하는 몫까지 센다
+            deadline = time.monotonic() + DRAIN_SECONDS
+            while any(reconciler.is_pending(name) for name in pyp100_service.plugs) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+
+        device_requests = fleet.requests - base[2]
+        return {
+            "requests": sum(len(v) for v in latencies.values()),
+            "skipped": skipped,
+            "wall_s": round(wall, 2),
+            "trace_s": round((rows[-1][TS] - rows[0][TS]) / 1000, 2),
+            "db_statements": statements[0] - base[0],
+            "device_round_trips": fleet.round_trips - base[1],
+            "device_requests": dict(device_requests.most_common()),
+            "routes": {
+                route: {
+                    "count": len(values),
+                    "p50_ms": round(_percentile(values, 0.5), 2),
+                    "p90_ms": round(_percentile(values, 0.9), 2),
+                    "p99_ms": round(_percentile(values, 0.99), 2),
+                    "max_ms": round(max(values), 2),
+                    "recorded_p50_ms": round(_percentile(recorded[route], 0.5), 2),
+                    "status_mismatch": mismatched[route],
+                    "statuses": dict(statuses[route]),
+                }
+                for route, values in sorted(latencies.items(), key=lambda item: -len(item[1]))
+            },
+        }
+
+
+def run(path: str, args) -> dict:
+    rows = sorted(read_trace(path), key=lambda row: row[TS])
+    if args.limit:
+        rows = rows[:args.limit]
+    if not rows:
+        raise SystemExit(f"{path}: 재생할 행이 없습니다")
+    groups = json.loads(args.groups) if args.groups else {}
+    plugs = [row[PLUG] for row in rows if row[PLUG] and row[ROUTE].startswith("/plugs/")]
+    _setup_env(tempfile.mkdtemp(prefix="replay-"), plugs, groups)
+    return asyncio.run(_replay(rows, args))
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description="요청 트레이스 재생")
+    parser.add_argument("trace", help="TRAFFIC_CAPTURE_PATH 로 기록한 파일 (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속 (1 = 원래 간격, 0 = 간격 무시)")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="시뮬레이션 플러그 왕복 지연 (ms)")
+    parser.add_argument("--parallel", type=int, default=256, help="동시에 보낼 최대 요청 수")
+    parser.add_argument("--energy", action="store_true", help="P110 처럼 에너지 측정 구성 요소를 알림")
+    parser.add_argument("--groups", help='그룹 멤버 JSON (예: \'{"3D": ["3D1", "3D2"]}\')')
+    parser.add_argument("--limit", type=int, default=0, help="앞에서부터 이 행 수만 재생")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    path = os.path.abspath(args.trace)
+    result = run(path, args)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    speed = f"{args.speed:g}배속" if args.speed > 0 else "간격 무시"
+    print(f"{os.path.basename(path)}: 요청 {result['requests']}개 (건너뜀 {result['skipped']}), "
+          f"{speed}, RTT {args.rtt_ms:g}ms — 재생 {result['wall_s']}s / 기록 {result['trace_s']}s")
+    print(f"  {'라우트':<36} {'수':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'기록 p50':>9} {'코드 불일치':>10}")
+    for route, r in result["routes"].items():
+        print(f"  {route:<36} {r['count']:>6} {r['p50_ms']:>6.1f}ms {r['p90_ms']:>6.1f}ms {r['p99_ms']:>6.1f}ms"
+              f" {r['max_ms']:>6.1f}ms {r['recorded_p50_ms']:>7.1f}ms {r['status_mismatch']:>10}")
+    calls = ", ".join(f"{method} {count}" for method, count in result["device_requests"].items()) or "-"
+    print(f"  장치 왕복 {result['device_round_trips']}회 (요청: {calls})")
+    print(f"  DB 쿼리 {result['db_statements']}회")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
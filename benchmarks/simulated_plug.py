@@ -0,0 +1,187 @@
+# benchmarks/simulated_plug.py
+"""
+네트워크 없이 plugp100 을 돌리기 위한 KLAP v2 플러그 시뮬레이터 (벤치마크 전용).
+
+KlapProtocol.session_post (KLAP 의 유일한 HTTP 호출 지점)와 PassthroughProtocol.send_request 를
+바꿔 끼워, 실제 장치처럼 handshake1/handshake2/request 를 암호화된 상태로 주고받습니다.
+호출 한 번마다 rtt 만큼 기다리고 왕복 수를 셉니다. 최신 펌웨어처럼 Passthrough 와 KLAP v1 은 거절합니다.
+energy=True 면 P110 처럼 에너지 측정/카운트다운 구성 요소를 알리고, multiple_request=False 면
+multipleRequest 를 모르는 펌웨어처럼 -40210 으로 거절합니다.
+
+    with SimulatedPlug(rtt=0.02) as plug:
+        device = await connect(cfg)
+        plug.round_trips
+
+SimulatedFleet 은 IP 마다 SimulatedPlug 를 하나씩 두고 요청 URL 의 호스트로 나눠 보냅니다 (플러그별 상태 분리).
+"""
+import asyncio
+import base64
+import json
+import secrets
+from collections import Counter
+from typing import Dict, Iterable
+from urllib.parse import urlsplit
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Failure
+from plugp100.protocol.klap import klap_handshake_v2
+from plugp100.protocol.klap.klap_protocol import KlapChiper, KlapProtocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+
+
+class _Response:
+    def __init__(self, status: int):
+        self.status = status
+
+
+class SimulatedPlug:
+    def __init__(self, email: str, password: str, rtt: float = 0.02, mac: str = "AA-BB-CC-DD-EE-01",
+                 energy: bool = False, multiple_request: bool = True):
+        self.rtt = rtt
+        self.mac = mac
+        self.energy = energy
+        self.multiple_request = multiple_request
+        self.device_on = False
+        self.round_trips = 0
+        self.requests: Counter = Counter()       # 장치 요청 method 별 수 (multipleRequest 는 하나로)
+        self._strategy = klap_handshake_v2()
+        self._auth_hash = self._strategy.generate_auth_hash(AuthCredential(email, password))
+        self._chiper = None
+        self._pending = None
+        self._saved = None
+
+    # ─── 장치 쪽 동작 ──────────────────────────────────────
+    def _device_info(self) -> dict:
+        return {
+            "device_id": "sim-0001", "hw_id": "sim", "oem_id": "sim",
+            "fw_ver": "1.2.5 Build 240411", "hw_ver": "1.0", "mac": self.mac,
+            "nickname": base64.b64encode(b"simulated").decode(), "model": "P110" if self.energy else "P100",
+            "type": "SMART.TAPOPLUG", "device_on": self.device_on,
+        }
+
+    def _handle(self, request: dict) -> dict:
+        method = request.get("method")
+        if method == "get_device_info":
+            return {"error_code": 0, "result": self._device_info()}
+        if method == "component_nego":
+            components = [{"id": "device", "ver_code": 2}, {"id": "on_off", "ver_code": 1}]
+            if self.energy:
+                components += [{"id": "energy_monitoring", "ver_code": 2}, {"id": "countdown", "ver_code": 1}]
+            return {"error_code": 0, "result": {"component_list": components}}
+        if method == "set_device_info":
+            self.device_on = bool((request.get("params") or {}).get("device_on", self.device_on))
+            return {"error_code": 0, "result": {}}
+        if method == "get_energy_usage" and self.energy:
+            return {"error_code": 0, "result": {"today_runtime": 1, "month_runtime": 1, "today_energy": 1,
+                                                "month_energy": 1, "current_power": 1000}}
+        if method == "get_current_power" and self.energy:
+            return {"error_code": 0, "result": {"current_power": 1}}
+        if method == "get_countdown_rules" and self.energy:
+            return {"error_code": 0, "result": {"enable": True, "countdown_rule_max_count": 1, "rule_list": []}}
+        if method == "multipleRequest" and self.multiple_request:
+            responses = []
+            for sub in (request.get("params") or {}).get("requests", []):
+                responses.append({"method": sub.get("method"), **self._handle(sub)})
+            return {"error_code": 0, "result": {"responses": responses}}
+        return {"error_code": -40210, "msg": f"unsupported {method}"}
+
+    async def _session_post(self, protocol: KlapProtocol, url: str, cookies=None, params=None, data=None):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        protocol._last_request_url = url
+        if url.endswith("/handshake1"):
+            if protocol._klap_strategy.__class__ is not self._strategy.__class__:
+                # 다른 리비전의 해시는 맞지 않는다
+                return _Response(200), secrets.token_bytes(16) + secrets.token_bytes(32)
+            remote_seed = secrets.token_bytes(16)
+            self._pending = (data, remote_seed)
+            server_hash = self._strategy.handshake1_seed_auth_hash(
+                local_seed=data, remote_seed=remote_seed, auth_hash=self._auth_hash
+            )
+            return _Response(200), remote_seed + server_hash
+        if url.endswith("/handshake2"):
+            if self._pending is None:
+                return _Response(403), None
+            local_seed, remote_seed = self._pending
+            self._chiper = KlapChiper(local_seed, remote_seed, self._auth_hash)
+            return _Response(200), b""
+        if url.endswith("/request"):
+            if self._chiper is None:
+                return _Response(403), None
+            seq = params["seq"]
+            self._chiper._seq = seq
+            request = json.loads(self._chiper.decrypt(data))
+            self.requests[request.get("method")] += 1
+            self._chiper._seq = seq - 1
+            payload, _ = self._chiper.encrypt(json.dumps(self._handle(request)))
+            return _Response(200), payload
+        return _Response(404), None
+
+    async def _passthrough(self, protocol, request, retry: int = 3):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        return Failure(Exception("passthrough 미지원 펌웨어"))
+
+    # ─── 패치 ──────────────────────────────────────────────
+    def __enter__(self) -> "SimulatedPlug":
+        plug = self
+
+        async def session_post(protocol, url, cookies=None, params=None, data=None):
+            return await plug._session_post(protocol, url, cookies, params, data)
+
+        async def passthrough(protocol, request, retry: int = 3):
+            return await plug._passthrough(protocol, request, retry)
+
+        self._saved = (KlapProtocol.session_post, PassthroughProtocol.send_request)
+        KlapProtocol.session_post = session_post
+        PassthroughProtocol.send_request = passthrough
+        return self
+
+    def __exit__(self, *exc) -> None:
+        KlapProtocol.session_post, PassthroughProtocol.send_request = self._saved
+
+
+class SimulatedFleet:
+    """여러 플러그 시뮬레이터 — KLAP/Passthrough 호출을 URL 의 호스트(IP)별 SimulatedPlug 로 보냅니다."""
+
+    def __init__(self, email: str, password: str, hosts: Iterable[str], rtt: float = 0.02, **kwargs):
+        self.plugs: Dict[str, SimulatedPlug] = {
+            host: SimulatedPlug(email, password, rtt=rtt, mac=f"AA-BB-CC-{i >> 16 & 255:02X}-{i >> 8 & 255:02X}-{i & 255:02X}",
+                                **kwargs)
+            for i, host in enumerate(dict.fromkeys(hosts))
+        }
+        self._saved = None
+
+    @property
+    def round_trips(self) -> int:
+        return sum(plug.round_trips for plug in self.plugs.values())
+
+    @property
+    def requests(self) -> Counter:
+        total: Counter = Counter()
+        for plug in self.plugs.values():
+            total.update(plug.requests)
+        return total
+
+    def _plug(self, url: str) -> SimulatedPlug:
+        plug = self.plugs.get(urlsplit(url).hostname)
+        if plug is None:
+            raise ConnectionError(f"simulated fleet: 없는 호스트 {url}")
+        return plug
+
+    def __enter__(self) -> "SimulatedFleet":
+        fleet = self
+
+        async def session_post(protocol, url, cookies=None, params=None, data=None):
+            return await fleet._plug(url)._session_post(protocol, url, cookies, params, data)
+
+        async def passthrough(protocol, request, retry: int = 3):
+            return await fleet._plug(protocol._url)._passthrough(protocol, request, retry)
+
+        self._saved = (KlapProtocol.session_post, PassthroughProtocol.send_request)
+        KlapProtocol.session_post = session_post
+        PassthroughProtocol.send_request = passthrough
+        return self
+
+    def __exit__(self, *exc) -> None:
+        KlapProtocol.session_post, PassthroughProtocol.send_request = self._saved
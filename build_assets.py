@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# build_assets.py - 정적 파일 빌드 (내용 해시 파일명 + 사전 압축)
+
+"""
+app/static 아래 모든 파일을 출력 디렉터리로 복사하면서
+
+  - 내용 해시가 들어간 이름으로도 저장합니다 (js/dashboard.js → js/dashboard.1a2b3c4d5e6f.js)
+  - .gz (gzip -9) 를, brotli 패키지가 있으면 .br 도 만들어 둡니다 (nginx gzip_static / brotli_static)
+  - manifest.json 에 원래 경로 → 해시 경로를 기록합니다 (템플릿의 asset_url() 이 사용)
+
+해시는 내용만으로 정해지고 gzip 헤더의 시각도 0 으로 고정하므로,
+web 이미지와 nginx 이미지에서 각각 빌드해도 같은 결과가 나옵니다.
+
+사용법: python build_assets.py [--src app/static] [--out static_build]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import brotli       # 선택 사항
+except ImportError:
+    brotli = None
+
+HASH_LENGTH = 12
+# 이미 압축된 형식은 다시 압축하지 않는다
+COMPRESSIBLE = {".css", ".js", ".html", ".svg", ".json", ".txt", ".map", ".ico"}
+MIN_COMPRESS_BYTES = 256
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(path)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f"{root}.{digest}{ext}"
+
+
+def write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def compress(path: str, data: bytes) -> list:
+    """path.gz / path.br 을 만들고, 원본보다 작아진 것만 남깁니다."""
+    written = []
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        write(path + ".gz", gz)
+        written.append(".gz")
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            write(path + ".br", br)
+            written.append(".br")
+    return written
+
+
+def build(src: str, out: str) -> dict:
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    manifest = {}
+    for root, _, files in os.walk(src):
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, src).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            fingerprinted = hashed_name(rel, data)
+            manifest[rel] = fingerprinted
+
+            # 원래 이름(짧은 캐시)과 해시 이름(immutable) 둘 다 둔다
+            for target in (rel, fingerprinted):
+                path = os.path.join(out, target)
+                write(path, data)
+                if os.path.splitext(rel)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+                    compress(path, data)
+
+    write(os.path.join(out, "manifest.json"),
+          json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="정적 파일 빌드 (해시 파일명 + gzip/brotli)")
+    parser.add_argument("--src", default="app/static", help="원본 디렉터리")
+    parser.add_argument("--out", default="static_build", help="출력 디렉터리 (STATIC_BUILD_DIR)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.src):
+        print(f"원본 디렉터리가 없습니다: {args.src}", file=sys.stderr)
+        return 1
+    manifest = build(args.src, args.out)
+    for rel, fingerprinted in sorted(manifest.items()):
+        print(f"  {rel} → {fingerprinted}")
+    print(f"정적 파일 {len(manifest)}개 빌드 완료: {args.out}"
+          + ("" if brotli else " (brotli 패키지 없음 — .br 생략)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
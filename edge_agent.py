@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# edge_agent.py - 사이트 LAN 의 엣지 에이전트
+
+"""
+중앙 서버에서 닿지 않는 LAN(다른 건물·실험실)의 플러그를 이 프로세스가 직접 연결하고,
+중앙 서버(/edge/ws)에는 WebSocket 하나로 상태를 올리고 명령을 받습니다. 동작은 app/services/edge_agent.py 참고.
+
+  # 사이트 LAN 의 .env — PLUGS 는 실제 IP, 중앙 서버의 PLUGS 에는 같은 이름이 "edge:building-b"
+  EDGE_SITE=building-b
+  EDGE_TOKEN=…                                      # 중앙 서버 EDGE_TOKENS 의 building-b 값
+  EDGE_CENTRAL_URL=wss://tapo.example.com/edge/ws
+  PLUGS=[{"name": "B동 3D프린터", "ip": "192.168.0.21"}]
+
+  python edge_agent.py
+
+사용자·세션·DB 는 중앙에만 있으며 에이전트는 DB 를 쓰지 않습니다. 상태 캐시(STATE_CACHE_PATH)와
+마지막 명령(EDGE_DESIRED_PATH)은 로컬 파일에 남아, 재시작하거나 업링크가 끊겨도 이어서 동작합니다.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.config import settings
+from app.services.edge_agent import edge_agent
+from app.services.events import event_bus
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tapo 엣지 에이전트 (사이트 LAN ↔ 중앙 서버)")
+    parser.add_argument("--log-level", default="INFO", help="로그 레벨 (기본 INFO)")
+    return parser.parse_args(argv)
+
+
+async def main_async() -> int:
+    if not settings.EDGE_SITE or not settings.EDGE_TOKEN:
+        print("EDGE_SITE 와 EDGE_TOKEN 을 설정하세요", file=sys.stderr)
+        return 1
+    if not edge_agent.plugs:
+        print("이 에이전트가 연결할 플러그가 없습니다 (PLUGS)", file=sys.stderr)
+        return 1
+
+    restored = plug_state_cache.load()
+    desired = edge_agent.load_desired()
+    logging.getLogger(__name__).info(
+        "사이트 '%s': 플러그 %d개, 저장된 상태 %d개, 목표 %d개 → %s",
+        settings.EDGE_SITE, len(edge_agent.plugs), restored, desired, settings.EDGE_CENTRAL_URL,
+    )
+    await event_bus.start()
+    try:
+        await edge_agent.run()
+    finally:
+        await event_bus.stop()
+        await pyp100_service.close()
+        plug_state_cache.save()
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        return asyncio.run(main_async())
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
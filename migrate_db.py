@@ -46,11 +46,25 @@ def export_data():
             data["plugs"] = cursor.fetchall()
         
         if "plug_sessions" in tables:
-            cursor.execute("SELECT id, plug_name, user_id, started_at FROM plug_sessions")
+            # expires_at(세션 임대)은 이전 스키마에 없을 수 있음 — 없으면 NULL (임대 없는 세션)
+            cursor.execute("PRAGMA table_info(plug_sessions)")
+            has_expires = any(col[1] == "expires_at" for col in cursor.fetchall())
+            cursor.execute("SELECT id, plug_name, user_id, started_at, "
+                           + ("expires_at" if has_expires else "NULL") + " FROM plug_sessions")
             data["plug_sessions"] = cursor.fetchall()
         
+        # 그 밖의 테이블(스케줄 등)은 컬럼 이름과 함께 통째로 보관
+        data["_extra"] = {}
+        for table in tables:
+            if table in ("users", "plugs", "plug_sessions") or table.startswith("sqlite_"):
+                continue
+            cursor.execute(f'SELECT * FROM "{table}"')
+            columns = [d[0] for d in cursor.description]
+            data["_extra"][table] = (columns, cursor.fetchall())
+        
         conn.close()
-        print(f"데이터 추출 완료: {sum(len(v) for v in data.values())} 건")
+        print(f"데이터 추출 완료: {sum(len(v) for k, v in data.items() if k != '_extra')} 건 "
+              f"(+ 기타 테이블 {len(data['_extra'])}개)")
         return data
     except Exception as e:
         print(f"데이터 추출 실패: {str(e)}")
@@ -93,10 +107,25 @@ def import_data(data):
         if "plug_sessions" in data and data["plug_sessions"]:
             for session in data["plug_sessions"]:
                 conn.execute(
-                    text("INSERT INTO plug_sessions (id, plug_name, user_id, started_at) VALUES (:id, :plug_name, :user_id, :started_at)"),
-                    {"id": session[0], "plug_name": session[1], "user_id": session[2], "started_at": session[3]}
+                    text("INSERT INTO plug_sessions (id, plug_name, user_id, started_at, expires_at) "
+                         "VALUES (:id, :plug_name, :user_id, :started_at, :expires_at)"),
+                    {"id": session[0], "plug_name": session[1], "user_id": session[2], "started_at": session[3],
+                     "expires_at": session[4]}
                 )
         
+        # 기타 테이블: 새 스키마에도 있는 컬럼만 복사
+        for table, (columns, rows) in data.get("_extra", {}).items():
+            if table not in Base.metadata.tables or not rows:
+                continue
+            keep = [c for c in columns if c in Base.metadata.tables[table].c]
+            stmt = text(
+                f'INSERT INTO "{table}" ({", ".join(keep)}) '
+                f'VALUES ({", ".join(":" + c for c in keep)})'
+            )
+            for row in rows:
+                values = dict(zip(columns, row))
+                conn.execute(stmt, {c: values[c] for c in keep})
+        
         conn.commit()
         conn.close()
         print("데이터 재삽입 완료!")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# tapoctl.py - 운영자용 플러그 일괄 제어 CLI
+
+"""
+API 를 거치지 않고 서비스 계층(Pyp100Service, 세션/Reconciler, DB)을 직접 호출합니다.
+로그인이나 토큰 없이 한 프로세스에서 여러 플러그를 동시에(--parallel) 처리하고,
+결과는 끝나는 순서대로 한 줄에 하나씩 JSON 으로 출력합니다 (jq 등으로 바로 처리).
+
+  python tapoctl.py status '*'                       # 전체 상태 조회
+  python tapoctl.py on '3D*' --user alice            # alice 명의로 세션 추가 (첫 사용자면 ON)
+  python tapoctl.py off '3D*' --user alice           # 세션 해제 (마지막 사용자면 OFF)
+  python tapoctl.py clear '책상/*'                   # 모든 세션 초기화 + OFF
+  python tapoctl.py sessions                         # 세션 목록 (장치 통신 없음)
+
+이름 패턴은 셸 glob (fnmatch) 이며 여러 개를 줄 수 있습니다. on/off/clear 는 /on·/off 와 같은
+참조 카운트 경로로 목표 상태를 저널에 기록만 하고, 장치 명령은 서버의 Reconciler 가 다음 저널 동기화
+(RECONCILE_INTERVAL_SECONDS) 때 보냅니다 — 두 프로세스가 같은 플러그에 명령을 보내지 않도록.
+서버가 꺼져 있을 때만 --apply 로 이 프로세스에서 바로 장치에 반영하세요.
+세션 임대(lease)는 서버가 메모리에 들고 있으므로, 여기서 해제한 임대 세션은 서버가 만료 시각에
+DB 를 다시 확인해 정리합니다. 요약은 stderr 로 나가며, 실패가 하나라도 있으면 종료 코드 1 입니다.
+서버와 같은 .env / DB 를 쓰도록 서버와 같은 디렉터리(컨테이너)에서 실행하세요.
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from app.db import SessionLocal, init_db
+from app.exceptions import PlugNotInUseException
+from app.models import PlugSession, User
+from app.services import sessions
+from app.services.pyp100 import pyp100_service
+from app.services.reconciler import reconciler
+
+DEFAULT_PARALLEL = 32
+
+
+def match_plugs(patterns: List[str]) -> List[str]:
+    """등록된 플러그 중 패턴에 맞는 이름 (설정 순서 유지)."""
+    return [
+        name for name in pyp100_service.plugs
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+
+
+def emit(record: dict) -> None:
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    sys.stdout.flush()
+
+
+async def run_all(names: List[str], parallel: int,
+                  op: Callable[[str], Awaitable[dict]]) -> int:
+    """플러그마다 op 를 최대 parallel 개씩 동시에 실행하고, 끝나는 대로 출력합니다. 실패 수를 돌려줍니다."""
+    limit = asyncio.Semaphore(max(1, parallel))
+
+    async def run(name: str) -> dict:
+        async with limit:
+            started = time.perf_counter()
+            try:
+                record = {"plug": name, "ok": True, **await op(name)}
+            except Exception as e:
+                record = {"plug": name, "ok": False, "error": str(getattr(e, "detail", e))}
+            record["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return record
+
+    failed = 0
+    for future in asyncio.as_completed([run(name) for name in names]):
+        record = await future
+        failed += not record["ok"]
+        emit(record)
+    return failed
+
+
+def users_of(names: List[str]) -> dict:
+    with SessionLocal() as db:
+        counts = sessions.count_active_many(db, names)
+        users = sessions.list_users_many(db, names)
+    return {name: (counts.get(name, 0), users.get(name, [])) for name in names}
+
+
+# ─── 명령 ──────────────────────────────────────────────────
+
+async def cmd_status(args, names: List[str]) -> int:
+    current = users_of(names)
+
+    async def op(name: str) -> dict:
+        active, users = current[name]
+        return {"status": await pyp100_service.get_status(name),
+                "active_users": active, "users": users}
+
+    return await run_all(names, args.parallel, op)
+
+
+async def _switch(args, names: List[str], on: bool) -> int:
+    with SessionLocal() as db:
+        user = db.query(User).filter_by(username=args.user).first()
+    if user is None:
+        print(f"사용자 '{args.user}' 가 없습니다.", file=sys.stderr)
+        return len(names)
+
+    async def op(name: str) -> dict:
+        with SessionLocal() as db:
+            try:
+                result = (await sessions.acquire(db, name, user.id) if on
+                          else await sessions.release(db, name, user.id))
+            except PlugNotInUseException:
+                db.rollback()
+                return {"skipped": f"'{args.user}' 의 세션 없음"}
+        return await _applied(args, name, result.active_users, result.users)
+
+    return await run_all(names, args.parallel, op)
+
+
+async def _applied(args, name: str, active: int, users: Optional[List[str]]) -> dict:
+    """결과 레코드를 만듭니다 (--apply 면 목표를 이 프로세스에서 바로 장치에 반영)."""
+    record = {"desired": reconciler.desired(name), "active_users": active, "users": users or []}
+    if args.apply:
+        if not await reconciler.apply_now(name):
+            raise RuntimeError(reconciler.last_error(name) or "반영 실패")
+        record["status"] = record["desired"]
+    record["pending"] = reconciler.is_pending(name)
+    return record
+
+
+async def cmd_on(args, names: List[str]) -> int:
+    return await _switch(args, names, True)
+
+
+async def cmd_off(args, names: List[str]) -> int:
+    return await _switch(args, names, False)
+
+
+async def cmd_clear(args, names: List[str]) -> int:
+    async def op(name: str) -> dict:
+        with SessionLocal() as db:
+            removed = await sessions.clear(db, name)
+        return {"removed": removed, **await _applied(args, name, 0, [])}
+
+    return await run_all(names, args.parallel, op)
+
+
+async def cmd_sessions(args, names: List[str]) -> int:
+    """세션 목록 — DB 한 번 조회, 장치 통신 없음."""
+    with SessionLocal() as db:
+        rows = (
+            db.query(PlugSession.plug_name, User.username, PlugSession.started_at, PlugSession.expires_at)
+            .join(User, PlugSession.user_id == User.id)
+            .filter(PlugSession.plug_name.in_(names))
+            .order_by(PlugSession.plug_name, PlugSession.started_at)
+            .all()
+        )
+    now = datetime.utcnow()
+    for name, username, started_at, expires_at in rows:
+        emit({
+            "plug": name, "user": username, "started_at": started_at, "expires_at": expires_at,
+            "held_seconds": round((now - started_at).total_seconds()) if started_at else None,
+        })
+    return 0
+
+
+COMMANDS = {
+    "status": (cmd_status, "상태 조회 (장치에 동시 요청)"),
+    "on": (cmd_on, "세션 추가 — 첫 사용자면 ON"),
+    "off": (cmd_off, "세션 해제 — 마지막 사용자면 OFF"),
+    "clear": (cmd_clear, "모든 세션 초기화 + OFF"),
+    "sessions": (cmd_sessions, "세션 목록 (장치 통신 없음)"),
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="tapoctl", description="플러그 일괄 제어 (JSON lines 출력)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        p = sub.add_parser(name, help=help_text)
+        # sessions 는 패턴을 생략하면 전체
+        p.add_argument("patterns", nargs="*" if name in ("status", "sessions") else "+",
+                       help="플러그 이름 glob (예: '3D*', '책상/*')")
+        p.add_argument("-j", "--parallel", type=int, default=DEFAULT_PARALLEL,
+                       help=f"동시에 처리할 플러그 수 (기본 {DEFAULT_PARALLEL})")
+        if name in ("on", "off"):
+            p.add_argument("-u", "--user", required=True, help="세션 명의 사용자 (users 테이블)")
+        if name in ("on", "off", "clear"):
+            p.add_argument("--apply", action="store_true",
+                           help="서버가 꺼져 있을 때만: 저널 기록 후 이 프로세스에서 바로 장치에 반영 "
+                                "(기본은 저널만 기록하고 서버의 Reconciler 가 반영)")
+    return parser.parse_args(argv)
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    names = match_plugs(args.patterns or ["*"])
+    if not names:
+        print(f"패턴에 맞는 플러그가 없습니다: {' '.join(args.patterns)}", file=sys.stderr)
+        return 1
+
+    init_db()
+    if args.command != "sessions":
+        reconciler.sync()           # 다른 프로세스(서버)가 남긴 반영 대기 목표까지 읽어 둔다
+    handler = COMMANDS[args.command][0]
+    started = time.perf_counter()
+    try:
+        failed = await handler(args, names)
+    finally:
+        await pyp100_service.close()
+    print(f"{args.command}: 플러그 {len(names)}개, 실패 {failed}개 ({time.perf_counter() - started:.1f}s)",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # stdout 은 JSON lines 전용 — 로그는 stderr 로, 경고 이상만
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
+                        format="%(levelname)s %(name)s: %(message)s")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
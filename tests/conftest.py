@@ -0,0 +1,70 @@
+# tests/conftest.py
+"""
+테스트 공통 설정.
+
+app 모듈은 import 될 때 설정(Settings)과 SQLite 경로(./users.db)를 정하므로, 테스트 모듈보다 먼저 읽히는
+이곳에서 환경 변수를 정하고 작업 디렉터리를 임시 디렉터리로 옮깁니다 (.env·운영 DB 를 건드리지 않음).
+테스트는 아래 플러그 구성을 전제로 하므로 셸에 설정된 값보다 우선합니다.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+os.chdir(tempfile.mkdtemp(prefix="tapo-tests-"))
+
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "TAPO_EMAIL": "tester@example.com",
+    "TAPO_PASSWORD": "test",
+    "PLUGS": json.dumps({"p1": "10.0.0.1", "p2": "10.0.0.2", "r1": "edge:lab"}),
+    "EDGE_TOKENS": json.dumps({"lab": "lab-token"}),
+    "PLUG_GROUPS": json.dumps({"bench": ["p1", "p2"]}),
+    "LOG_DIR": "",
+    "PREWARM_ENABLED": "false",
+    "DISCOVERY_ENABLED": "false",
+    "DEVICE_BATCH_ENABLED": "false",
+})
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app.db import init_db
+
+    init_db()
+
+
+@pytest.fixture
+def user():
+    """이름으로 사용자를 만들고(이미 있으면 그대로) id 를 돌려줍니다."""
+    from app.db import SessionLocal
+    from app.models import User
+    from app.services.auth import get_password_hash
+
+    def make(username: str, role: str = "user") -> int:
+        with SessionLocal() as db:
+            row = db.query(User).filter_by(username=username).first()
+            if row is None:
+                row = User(username=username, hashed_password=get_password_hash("pw"), role=role)
+                db.add(row)
+                db.commit()
+            return row.id
+
+    return make
+
+
+@pytest.fixture
+def eventually():
+    """조건이 참이 될 때까지 이벤트 루프를 돌리며 기다립니다 (백그라운드 태스크 결과 확인용)."""
+
+    async def wait(predicate, timeout: float = 3.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                raise AssertionError("조건이 제한 시간 안에 충족되지 않았습니다")
+            await asyncio.sleep(0.01)
+
+    return wait
@@ -0,0 +1,144 @@
+# tests/test_auth_refresh.py
+"""access 토큰 만료 → refresh → 재시도 흐름 (서버 라우트와 대시보드의 js/auth.js)."""
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import auth
+from app.routers.auth import get_current_user
+from app.services.auth import create_access_token
+
+AUTH_JS = os.path.join(os.path.dirname(__file__), os.pardir, "app", "static", "js", "auth.js")
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+
+    @app.get("/whoami")
+    def whoami(username: str = Depends(get_current_user)):
+        return {"username": username}
+
+    with TestClient(app) as c:
+        yield c
+
+
+def login(client, username: str) -> dict:
+    response = client.post("/auth/login", data={"username": username, "password": "pw"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_refresh_then_retry_with_new_token(client, user):
+    user("refresher")
+    tokens = login(client, "refresher")
+    expired = create_access_token({"sub": "refresher"}, expires_delta=timedelta(seconds=-1))
+    assert client.get("/whoami", headers=bearer(expired)).status_code == 401
+
+    refreshed = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+    new = refreshed.json()
+    assert new["refresh_token"] != tokens["refresh_token"]
+
+    retried = client.get("/whoami", headers=bearer(new["access_token"]))
+    assert retried.status_code == 200
+    assert retried.json() == {"username": "refresher"}
+
+
+def test_reused_refresh_token_revokes_family(client, user):
+    user("reuser")
+    tokens = login(client, "reuser")
+    rotated = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    assert client.get("/whoami", headers=bearer(rotated["access_token"])).status_code == 200
+
+    # 이미 회전한 refresh 토큰이 다시 오면 거절하고, 그 계열의 토큰을 모두 폐기한다
+    reused = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert reused.status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
+    assert client.get("/whoami", headers=bearer(rotated["access_token"])).status_code == 401
+    assert client.get("/whoami", headers=bearer(tokens["access_token"])).status_code == 401
+
+    # 다른 로그인(계열)은 영향 없음
+    other = login(client, "reuser")
+    assert client.get("/whoami", headers=bearer(other["access_token"])).status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": other["refresh_token"]}).status_code == 200
+
+
+def test_concurrent_refreshes_only_one_wins(client, user):
+    user("racer")
+    tokens = login(client, "racer")
+    body = {"refresh_token": tokens["refresh_token"]}
+    with ThreadPoolExecutor(8) as pool:
+        statuses = sorted(r.status_code for r in pool.map(lambda _: client.post("/auth/refresh", json=body), range(8)))
+    assert statuses[0] == 200 and statuses.count(200) == 1
+    assert set(statuses[1:]) == {401}
+
+
+# 대시보드의 fetch 래퍼를 node 에서 실행: 가짜 서버는 "old" 토큰에 401, "new" 토큰에 200 을 돌려준다
+AUTH_JS_SCENARIO = r"""
+const fs = require('fs');
+const vm = require('vm');
+const storage = new Map([['access_token', 'old'], ['refresh_token', 'r1']]);
+const seen = [];
+const sandbox = {
+  Headers,
+  document: { cookie: '' },
+  localStorage: {
+    getItem: key => (storage.has(key) ? storage.get(key) : null),
+    setItem: (key, value) => storage.set(key, String(value)),
+    removeItem: key => storage.delete(key),
+  },
+  fetch: async (url, options = {}) => {
+    const auth = new Headers(options.headers || {}).get('Authorization');
+    seen.push(auth);
+    return { status: auth === 'Bearer new' || auth === 'Bearer explicit' ? 200 : 401 };
+  },
+};
+sandbox.window = sandbox;
+vm.createContext(sandbox);
+vm.runInContext(fs.readFileSync(process.argv[1], 'utf8'), sandbox);
+
+(async () => {
+  const auth = sandbox.TapoAuth;
+  auth.install();
+  const cookieBefore = sandbox.document.cookie;
+  const first = await sandbox.fetch('/plugs/changes');
+  auth.store('new', 'r2');                        // dashboard.js refreshToken() 이 하는 일
+  const retry = await sandbox.fetch('/plugs/changes');
+  const explicit = await sandbox.fetch('/auth/logout', { headers: { Authorization: 'Bearer explicit' } });
+  auth.clear();
+  console.log(JSON.stringify({
+    statuses: [first.status, retry.status, explicit.status],
+    seen,
+    cookieBefore,
+    cookieAfter: sandbox.document.cookie,
+    cleared: [...storage.keys()],
+  }));
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node 가 없어 대시보드 스크립트를 실행할 수 없음")
+def test_dashboard_fetch_uses_refreshed_token():
+    result = subprocess.run(
+        ["node", "-e", AUTH_JS_SCENARIO, os.path.abspath(AUTH_JS)],
+        capture_output=True, text=True, timeout=30, check=True,
+    )
+    outcome = json.loads(result.stdout)
+    assert outcome["statuses"] == [401, 200, 200]
+    assert outcome["seen"] == ["Bearer old", "Bearer new", "Bearer explicit"]
+    assert outcome["cookieBefore"].startswith("access_token=old;")
+    assert outcome["cookieAfter"].startswith("access_token=new;")      # ui.py 가 읽는 쿠키도 갱신
+    assert outcome["cleared"] == []
@@ -0,0 +1,98 @@
+# tests/test_discovery.py
+"""LAN 발견을 127.0.0.1 의 UDP 응답기(가짜 Tapo 플러그)로 확인합니다."""
+import asyncio
+import json
+
+from plugp100.discovery.rsa_session import _build_packet_for_payload_json
+
+from app.config import settings
+from app.services.discovery import PlugDiscovery, discover
+
+DEVICES = {"AA-BB-CC-00-00-01": "127.0.0.11", "AA-BB-CC-00-00-02": "127.0.0.12"}
+
+
+class Responder(asyncio.DatagramProtocol):
+    """발견 패킷마다 등록된 장치 수만큼 응답합니다 (실제 플러그처럼 암호화 없는 result)."""
+
+    def __init__(self, devices=DEVICES):
+        self.devices = devices
+        self.requests = 0
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.requests += 1
+        for mac, ip in self.devices.items():
+            payload = {"error_code": 0, "result": {
+                "device_type": "SMART.TAPOPLUG", "device_model": "P100", "device_id": mac, "ip": ip, "mac": mac,
+            }}
+            self.transport.sendto(_build_packet_for_payload_json(payload, b'"\x01'), addr)
+
+
+async def start_responder():
+    transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        Responder, local_addr=("127.0.0.1", 0)
+    )
+    return transport, protocol, transport.get_extra_info("sockname")[1]
+
+
+def test_discover_collects_responses():
+    async def main():
+        transport, responder, port = await start_responder()
+        try:
+            found = await discover(timeout=1.5, broadcast="127.0.0.1", port=port)
+        finally:
+            transport.close()
+        return found, responder.requests
+
+    found, requests = asyncio.run(main())
+    assert {mac: device.ip for mac, device in found.items()} == DEVICES
+    assert requests == 3            # 찾는 장치를 지정하지 않으면 제한 시간 동안 세 번 보냄
+
+
+def test_discover_stops_when_wanted_found():
+    async def main():
+        transport, responder, port = await start_responder()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            found = await discover(timeout=3.0, broadcast="127.0.0.1", port=port, wanted={"AA-BB-CC-00-00-02"})
+        finally:
+            transport.close()
+        return found, responder.requests, loop.time() - started
+
+    found, requests, elapsed = asyncio.run(main())
+    assert "AA-BB-CC-00-00-02" in found
+    assert requests == 1
+    assert elapsed < 1.0
+
+
+def test_resolve_updates_persistent_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "discovery_cache.json")
+    monkeypatch.setattr(settings, "DISCOVERY_BROADCAST", "127.0.0.1")
+    monkeypatch.setattr(settings, "DISCOVERY_TIMEOUT_SECONDS", 1.5)
+    monkeypatch.setattr(settings, "DISCOVERY_MIN_INTERVAL_SECONDS", 0.0)
+
+    async def main():
+        transport, _, port = await start_responder()
+        monkeypatch.setattr(settings, "DISCOVERY_PORT", port)
+        cache = PlugDiscovery(path)
+        cache.remember("p1", "aa:bb:cc:00:00:01", "10.0.0.1")      # DHCP 로 바뀌기 전 주소
+        cache.pin("p2", "AABBCC000002")
+        try:
+            return cache, await cache.resolve("p1"), await cache.resolve("p2")
+        finally:
+            transport.close()
+
+    cache, p1, p2 = asyncio.run(main())
+    assert (p1, p2) == ("127.0.0.11", "127.0.0.12")
+    assert cache.mac_of("p1") == "AA-BB-CC-00-00-01"
+
+    # 재시작 후에도 파일에서 바뀐 주소를 그대로 읽는다
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["plugs"] == {"p1": "AA-BB-CC-00-00-01", "p2": "AA-BB-CC-00-00-02"}
+    reloaded = PlugDiscovery(path)
+    assert reloaded.ip_of("p1") == "127.0.0.11"
+    assert reloaded.ip_of("p2") == "127.0.0.12"
+    assert reloaded.ip_of("unknown") is None
@@ -0,0 +1,168 @@
+# tests/test_edge.py
+"""
+엣지 허브(/edge/ws)와 엣지 에이전트를 한 프로세스 안에서 확인합니다.
+실제 사이트 여러 개·시뮬레이션 플러그로 돌리는 점검은 benchmarks/edge_sites.py (수동 실행).
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.routers import edge
+from app.services.edge_agent import EdgeAgent
+from app.services.edge_hub import CLOSE_UNAUTHORIZED, EdgeUnavailableError, edge_hub
+from app.services.events import event_bus
+from app.services.pyp100 import pyp100_service
+from app.services.state_cache import plug_state_cache
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(edge.router)
+    with TestClient(app) as c:
+        yield c
+
+
+def hello(**overrides) -> dict:
+    return {"type": "hello", "site": "lab", "token": "lab-token", "plugs": ["r1"], "states": {}, **overrides}
+
+
+# ─── 허브 (중앙) ───────────────────────────────────────────
+
+def test_hub_rejects_unknown_token(client):
+    with client.websocket_connect("/edge/ws") as ws:
+        ws.send_json(hello(token="wrong"))
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == CLOSE_UNAUTHORIZED
+    assert not edge_hub.connected("lab")
+
+
+def test_hub_applies_states_and_routes_calls(client):
+    with client.websocket_connect("/edge/ws") as ws:
+        # 중앙 설정에서 이 사이트에 속하지 않은 플러그(x)의 상태는 무시한다
+        ws.send_json(hello(plugs=["r1", "x"], states={"r1": [True, 1000.0], "x": [True, 1000.0]}))
+        assert ws.receive_json() == {"type": "welcome", "plugs": ["r1"]}
+        ws.send_json({"type": "state", "plug": "r1", "status": False, "ts": 2000.0})
+        client.portal.call(asyncio.sleep, 0.05)
+        assert plug_state_cache.get("r1") == (False, 2000.0)
+        assert plug_state_cache.get("x") is None
+        assert edge_hub.connected("lab")
+
+        # edge: 플러그의 장치 명령은 에이전트로 가고, 결과가 상태 캐시에 남는다
+        with ThreadPoolExecutor(1) as pool:
+            result = pool.submit(client.portal.call, pyp100_service.turn_on, "r1")
+            call = ws.receive_json()
+            assert (call["type"], call["op"], call["plug"]) == ("call", "on", "r1")
+            ws.send_json({"type": "result", "id": call["id"], "ok": True, "status": True})
+            assert result.result(timeout=5) is True
+        assert plug_state_cache.status("r1") is True
+
+    client.portal.call(asyncio.sleep, 0.05)
+    assert not edge_hub.connected("lab")
+    with pytest.raises(EdgeUnavailableError):
+        client.portal.call(edge_hub.call, "lab", "status", "r1")
+
+
+# ─── 에이전트 (사이트 LAN) ─────────────────────────────────
+
+class FakeLink:
+    """중앙 대신 메시지를 주고받는 업링크. None 을 넣으면 연결이 끊긴다."""
+
+    def __init__(self, inbox: asyncio.Queue, sent: list):
+        self.inbox, self.sent = inbox, sent
+
+    async def __aenter__(self) -> "FakeLink":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def send(self, message: dict) -> None:
+        self.sent.append(message)
+
+    async def messages(self):
+        while True:
+            message = await self.inbox.get()
+            if message is None:
+                return
+            yield message
+
+
+@pytest.fixture
+def devices(monkeypatch, tmp_path) -> dict:
+    monkeypatch.setattr(settings, "EDGE_SITE", "lab")
+    monkeypatch.setattr(settings, "EDGE_TOKEN", "lab-token")
+    monkeypatch.setattr(settings, "EDGE_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "EDGE_RECONNECT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "EDGE_DESIRED_PATH", str(tmp_path / "edge_desired.json"))
+
+    state = {"p1": False, "p2": False}
+
+    async def switch(name: str, on: bool) -> bool:
+        state[name] = on
+        plug_state_cache.update(name, on)
+        return on
+
+    async def get_status(name: str) -> bool:
+        plug_state_cache.update(name, state[name])
+        return state[name]
+
+    monkeypatch.setattr(pyp100_service, "turn_on", lambda name: switch(name, True))
+    monkeypatch.setattr(pyp100_service, "turn_off", lambda name: switch(name, False))
+    monkeypatch.setattr(pyp100_service, "get_status", get_status)
+    return state
+
+
+def test_agent_runs_commands_and_survives_uplink_outage(devices, eventually):
+    async def main():
+        inbox, sent = asyncio.Queue(), []
+        links = [FakeLink(inbox, sent)]
+
+        def link_factory():
+            if not links:
+                raise ConnectionError("uplink down")
+            return links.pop()
+
+        agent = EdgeAgent(link_factory)
+        await event_bus.start()
+        task = asyncio.create_task(agent.run())
+        try:
+            await eventually(lambda: sent)
+            assert sent[0]["type"] == "hello" and sent[0]["site"] == "lab"
+            assert sent[0]["plugs"] == ["p1", "p2"]         # edge: 플러그(r1)는 이 에이전트의 것이 아님
+
+            await inbox.put({"type": "welcome", "plugs": ["p1", "p2"]})
+            await inbox.put({"type": "call", "id": 7, "op": "on", "plug": "p1"})
+            await inbox.put({"type": "call", "id": 8, "op": "on", "plug": "zz"})
+            await eventually(lambda: len([m for m in sent if m["type"] == "result"]) == 2)
+            results = {m["id"]: m for m in sent if m["type"] == "result"}
+            assert results[7] == {"type": "result", "id": 7, "ok": True, "status": True}
+            assert results[8]["ok"] is False
+            await eventually(lambda: any(m["type"] == "state" and m["plug"] == "p1" and m["status"] for m in sent))
+            with open(settings.EDGE_DESIRED_PATH, encoding="utf-8") as f:
+                assert json.load(f) == {"p1": True}
+
+            # 업링크가 끊긴 동안 정전으로 꺼진 플러그는 마지막 목표(ON)로 되돌린다
+            await inbox.put(None)
+            await eventually(lambda: not agent.connected)
+            devices["p1"] = False
+            await eventually(lambda: devices["p1"] is True and agent.corrections >= 1)
+
+            # 재연결하면 hello 에 최신 상태가 실려 간다
+            sent.clear()
+            links.append(FakeLink(asyncio.Queue(), sent))
+            await eventually(lambda: sent)
+            assert sent[0]["type"] == "hello" and sent[0]["states"]["p1"][0] is True
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await event_bus.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+# tests/test_groups.py
+"""그룹 명령과 멤버별 반영 상태 (Reconciler 의 pending·last_error)."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.exceptions import TapoConnectionException
+from app.routers import auth, groups
+from app.services.pyp100 import pyp100_service
+from app.services.reconciler import reconciler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(groups.router)
+    with TestClient(app) as c:
+        yield c
+
+
+def test_group_members_report_reconciler_state(client, user, monkeypatch):
+    user("grouper")
+    token = client.post("/auth/login", data={"username": "grouper", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/groups/bench", json={"action": "on"}, headers=headers)
+    assert response.status_code == 200, response.text
+    members = {m["name"]: m for m in response.json()["members"]}
+    assert members["p1"]["active_users"] == 1
+    assert members["p1"]["pending"] and members["p2"]["pending"]    # 목표만 기록하고 바로 응답
+    assert members["p1"]["error"] is None
+
+    async def turn_on(name: str) -> bool:
+        if name == "p2":
+            raise TapoConnectionException(name, "timeout")
+        return True
+
+    monkeypatch.setattr(pyp100_service, "turn_on", turn_on)
+
+    async def apply():
+        return await asyncio.gather(reconciler.apply_now("p1"), reconciler.apply_now("p2"))
+
+    assert asyncio.run(apply()) == [True, False]
+
+    members = {m["name"]: m for m in client.get("/groups/bench", headers=headers).json()["members"]}
+    assert members["p1"]["pending"] is False and members["p1"]["error"] is None
+    assert members["p2"]["pending"] is True and "timeout" in members["p2"]["error"]
+
+    client.post("/groups/bench", json={"action": "off"}, headers=headers)
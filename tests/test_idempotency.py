@@ -0,0 +1,106 @@
+# tests/test_idempotency.py
+"""Idempotency-Key: 재시도 재생, 다른 요청에 같은 키, 실행 중 중복, 만료."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pytest
+from fastapi import Body, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.idempotency import IdempotencyMiddleware
+from app.services.auth import create_access_token
+from app.services.idempotency import IdempotencyStore, StoredResponse, fingerprint, idempotency_store
+
+HEADERS = {"Authorization": f"Bearer {create_access_token({'sub': 'idem'})}"}
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(calls):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware)
+
+    @app.post("/plugs/{name}/on")
+    async def plug_on(name: str, lease: Optional[int] = None, body: Optional[dict] = Body(None)):
+        calls.append((name, lease, body))
+        await asyncio.sleep(0.2)                # 재시도가 실행 중에 도착할 여유
+        return {"name": name, "run": len(calls)}
+
+    with TestClient(app) as c:
+        yield c
+
+
+def post(client, key: str, path: str = "/plugs/p1/on", **kwargs):
+    return client.post(path, headers={**HEADERS, "Idempotency-Key": key}, **kwargs)
+
+
+def test_same_key_replays_first_response(client, calls):
+    first = post(client, "replay-1", json={"source": "dashboard"})
+    retry = post(client, "replay-1", json={"source": "dashboard"})
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json() == {"name": "p1", "run": 1}
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+    # 키가 다르면 새 명령
+    assert post(client, "replay-2").json()["run"] == 2
+
+
+def test_same_key_for_different_request_is_rejected(client, calls):
+    assert post(client, "mismatch", json={"source": "a"}).status_code == 200
+    assert post(client, "mismatch", json={"source": "b"}).status_code == 422
+    assert post(client, "mismatch", path="/plugs/p2/on", json={"source": "a"}).status_code == 422
+    assert post(client, "mismatch", path="/plugs/p1/on?lease=60", json={"source": "a"}).status_code == 422
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicate_waits_for_first_run(client, calls):
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda _: post(client, "concurrent"), range(4)))
+
+    assert len(calls) == 1
+    assert {r.json()["run"] for r in responses} == {1}
+    assert sorted(r.headers.get("idempotent-replayed", "") for r in responses) == ["", "true", "true", "true"]
+
+
+def test_other_worker_waits_on_db_claim():
+    """다른 워커(저장소 인스턴스)는 메모리 future 가 없으므로 DB 의 실행 중 행을 폴링해 결과를 받는다."""
+    executed = []
+
+    async def execute() -> StoredResponse:
+        executed.append(1)
+        await asyncio.sleep(0.2)
+        return StoredResponse("", 200, [("content-type", "application/json")], b'{"ok":true}', 0.0)
+
+    async def main():
+        fp = fingerprint("POST", "/plugs/p1/on", b"", b"")
+        first, second = IdempotencyStore(), IdempotencyStore()
+        running = asyncio.ensure_future(first.run("other-worker", fp, execute))
+        await asyncio.sleep(0.05)               # 첫 워커가 선점한 뒤
+        return await asyncio.gather(running, second.run("other-worker", fp, execute))
+
+    (response, replayed), (waited, waited_replayed) = asyncio.run(main())
+    assert executed == [1]
+    assert (replayed, waited_replayed) == (False, True)
+    assert waited.body == response.body == b'{"ok":true}'
+
+
+def test_expired_key_runs_again(client, calls, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_TTL_SECONDS", 1)
+    assert post(client, "expiry").json()["run"] == 1
+    assert post(client, "expiry").headers["idempotent-replayed"] == "true"
+
+    time.sleep(1.1)
+    again = post(client, "expiry")
+    assert again.json()["run"] == 2
+    assert "idempotent-replayed" not in again.headers
+    assert idempotency_store.stats()["inflight"] == 0
@@ -0,0 +1,130 @@
+# tests/test_leases.py
+"""세션 임대(lease): 만료 시 해제, heartbeat 연장, 재시작 시 DB 에서 복원, 해제 실패 재시도."""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import SessionLocal
+from app.models import PlugSession
+from app.services import leases, sessions
+from app.services.deadlines import to_timestamp
+from app.services.leases import LeaseManager, lease_manager
+from app.services.reconciler import reconciler
+
+
+def session_row(name: str, user_id: int):
+    with SessionLocal() as db:
+        return db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
+
+
+@pytest.fixture
+def cleanup():
+    """테스트가 남긴 세션을 지워 다른 테스트(시작 시 DB 를 읽는 LeaseManager)에 영향이 없게 한다."""
+    made = []
+    yield made
+    with SessionLocal() as db:
+        for name, user_id in made:
+            db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).delete()
+        db.commit()
+    for name, user_id in made:
+        lease_manager.revoke(name, user_id)
+
+
+def test_expired_lease_releases_session(user, cleanup, eventually):
+    uid = user("lease-expiry")
+    cleanup.append(("p1", uid))
+
+    async def main():
+        await lease_manager.start()
+        try:
+            with SessionLocal() as db:
+                status = await sessions.acquire(db, "p1", uid, lease_seconds=0.3)
+            assert status.lease_expires_at is not None
+            assert reconciler.desired("p1") is True
+            await eventually(lambda: session_row("p1", uid) is None)
+        finally:
+            await lease_manager.stop()
+
+    asyncio.run(main())
+    assert lease_manager.expires_at("p1", uid) is None
+    assert reconciler.desired("p1") is False            # 마지막 사용자였으므로 목표 OFF
+
+
+def test_heartbeat_extends_lease(user, cleanup):
+    uid = user("lease-heartbeat")
+    cleanup.append(("p2", uid))
+
+    async def main():
+        await lease_manager.start()
+        try:
+            with SessionLocal() as db:
+                await sessions.acquire(db, "p2", uid, lease_seconds=0.3)
+            before = lease_manager.expires_at("p2", uid)
+            assert lease_manager.heartbeat(uid, 60) == 1
+            assert lease_manager.expires_at("p2", uid) > before + timedelta(seconds=50)
+            await asyncio.sleep(0.6)                    # 원래 기한이 지나도 해제되지 않음
+            assert session_row("p2", uid) is not None
+        finally:
+            await lease_manager.stop()                  # 남은 heartbeat 를 DB 에 flush
+
+    asyncio.run(main())
+    expires_at = session_row("p2", uid).expires_at
+    assert to_timestamp(expires_at) > time.time() + 50
+
+
+def test_leases_rebuilt_from_db_on_restart(user, cleanup, eventually):
+    uid = user("lease-restart")
+    cleanup.extend([("p1", uid), ("p2", uid)])
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        # 서버가 꺼져 있던 동안 만료된 임대와 아직 남은 임대
+        db.add(PlugSession(plug_name="p1", user_id=uid, expires_at=now - timedelta(seconds=5)))
+        db.add(PlugSession(plug_name="p2", user_id=uid, expires_at=now + timedelta(seconds=60)))
+        db.commit()
+
+    restarted = LeaseManager()
+
+    async def main():
+        await restarted.start()
+        try:
+            assert restarted.active == 2
+            assert abs((restarted.expires_at("p2", uid) - (now + timedelta(seconds=60))).total_seconds()) < 0.01
+            await eventually(lambda: session_row("p1", uid) is None)
+            assert restarted.active == 1
+        finally:
+            await restarted.stop()
+
+    asyncio.run(main())
+    assert session_row("p2", uid) is not None
+
+
+def test_failed_expiry_is_retried(user, cleanup, eventually, monkeypatch):
+    uid = user("lease-retry")
+    cleanup.append(("p1", uid))
+    with SessionLocal() as db:
+        db.add(PlugSession(plug_name="p1", user_id=uid, expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+
+    monkeypatch.setattr(leases, "EXPIRE_RETRY_SECONDS", 0.1)
+    release, failures = sessions.release, []
+
+    async def flaky_release(db, name, user_id):
+        if not failures:
+            failures.append(name)
+            raise RuntimeError("database is locked")
+        return await release(db, name, user_id)
+
+    monkeypatch.setattr(sessions, "release", flaky_release)
+    restarted = LeaseManager()
+
+    async def main():
+        await restarted.start()
+        try:
+            await eventually(lambda: session_row("p1", uid) is None)
+        finally:
+            await restarted.stop()
+
+    asyncio.run(main())
+    assert failures == ["p1"]
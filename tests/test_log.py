@@ -0,0 +1,46 @@
+# tests/test_log.py
+"""구조화 로깅: event() 레코드의 호출 위치와 DEBUG 샘플링."""
+import inspect
+import logging
+
+from app.log import SamplingFilter, event
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def capture_logger(name: str):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = Capture()
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_event_records_caller_location():
+    logger, handler = capture_logger("tests.log.location")
+    line = inspect.currentframe().f_lineno + 1
+    event(logger, "plug.reserve", plug="p1", user_id=1)
+
+    record = handler.records[0]
+    assert (record.pathname, record.lineno) == (__file__, line)
+    assert record.funcName == "test_event_records_caller_location"
+    assert record.event == "plug.reserve" and record.fields == {"plug": "p1", "user_id": 1}
+
+
+def test_debug_events_sampled_per_call_site():
+    logger, handler = capture_logger("tests.log.sampling")
+    handler.addFilter(SamplingFilter(every=2))
+    for _ in range(6):
+        event(logger, "a", level=logging.DEBUG)
+        event(logger, "b", level=logging.DEBUG)
+
+    # 두 호출 위치가 따로 세어져 각각 6개 중 3개씩 남는다 (event() 안의 한 줄로 묶이지 않음)
+    assert [r.event for r in handler.records] == ["a", "b"] * 3
@@ -0,0 +1,114 @@
+# tests/test_mqtt_bridge.py
+"""MQTT 브리지를 로컬 브로커 대역(benchmarks/local_broker.py)에 붙여 확인합니다."""
+import asyncio
+import json
+
+import pytest
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services import sessions
+from app.services.events import event_bus
+from app.services.mqtt_bridge import MqttBridge
+from app.services.reconciler import reconciler
+from app.services.state_cache import plug_state_cache
+from benchmarks.local_broker import LocalBroker
+
+STATUS_TOPIC = "tapo/bridge/status"
+
+
+def plug_state(broker: LocalBroker, name: str) -> dict:
+    payload = broker.retained.get(f"tapo/plug/{name}/state")
+    return json.loads(payload) if payload else {}
+
+
+@pytest.fixture
+def broker(monkeypatch) -> LocalBroker:
+    monkeypatch.setattr(settings, "MQTT_ENABLED", True)
+    monkeypatch.setattr(settings, "MQTT_TOPIC_PREFIX", "tapo")
+    monkeypatch.setattr(settings, "MQTT_COMMAND_USER", "mqtt")
+    monkeypatch.setattr(settings, "MQTT_RECONNECT_SECONDS", 0.05)
+    return LocalBroker()
+
+
+def run_bridge(broker: LocalBroker, scenario):
+    """이벤트 버스와 브리지를 띄운 채 scenario(bridge) 를 실행하고 정리합니다."""
+
+    async def main():
+        bridge = MqttBridge(transport_factory=broker.client)
+        await event_bus.start()
+        await bridge.start()
+        try:
+            await scenario(bridge)
+        finally:
+            await bridge.stop()
+            await event_bus.stop()
+
+    asyncio.run(main())
+
+
+def test_publishes_retained_state(broker, eventually):
+    plug_state_cache.update("p1", False)
+
+    async def scenario(bridge):
+        await eventually(lambda: plug_state(broker, "p1") and plug_state(broker, "p2"))
+        assert broker.retained[STATUS_TOPIC] == b"online"
+        assert plug_state(broker, "p1")["status"] is False
+
+        plug_state_cache.update("p1", True)
+        await eventually(lambda: plug_state(broker, "p1")["status"] is True)
+
+    run_bridge(broker, scenario)
+    state_publishes = [retain for topic, _, retain in broker.log if topic.endswith("/state")]
+    assert state_publishes and all(state_publishes)
+    # 정상 종료는 LWT 가 아니라 브리지가 직접 offline 을 남긴다
+    assert broker.retained[STATUS_TOPIC] == b"offline"
+
+
+def test_commands_go_through_sessions(broker, eventually, user):
+    user("mqtt")
+
+    async def scenario(bridge):
+        await eventually(lambda: bridge.connected)
+
+        await broker.inject("tapo/plug/p2/set", "on")
+        await eventually(lambda: plug_state(broker, "p2").get("users") == ["mqtt"])
+        assert plug_state(broker, "p2")["active_users"] == 1
+        assert reconciler.desired("p2") is True
+        with SessionLocal() as db:
+            assert sessions.list_users(db, "p2") == ["mqtt"]
+
+        await broker.inject("tapo/plug/p2/set", "off")
+        await eventually(lambda: plug_state(broker, "p2").get("active_users") == 0)
+        assert reconciler.desired("p2") is False
+        with SessionLocal() as db:
+            assert sessions.count_active(db, "p2") == 0
+
+        # 세션이 없는 off·알 수 없는 플러그·잘못된 명령은 무시되고 연결은 유지된다
+        await broker.inject("tapo/plug/p2/set", "off")
+        await broker.inject("tapo/plug/nope/set", "on")
+        await broker.inject("tapo/plug/p1/set", "toggle")
+        await asyncio.sleep(0.05)
+        assert bridge.connected
+        assert reconciler.desired("p2") is False
+
+    run_bridge(broker, scenario)
+
+
+def test_reconnects_after_broker_restart(broker, eventually):
+    def onlines() -> int:
+        return sum(1 for topic, payload, _ in broker.log if topic == STATUS_TOPIC and payload == b"online")
+
+    async def scenario(bridge):
+        await eventually(lambda: bridge.connected and plug_state(broker, "p1"))
+        published = len([1 for topic, _, _ in broker.log if topic == "tapo/plug/p1/state"])
+
+        broker.disconnect_all()
+        await eventually(lambda: onlines() == 2 and bridge.connected)
+        assert (STATUS_TOPIC, b"offline", True) in broker.log      # 끊긴 동안 브로커가 LWT 를 남김
+        assert broker.retained[STATUS_TOPIC] == b"online"
+        # 재연결하면 모든 플러그 상태를 다시 보낸다
+        await eventually(lambda: len([1 for topic, _, _ in broker.log if topic == "tapo/plug/p1/state"]) > published)
+        assert len(broker.clients) == 1
+
+    run_bridge(broker, scenario)
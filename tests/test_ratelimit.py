@@ -0,0 +1,39 @@
+# tests/test_ratelimit.py
+"""요청 제한: 장치 버킷은 연결 단위 (멀티탭 콘센트는 한 버킷)."""
+import pytest
+
+from app.config import settings
+from app.services.pyp100 import pyp100_service
+from app.services.ratelimit import RateLimiter, plug_checks
+
+
+@pytest.fixture
+def strip(monkeypatch):
+    """멀티탭 '책상' 의 콘센트 두 개와 일반 플러그 p1."""
+    monkeypatch.setattr(pyp100_service, "_plugs", {
+        "p1": "10.0.0.1", "책상/모니터": "10.0.0.9", "책상/스탠드": "10.0.0.9",
+    })
+    monkeypatch.setattr(pyp100_service, "_outlets", {"책상/모니터": ("책상", 0), "책상/스탠드": ("책상", 1)})
+    monkeypatch.setattr(settings, "RATE_LIMIT_DEVICE_PER_MINUTE", 0.001)
+    monkeypatch.setattr(settings, "RATE_LIMIT_DEVICE_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_PLUG_BURST", 100)
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_BURST", 100)
+
+
+def test_outlets_share_device_bucket(strip):
+    limiter = RateLimiter()
+    assert limiter.admit(plug_checks("alice", "user", ["책상/모니터"])) == 0
+    assert limiter.admit(plug_checks("bob", "user", ["책상/스탠드"])) == 0
+    # 멀티탭의 한도(2)를 다 썼으므로 어느 콘센트든 거절, 다른 장치는 통과
+    assert limiter.admit(plug_checks("carol", "user", ["책상/모니터"])) > 0
+    assert limiter.admit(plug_checks("carol", "user", ["p1"])) == 0
+
+
+def test_group_consumes_device_bucket_once(strip):
+    checks = plug_checks("alice", "user", ["책상/모니터", "책상/스탠드", "p1"])
+    assert [key for key, _ in checks if key[0] == "device"] == [("device", "책상"), ("device", "p1")]
+
+    limiter = RateLimiter()
+    assert limiter.admit(checks) == 0
+    assert limiter.admit(plug_checks("bob", "user", ["책상/스탠드"])) == 0
+    assert limiter.admit(plug_checks("bob", "user", ["책상/모니터"])) > 0
@@ -0,0 +1,33 @@
+# tests/test_reconciler.py
+"""목표 상태 조정(Reconciler): 장치 명령 동시 실행 제한."""
+import asyncio
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services.pyp100 import pyp100_service
+from app.services.reconciler import Reconciler
+
+
+def test_apply_respects_group_max_concurrency(monkeypatch):
+    monkeypatch.setattr(settings, "GROUP_MAX_CONCURRENCY", 1)
+    running, peak = 0, 0
+
+    async def switch(name: str) -> bool:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return True
+
+    monkeypatch.setattr(pyp100_service, "turn_on", switch)
+    reconciler = Reconciler()
+    with SessionLocal() as db:
+        assert reconciler.set_desired_many(db, ["p1", "p2"], True) == ["p1", "p2"]
+
+    async def main():
+        return await asyncio.gather(reconciler.apply_now("p1"), reconciler.apply_now("p2"))
+
+    assert asyncio.run(main()) == [True, True]
+    assert peak == 1
+    assert not reconciler.is_pending("p1") and not reconciler.is_pending("p2")
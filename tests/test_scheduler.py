@@ -0,0 +1,76 @@
+# tests/test_scheduler.py
+"""스케줄러: 도래한 스케줄이 세션을 만들고/지우며, DB 작업은 이벤트 루프 밖에서 합니다."""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import SessionLocal
+from app.models import PlugSchedule, PlugSession
+from app.services import sessions
+from app.services.reconciler import reconciler
+from app.services.scheduler import PlugScheduler
+
+
+def session_row(name: str, user_id: int):
+    with SessionLocal() as db:
+        return db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).first()
+
+
+def add_schedule(name: str, user_id: int, action: str, run_at: datetime) -> int:
+    with SessionLocal() as db:
+        sched = PlugSchedule(plug_name=name, user_id=user_id, action=action, time_of_day=None,
+                             run_at=run_at, next_run_at=run_at)
+        db.add(sched)
+        db.commit()
+        return sched.id
+
+
+@pytest.fixture
+def cleanup():
+    made = []
+    yield made
+    with SessionLocal() as db:
+        for name, user_id in made:
+            db.query(PlugSchedule).filter_by(plug_name=name, user_id=user_id).delete()
+            db.query(PlugSession).filter_by(plug_name=name, user_id=user_id).delete()
+        db.commit()
+
+
+def test_due_schedule_creates_session_off_loop(user, cleanup, eventually, monkeypatch):
+    uid = user("scheduled")
+    cleanup.append(("p2", uid))
+    threads = []
+    acquire_rows = sessions.acquire_rows
+
+    def recording_acquire_rows(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return acquire_rows(*args, **kwargs)
+
+    monkeypatch.setattr(sessions, "acquire_rows", recording_acquire_rows)
+    schedule_id = add_schedule("p2", uid, "on", datetime.utcnow() - timedelta(seconds=1))
+    scheduler = PlugScheduler()
+    reconciler.sync()           # 서버 시작 때처럼 저널을 메모리에 맞춘다 (앞선 테스트가 DB 에 쓴 목표)
+
+    async def main():
+        await scheduler.start()
+        try:
+            await eventually(lambda: reconciler.desired("p2") is True)     # 스레드에서 커밋 → 루프에서 반영
+            assert session_row("p2", uid) is not None
+            assert threads and threads[0] is not threading.current_thread()
+
+            # 1회성 "off" 스케줄을 나중에 등록해도 힙에 넣으면 실행된다
+            off_at = datetime.utcnow() + timedelta(seconds=0.2)
+            scheduler.schedule(add_schedule("p2", uid, "off", off_at), off_at)
+            await eventually(lambda: reconciler.desired("p2") is False)
+            assert session_row("p2", uid) is None
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(main())
+    with SessionLocal() as db:
+        sched = db.get(PlugSchedule, schedule_id)
+        assert sched.last_run_at is not None
+        assert sched.next_run_at is None and not sched.enabled      # 1회성은 실행 후 비활성
+    assert scheduler.pending == 0